@@ -0,0 +1,99 @@
+"""
+Per-user dashboard summary for the home page.
+
+The summary is built from a fixed number of queries and kept in the cache
+as plain data, so a warm home page doesn't touch the database. It is cached
+under the user's generation (``subjects.cache``), so any write to the user's
+subjects, topics or documents invalidates it.
+
+The count of flashcards due for review is cached the same way, together with
+the time the next card falls due: enrolling or reviewing cards bumps the
+generation, and once that time passes the count is taken again.
+"""
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.db.models import F, Min
+from django.utils import timezone
+
+from subjects import cache
+from subjects.models import Document, ReviewState, Subject, Topic
+
+# How many topics without documents the dashboard lists by name.
+WEAK_TOPIC_LIMIT = 3
+
+
+def build_summary(user_id):
+    """
+    Compute the dashboard for a user in three queries: the active subject,
+    its topics with their document counts, and the latest upload.
+    """
+    summary = {
+        'active_subject': None,
+        'active_topic': None,
+        'last_document': None,
+        'progress_percentage': 0,
+        'weak_topics': [],
+        'weak_topic_count': 0,
+    }
+
+    active_subject = Subject.objects.filter(
+        user_id=user_id
+    ).order_by('-updated_at').values('id', 'name').first()
+    if active_subject:
+        summary['active_subject'] = active_subject
+        topics = list(
+            Topic.objects.filter(subject_id=active_subject['id'])
+            .order_by('name').values('id', 'name', 'updated_at', 'document_count')
+        )
+        if topics:
+            active_topic = max(topics, key=lambda topic: topic['updated_at'])
+            summary['active_topic'] = {'id': active_topic['id'], 'name': active_topic['name']}
+            weak_topics = [topic['name'] for topic in topics if not topic['document_count']]
+            summary['weak_topics'] = weak_topics[:WEAK_TOPIC_LIMIT]
+            summary['weak_topic_count'] = len(weak_topics)
+            summary['progress_percentage'] = int((len(topics) - len(weak_topics)) / len(topics) * 100)
+
+    summary['last_document'] = Document.objects.filter(
+        user_id=user_id
+    ).order_by('-uploaded_at').values('id', 'title', 'uploaded_at', subject_name=F('subject__name')).first()
+    return summary
+
+
+def get_timeout():
+    return getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 3600)
+
+
+def get_summary(user_id):
+    return cache.cached(
+        user_id,
+        'dashboard:v1',
+        (),
+        lambda: build_summary(user_id),
+        get_timeout(),
+    )
+
+
+def count_due(user_id, now):
+    """
+    The number of the user's cards due at ``now`` and when the next of the
+    others falls due (``None`` if none is scheduled).
+    """
+    states = ReviewState.objects.filter(user_id=user_id)
+    return {
+        'count': states.filter(due_at__lte=now).count(),
+        'next_due_at': states.filter(due_at__gt=now).aggregate(next_due_at=Min('due_at'))['next_due_at'],
+    }
+
+
+def get_due_count(user_id, now=None):
+    """
+    The number of the user's cards due at ``now``, recounted only when the
+    user's generation changes or a card has fallen due since the last count.
+    """
+    now = now or timezone.now()
+    key = cache.user_key(user_id, 'due-count:v1')
+    due = default_cache.get(key)
+    if due is None or (due['next_due_at'] is not None and due['next_due_at'] <= now):
+        due = count_due(user_id, now)
+        default_cache.set(key, due, get_timeout())
+    return due['count']
@@ -3,6 +3,8 @@ from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.translation import gettext_lazy as _
 from typing import Optional, Any
 
+from luminote.database import write_transaction
+
 class CustomUserManager(BaseUserManager):
     """
     Custom user manager where email is the unique identifier
@@ -49,3 +51,9 @@ class CustomUser(AbstractUser):
 
     def __str__(self) -> str:
         return self.email
+
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        # Registration and every login's last_login update queue for the
+        # writer slot like the other write paths.
+        with write_transaction():
+            super().save(*args, **kwargs)
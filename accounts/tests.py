@@ -1,3 +1,65 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from subjects import scheduling
+from subjects.models import Document, Flashcard, ReviewState, Subject, Topic
+
+from . import dashboard
+from .models import CustomUser
+
+
+class HomeDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user('reader@example.com', 'password')
+        self.client.force_login(self.user)
+        self.subject = Subject.objects.create(user=self.user, name='Biology')
+        for name in ('Cells', 'Genetics', 'Ecology', 'Evolution'):
+            Topic.objects.create(subject=self.subject, name=name)
+
+    def test_warm_dashboard_only_loads_session_and_user(self):
+        self.client.get(reverse('home'))
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['active_subject']['name'], 'Biology')
+        self.assertEqual(response.context['weak_topics'], ['Cells', 'Ecology', 'Evolution'])
+        self.assertContains(response, 'and 1 more...')
+
+    def test_more_weak_topics_follow_the_limit(self):
+        with mock.patch.object(dashboard, 'WEAK_TOPIC_LIMIT', 2):
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['weak_topics'], ['Cells', 'Ecology'])
+        self.assertContains(response, 'and 2 more...')
+
+    def test_due_count_follows_reviews_and_time(self):
+        topic = Topic.objects.get(name='Cells')
+        document = Document.objects.create(subject=self.subject, topic=topic, title='Cells', file_size=0, file_type='pdf')
+        cards = [
+            Flashcard.objects.create(topic=topic, document=document, page=1, kind='definition', front=front, back='...')
+            for front in ('Nucleus', 'Ribosome')
+        ]
+        now = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            scheduling.enroll(self.user.pk, cards, now)
+        self.assertEqual(dashboard.get_due_count(self.user.pk, now), 2)
+
+        state = ReviewState.objects.order_by('pk').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            scheduling.record_reviews(self.user, [(state.pk, 5)], now)
+        self.assertEqual(dashboard.get_due_count(self.user.pk, now), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(dashboard.get_due_count(self.user.pk, now + timedelta(hours=1)), 1)
+        self.assertEqual(dashboard.get_due_count(self.user.pk, now + timedelta(days=1)), 2)
 
-# Create your tests here.
+    def test_writes_invalidate_dashboard(self):
+        self.client.get(reverse('home'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Topic.objects.get(name='Genetics').delete()
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['weak_topic_count'], 3)
+        self.assertNotContains(response, 'more...')
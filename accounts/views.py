@@ -4,13 +4,14 @@ from django.views.generic import CreateView, TemplateView
 from django.contrib.auth.views import LoginView, LogoutView
 from django.contrib.auth import login
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.utils.decorators import method_decorator
 from typing import Any, Dict
-from django.db.models import Max
 from django.utils import timezone
-from datetime import timedelta
 
+from luminote.database import replica_reads
+
+from . import dashboard
 from .forms import CustomUserCreationForm, CustomAuthenticationForm
-from subjects.models import Subject, Topic, Document
 
 class RegisterView(CreateView):
     """
@@ -45,6 +46,7 @@ class CustomLogoutView(LogoutView):
     # This ensures consistency with Django's built-in logout handling
     next_page = reverse_lazy('login')
 
+@method_decorator(replica_reads, name='dispatch')
 class HomeView(LoginRequiredMixin, TemplateView):
     """
     Home view that requires login.
@@ -57,49 +59,22 @@ class HomeView(LoginRequiredMixin, TemplateView):
         user = self.request.user
         context['user'] = user
 
-        # Get active subject (most recently updated)
-        active_subject = Subject.objects.filter(user=user).order_by('-updated_at').first()
-        context['active_subject'] = active_subject
-
-        # Get active topic if there's an active subject
-        active_topic = None
-        if active_subject:
-            active_topic = Topic.objects.filter(subject=active_subject).order_by('-updated_at').first()
-        context['active_topic'] = active_topic
-
-        # Get last action (most recent document upload)
-        last_document = Document.objects.filter(subject__user=user).order_by('-uploaded_at').first()
-        context['last_document'] = last_document
+        # Subject, topic, last upload and progress come from a cached
+        # per-user summary that is invalidated whenever the user's data changes
+        summary = dashboard.get_summary(user.pk)
+        context.update(summary)
 
         # Calculate days since last activity
         days_since_last_activity = None
-        if last_document and last_document.uploaded_at:
-            time_diff = timezone.now() - last_document.uploaded_at
+        last_document = summary['last_document']
+        if last_document and last_document['uploaded_at']:
+            time_diff = timezone.now() - last_document['uploaded_at']
             days_since_last_activity = time_diff.days
         context['days_since_last_activity'] = days_since_last_activity
 
-        # Progress overview
-        # For simplicity, we'll calculate a basic progress metric:
-        # - Count of documents per subject
-        if active_subject:
-            total_topics = Topic.objects.filter(subject=active_subject).count()
-            topics_with_documents = Topic.objects.filter(
-                subject=active_subject, 
-                documents__isnull=False
-            ).distinct().count()
-
-            if total_topics > 0:
-                progress_percentage = int((topics_with_documents / total_topics) * 100)
-            else:
-                progress_percentage = 0
-
-            context['progress_percentage'] = progress_percentage
+        context['more_weak_topic_count'] = max(summary['weak_topic_count'] - dashboard.WEAK_TOPIC_LIMIT, 0)
 
-            # Find topics without documents (weak topics)
-            weak_topics = Topic.objects.filter(
-                subject=active_subject, 
-                documents__isnull=True
-            ).distinct()
-            context['weak_topics'] = weak_topics
+        # Cached until the user's cards change or the next one falls due
+        context['due_review_count'] = dashboard.get_due_count(user.pk)
 
         return context
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'luminote.settings')
 
 application = get_asgi_application()
+
+# Requeue documents a previous web process left behind mid-ingestion.
+from subjects import ingestion  # noqa: E402
+
+ingestion.start()
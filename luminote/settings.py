@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from .database import databases_from_env
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -48,6 +51,7 @@ AUTH_USER_MODEL = 'accounts.CustomUser'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'luminote.database.ReadYourWritesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -79,13 +83,20 @@ WSGI_APPLICATION = 'luminote.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# Configured from DATABASE_URL, DATABASE_REPLICA_URLS, DATABASE_CONN_MAX_AGE,
+# DATABASE_POOL_MIN_SIZE/MAX_SIZE and DATABASE_SQLITE_* (see
+# luminote/database.py).
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
-}
+DATABASES = databases_from_env(os.environ, BASE_DIR)
+
+DATABASE_ROUTERS = ['luminote.database.PrimaryReplicaRouter']
+
+# Seconds a client's reads stay on the primary after it wrote
+DATABASE_REPLICA_STICKY_SECONDS = 5
+
+# On SQLite, queue the write transactions of uploads and edits so one at a
+# time takes the write lock (see luminote/database.py)
+SQLITE_WRITE_QUEUE = True
 
 
 # Password validation
@@ -139,3 +150,108 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/accounts/login/'
 LOGIN_URL = '/accounts/login/'
+
+# Document ingestion
+# 'inprocess' runs a thread pool inside the web process; 'database' leaves
+# pending documents for `manage.py run_ingestion_workers`.
+INGESTION_QUEUE_BACKEND = 'inprocess'
+INGESTION_WORKERS = 2
+INGESTION_MAX_ATTEMPTS = 3
+INGESTION_POLL_INTERVAL = 2.0
+INGESTION_STALE_AFTER = 600
+# Seconds before the first retry of a failed document, doubled per attempt.
+INGESTION_RETRY_DELAY = 5
+# How often the in-process queue looks for stale and due documents.
+INGESTION_SWEEP_INTERVAL = 30
+
+# Uploads are hashed while they stream in, for content-addressed storage
+FILE_UPLOAD_HANDLERS = [
+    'subjects.uploadhandlers.HashingMemoryFileUploadHandler',
+    'subjects.uploadhandlers.HashingTemporaryFileUploadHandler',
+]
+
+# Full-text search. None uses 'subjects.search.SQLiteFTS5Backend' on SQLite
+# and 'subjects.search.DatabaseSearchBackend' (titles and topics only) on
+# other databases.
+SEARCH_BACKEND = None
+SEARCH_RESULT_LIMIT = 200
+
+# Home page dashboard summary, cached per user and invalidated on writes
+DASHBOARD_CACHE_TIMEOUT = 3600
+
+# Caching
+# Per-process LRU memory cache. With several worker processes, use the shared
+# on-disk cache instead so invalidations are seen by all of them:
+#     'BACKEND': 'subjects.cache.SharedFileBasedCache',
+#     'LOCATION': BASE_DIR / 'cache',
+CACHES = {
+    'default': {
+        'BACKEND': 'subjects.cache.LRULocMemCache',
+        'LOCATION': 'luminote',
+        'TIMEOUT': 3600,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Document downloads
+# 'django' streams from Python (with Range support); 'xsendfile' and 'accel'
+# hand the file to Apache/lighttpd or nginx (see subjects/delivery.py).
+DOCUMENT_DELIVERY = 'django'
+DOCUMENT_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+DOCUMENT_CACHE_MAX_AGE = 3600
+
+# Resumable chunked uploads
+RESUMABLE_UPLOAD_DIR = MEDIA_ROOT / 'uploads'
+RESUMABLE_UPLOAD_MAX_SIZE = 2 * 1024 ** 3
+RESUMABLE_UPLOAD_EXPIRY = 86400
+
+# Bulk document import; BULK_UPLOAD_MAX_ARCHIVE_SIZE caps the uncompressed
+# size of all members of an archive together.
+BULK_UPLOAD_MAX_FILES = 500
+BULK_UPLOAD_MAX_ARCHIVE_SIZE = 4 * 1024 ** 3
+DATA_UPLOAD_MAX_NUMBER_FILES = BULK_UPLOAD_MAX_FILES
+
+# Metadata extraction sandbox (see subjects/sandbox.py); 0 workers parses in
+# the calling process without limits. EXTRACTION_QUEUE_TIMEOUT bounds the wait
+# for a free worker, EXTRACTION_TIMEOUT the time a worker spends on a file.
+EXTRACTION_WORKERS = 2
+EXTRACTION_TIMEOUT = 30
+EXTRACTION_QUEUE_TIMEOUT = 120
+EXTRACTION_MEMORY_LIMIT = 3 * 1024 ** 3
+
+# Page previews (see subjects/previews.py). PREVIEW_RENDERER is 'auto',
+# 'pymupdf', 'pdftoppm' or None; 'auto' uses whichever is installed.
+PREVIEW_RENDERER = 'auto'
+PREVIEW_PAGES = 1
+PREVIEW_WIDTH = 320
+PREVIEW_JPEG_QUALITY = 70
+PREVIEW_CACHE_MAX_BYTES = 512 * 1024 ** 2
+PREVIEW_CACHE_MAX_AGE = 30 * 86400
+
+# Largest page range returned by the document pages API
+DOCUMENT_PAGES_MAX_RANGE = 50
+
+# Flashcard generation (see subjects/flashcards.py)
+FLASHCARDS_MAX_PER_DOCUMENT = 200
+
+# Flashcard reviews: cards fetched and grades sent per request
+REVIEW_BATCH_SIZE = 20
+
+# Quizzes (see subjects/quizzes.py): questions per quiz, and how many of the
+# weakest topics a weak-areas quiz covers
+QUIZ_QUESTION_COUNT = 10
+QUIZ_WEAK_TOPICS = 3
+
+# Subject tag suggestions returned by the autocomplete API
+TAG_AUTOCOMPLETE_LIMIT = 10
+
+# Vector index for semantic search (see subjects/vectors.py); needs numpy.
+# SEARCH_BACKEND = 'subjects.search.VectorSearchBackend' uses it for the
+# document list search as well. The index files are kept under
+# VECTOR_INDEX_ROOT, MEDIA_ROOT / 'vectors' by default.
+VECTOR_INDEX_ENABLED = True
+VECTOR_DIMENSIONS = 384
+VECTOR_CHUNK_WORDS = 200
+VECTOR_CHUNK_OVERLAP = 40
+# Users whose index stays memory-mapped in each process.
+VECTOR_MAP_CACHE_SIZE = 32
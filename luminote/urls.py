@@ -17,8 +17,6 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import RedirectView
-from django.conf import settings
-from django.conf.urls.static import static
 from accounts.views import HomeView
 
 urlpatterns = [
@@ -28,7 +26,3 @@ urlpatterns = [
     path('login/', RedirectView.as_view(url='/accounts/login/', permanent=True), name='login_redirect'),
     path('', HomeView.as_view(), name='home'),
 ]
-
-# Serve media files in development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
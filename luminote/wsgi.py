@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'luminote.settings')
 
 application = get_wsgi_application()
+
+# Requeue documents a previous web process left behind mid-ingestion.
+from subjects import ingestion  # noqa: E402
+
+ingestion.start()
@@ -1,14 +1,20 @@
 from django.contrib import admin
-from .models import Subject, Topic, Document
+from .models import Subject, Tag, Topic, Document, Blob, UploadSession, Preview, Flashcard, Question, Quiz
 
 @admin.register(Subject)
 class SubjectAdmin(admin.ModelAdmin):
     list_display = ('name', 'user', 'created_at', 'updated_at')
     list_filter = ('created_at', 'updated_at')
-    search_fields = ('name', 'description', 'tags')
+    search_fields = ('name', 'description', 'tags__name')
     raw_id_fields = ('user',)
     date_hierarchy = 'created_at'
 
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('name', 'user', 'created_at')
+    search_fields = ('name',)
+    raw_id_fields = ('user',)
+
 @admin.register(Topic)
 class TopicAdmin(admin.ModelAdmin):
     list_display = ('name', 'subject', 'created_at', 'updated_at')
@@ -19,7 +25,49 @@ class TopicAdmin(admin.ModelAdmin):
 
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
-    list_display = ('title', 'subject', 'topic', 'document_type', 'uploaded_at')
-    list_filter = ('document_type', 'uploaded_at')
+    list_display = ('title', 'subject', 'topic', 'document_type', 'status', 'uploaded_at')
+    list_filter = ('document_type', 'status', 'uploaded_at')
     search_fields = ('title',)
     raw_id_fields = ('subject', 'topic')
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'file_type', 'size', 'page_count', 'ref_count', 'created_at')
+    list_filter = ('file_type', 'created_at')
+    search_fields = ('sha256',)
+    readonly_fields = ('sha256', 'file', 'size', 'ref_count')
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'subject', 'offset', 'size', 'document', 'updated_at')
+    list_filter = ('updated_at',)
+    search_fields = ('filename', 'title')
+    raw_id_fields = ('subject', 'topic')
+    readonly_fields = ('offset', 'size')
+
+@admin.register(Preview)
+class PreviewAdmin(admin.ModelAdmin):
+    list_display = ('blob', 'page', 'width', 'size', 'last_accessed_at')
+    list_filter = ('width',)
+    raw_id_fields = ('blob',)
+    readonly_fields = ('file', 'size')
+
+@admin.register(Flashcard)
+class FlashcardAdmin(admin.ModelAdmin):
+    list_display = ('front', 'kind', 'topic', 'document', 'page')
+    list_filter = ('kind',)
+    search_fields = ('front', 'back')
+    raw_id_fields = ('topic', 'document')
+
+@admin.register(Question)
+class QuestionAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'source', 'topic', 'document', 'page')
+    list_filter = ('source',)
+    search_fields = ('prompt',)
+    raw_id_fields = ('topic', 'document')
+
+@admin.register(Quiz)
+class QuizAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'user', 'topic', 'answered_count', 'correct_count', 'created_at', 'completed_at')
+    list_filter = ('kind',)
+    raw_id_fields = ('user', 'topic')
@@ -0,0 +1,274 @@
+"""
+Bulk import of many documents at once.
+
+Files come from a multi-file upload or from a zip archive whose top-level
+folders name the topics (files at the top of the archive go to the topic
+chosen in the form). Every file is stored as a blob first, then the
+documents are inserted with a single ``bulk_create`` in one write
+transaction; nothing is parsed during the request. The documents are queued for ingestion like single
+uploads, so metadata of content not seen before is extracted in the
+background. Archives are limited to ``BULK_UPLOAD_MAX_ARCHIVE_SIZE``
+uncompressed bytes in total, checked against each member's declared size
+before it is inflated and against the bytes actually inflated, and members
+past ``BULK_UPLOAD_MAX_FILES`` aren't inflated at all.
+
+``bulk_create`` doesn't send signals, so this module takes care of what the
+``post_save`` receivers normally do: the topic and subject counters, the
+title entry in the search index and the owner's cache generation. Storing a
+blob counts its reference, as it does for single uploads.
+"""
+import hashlib
+import os
+import tempfile
+import zipfile
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+
+from luminote.database import write_transaction
+
+from . import cache, counters, ingestion, search
+from .models import Blob, Document, Topic
+from .uploads import COPY_BUFFER_SIZE, PartialUpload
+
+ALLOWED_TYPES = ('pdf', 'docx')
+
+RESULT_CREATED = 'created'
+RESULT_SKIPPED = 'skipped'
+RESULT_FAILED = 'failed'
+
+ARCHIVE_TOO_LARGE = 'The archive is too large to import in full.'
+
+
+@dataclass
+class ImportResult:
+    """
+    One line of the report shown after a bulk import.
+    """
+    name: str
+    topic: str = ''
+    status: str = RESULT_CREATED
+    message: str = ''
+    document_id: Optional[int] = None
+    page_count: Optional[int] = None
+
+
+@dataclass
+class _Entry:
+    result: ImportResult
+    file: object
+    digest: str
+    file_type: str
+
+
+def file_type_of(name):
+    _root, ext = os.path.splitext(name)
+    return ext.lower().lstrip('.')
+
+
+def get_max_files():
+    return getattr(settings, 'BULK_UPLOAD_MAX_FILES', 500)
+
+
+def get_max_archive_size():
+    return getattr(settings, 'BULK_UPLOAD_MAX_ARCHIVE_SIZE', 4 * 1024 ** 3)
+
+
+def spool_member(archive, info, limit):
+    """
+    Copy an archive member to a temporary file, hashing it on the way. The
+    size is checked against the bytes actually inflated, not the header.
+    """
+    tmp = tempfile.NamedTemporaryFile(
+        suffix=os.path.splitext(info.filename)[1],
+        dir=settings.FILE_UPLOAD_TEMP_DIR,
+        delete=False,
+    )
+    hasher = hashlib.sha256()
+    written = 0
+    try:
+        with archive.open(info) as member:
+            while True:
+                chunk = member.read(COPY_BUFFER_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > limit:
+                    raise ValueError('File is too large.')
+                hasher.update(chunk)
+                tmp.write(chunk)
+        tmp.flush()
+        tmp.seek(0)
+    except BaseException:
+        tmp.close()
+        os.remove(tmp.name)
+        raise
+    upload = PartialUpload(tmp, name=os.path.basename(info.filename))
+    upload.sha256 = hasher.hexdigest()
+    return upload
+
+
+def too_many_files(result):
+    result.status, result.message = RESULT_SKIPPED, f'Only {get_max_files()} files can be imported at once.'
+
+
+def read_archive(archive_file, default_topic_name, max_files=None):
+    """
+    Yield ``(result, file)`` for the members of a zip archive; ``file`` is
+    None for members that are skipped. Members past the first ``max_files``
+    importable ones, or whose declared size doesn't fit in what is left of
+    the archive's total, are skipped without being inflated.
+    """
+    max_size = getattr(settings, 'RESUMABLE_UPLOAD_MAX_SIZE', 2 * 1024 ** 3)
+    max_topic_length = Topic._meta.get_field('name').max_length
+    max_files = get_max_files() if max_files is None else max_files
+    remaining = get_max_archive_size()
+    spooled = 0
+    with zipfile.ZipFile(archive_file) as archive:
+        for info in archive.infolist():
+            parts = [part for part in info.filename.split('/') if part]
+            if info.is_dir() or not parts:
+                continue
+            if any(part.startswith('.') or part == '__MACOSX' for part in parts):
+                continue
+            topic_name = parts[0] if len(parts) > 1 else default_topic_name
+            result = ImportResult(name=info.filename, topic=topic_name or '')
+            if file_type_of(info.filename) not in ALLOWED_TYPES:
+                result.status, result.message = RESULT_SKIPPED, 'Only PDF and DOCX files are imported.'
+                yield result, None
+            elif not topic_name:
+                result.status, result.message = RESULT_SKIPPED, 'Choose a topic for files outside folders.'
+                yield result, None
+            elif len(topic_name) > max_topic_length:
+                result.status = RESULT_SKIPPED
+                result.message = f'Folder names can be at most {max_topic_length} characters long.'
+                yield result, None
+            elif spooled >= max_files:
+                too_many_files(result)
+                yield result, None
+            elif remaining <= 0 or info.file_size > remaining:
+                result.status, result.message, remaining = RESULT_SKIPPED, ARCHIVE_TOO_LARGE, 0
+                yield result, None
+            else:
+                limit = min(max_size, remaining)
+                try:
+                    file = spool_member(archive, info, limit)
+                except (ValueError, zipfile.BadZipFile, OSError) as e:
+                    result.status, result.message = RESULT_FAILED, str(e)
+                    if isinstance(e, ValueError) and limit < max_size:
+                        # What is left of the archive's total isn't enough.
+                        result.message, remaining = ARCHIVE_TOO_LARGE, 0
+                    yield result, None
+                else:
+                    remaining -= file.size
+                    spooled += 1
+                    yield result, file
+
+
+def import_documents(subject, document_type, files=(), archive=None, topic=None):
+    """
+    Import uploaded ``files`` (into ``topic``) and the members of a zip
+    ``archive``. Returns the list of ``ImportResult``.
+    """
+    results = []
+    entries = []
+    sources = [(ImportResult(name=file.name, topic=topic.name if topic else ''), file) for file in files]
+    temporary = []
+    try:
+        if archive is not None:
+            # Slots the uploaded files leave for archive members.
+            max_files = max(get_max_files() - sum(file_type_of(file.name) in ALLOWED_TYPES for _result, file in sources), 0)
+            for result, file in read_archive(archive, topic.name if topic else None, max_files):
+                if file is not None:
+                    temporary.append(file)
+                sources.append((result, file))
+
+        for result, file in sources:
+            results.append(result)
+            if file is None:
+                continue
+            if len(entries) >= get_max_files():
+                too_many_files(result)
+                continue
+            file_type = file_type_of(file.name)
+            if file_type not in ALLOWED_TYPES:
+                result.status, result.message = RESULT_SKIPPED, 'Only PDF and DOCX files are imported.'
+                continue
+            digest = getattr(file, 'sha256', None)
+            if digest is None:
+                hasher = hashlib.sha256()
+                for chunk in file.chunks():
+                    hasher.update(chunk)
+                file.seek(0)
+                digest = hasher.hexdigest()
+            entries.append(_Entry(result=result, file=file, digest=digest, file_type=file_type))
+
+        create_documents(subject, document_type, entries)
+    finally:
+        # Members already moved into blob storage are gone; the rest were
+        # duplicates of stored content.
+        for file in temporary:
+            file.close()
+            if os.path.exists(file.file.name):
+                os.remove(file.file.name)
+    return results
+
+
+def create_documents(subject, document_type, entries):
+    if not entries:
+        return
+    # The files go into blob storage before the transaction, which only
+    # inserts the rows: moving or copying hundreds of files while holding
+    # the write lock would hold up every other writer.
+    staged = []
+    try:
+        for entry in entries:
+            staged.append(Blob.objects.stage(entry.file, content_hash=entry.digest))
+
+        with write_transaction():
+            topics = {topic.name: topic for topic in Topic.objects.filter(subject=subject)}
+            documents = []
+            for entry, (blob, written) in zip(entries, staged):
+                name = entry.result.topic
+                if name not in topics:
+                    topics[name] = Topic.objects.create(subject=subject, name=name)
+
+                blob, _created = Blob.objects.claim(blob, written)
+
+                title, _ext = os.path.splitext(os.path.basename(entry.result.name))
+                documents.append(Document(
+                    user=subject.user,
+                    subject=subject,
+                    topic=topics[name],
+                    title=title[:255],
+                    document_type=document_type,
+                    blob=blob,
+                    file=blob.file.name,
+                    file_type=blob.file_type if blob.is_extracted else entry.file_type,
+                    file_size=blob.size,
+                    page_count=blob.page_count if blob.is_extracted else None,
+                    status=Document.STATUS_PENDING,
+                ))
+
+            Document.objects.bulk_create(documents)
+
+            # What the post_save signals would have done for each document;
+            # claiming the blobs counted their references.
+            counters.documents_added(documents)
+            backend = search.get_backend()
+            for document in documents:
+                backend.index_document(document)
+                ingestion.enqueue(document)
+            cache.invalidate_user(subject.user_id)
+    except BaseException:
+        # Files written for blobs whose rows never made it into the
+        # database, unless another upload of the content claimed them since.
+        for blob, written in staged:
+            if written and not Blob.objects.filter(file=blob.file.name).exists():
+                blob.file.delete(save=False)
+        raise
+
+    for entry, document in zip(entries, documents):
+        entry.result.document_id = document.pk
+        entry.result.page_count = document.page_count
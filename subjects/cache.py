@@ -0,0 +1,158 @@
+"""
+Caching of per-user reads.
+
+Cached values are keyed by a per-user generation number. Any write to one of
+the user's subjects, topics or documents bumps the generation (see
+``signals.py``), which orphans every key built with the old number at once;
+the orphans age out through the backend's normal eviction.
+
+Two backends record hit/miss counters for tuning (``stats()``):
+
+* ``LRULocMemCache`` - per-process memory that evicts the least recently used
+  entry when full, instead of dropping a third of the cache.
+* ``SharedFileBasedCache`` - a directory on disk shared by every worker
+  process on the host, whose ``incr`` holds a file lock so concurrent
+  generation bumps aren't lost.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files import locks
+from django.db import transaction
+
+_MISSING = object()
+
+_stats = defaultdict(Counter)
+_stats_lock = threading.Lock()
+
+
+def record(location, event):
+    with _stats_lock:
+        _stats[location][event] += 1
+
+
+def stats():
+    """
+    Hit/miss/eviction counters of this process, per cache location.
+    """
+    with _stats_lock:
+        result = {}
+        for location, counter in _stats.items():
+            lookups = counter['hits'] + counter['misses']
+            result[location] = {
+                'hits': counter['hits'],
+                'misses': counter['misses'],
+                'evictions': counter['evictions'],
+                'hit_rate': round(counter['hits'] / lookups, 3) if lookups else None,
+            }
+        return result
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+class StatsMixin:
+    """
+    Count hits and misses of ``get`` (``get_many`` and ``get_or_set`` go
+    through it too).
+    """
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            record(self.stats_location, 'misses')
+            return default
+        record(self.stats_location, 'hits')
+        return value
+
+
+class LRULocMemCache(StatsMixin, LocMemCache):
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self.stats_location = name
+
+    def _cull(self):
+        # Called with the lock held when the cache is full. Entries are kept
+        # most recently used first, so the last one goes. Expired entries are
+        # left to be dropped when they are next read.
+        key, _ = self._cache.popitem()
+        del self._expire_info[key]
+        record(self.stats_location, 'evictions')
+
+
+class SharedFileBasedCache(StatsMixin, FileBasedCache):
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self.stats_location = self._dir
+
+    def incr(self, key, delta=1, version=None):
+        # The base class reads the value and writes it back; the lock keeps
+        # another process from incrementing in between and losing an update.
+        os.makedirs(self._dir, 0o700, exist_ok=True)
+        with open(os.path.join(self._dir, 'incr.lock'), 'ab') as lock:
+            locks.lock(lock, locks.LOCK_EX)
+            try:
+                return super().incr(key, delta, version)
+            finally:
+                locks.unlock(lock)
+
+
+def generation_key(user_id):
+    return f'user-generation:{user_id}'
+
+
+def get_generation(user_id):
+    key = generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # Start from the clock rather than 0, so a generation that was evicted
+        # can't come back with a number used by entries still in the cache.
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(user_id):
+    key = generation_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate_user(user_id):
+    """
+    Invalidate everything cached for the user once the current transaction
+    commits; bumping earlier would let another request cache the old rows
+    under the new generation.
+    """
+    if user_id is not None:
+        transaction.on_commit(lambda: bump_generation(user_id))
+
+
+def user_key(user_id, namespace, parts=()):
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'{namespace}:{user_id}:{get_generation(user_id)}:{digest}'
+
+
+def cached(user_id, namespace, parts, compute, timeout=DEFAULT_TIMEOUT):
+    """
+    Return the value cached for ``(namespace, parts)`` in the user's current
+    generation, calling ``compute()`` and storing its result on a miss.
+    ``None`` results are not cached.
+    """
+    key = user_key(user_id, namespace, parts)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        if value is not None:
+            cache.set(key, value, timeout)
+    return value
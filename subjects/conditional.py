@@ -0,0 +1,66 @@
+"""
+Conditional GET for list pages and the topics API.
+
+Validators are computed from aggregate queries (row count and latest
+``updated_at``) over the rows a response is built from, so revalidating
+costs one small query per model and a matching ``If-None-Match`` returns 304
+before the listing is queried, serialised or rendered. The row count is part
+of the ETag because deleting a row doesn't move ``max(updated_at)``. For the
+same reason no ``Last-Modified`` is sent: a client revalidating with
+``If-Modified-Since`` alone would be told a list it saw before a delete is
+still current.
+
+Responses that will show flash messages are neither answered with 304 (the
+messages would be consumed without being seen) nor given an ETag (a later
+304 would bring the cached messages back).
+"""
+import hashlib
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+
+def etag(request, querysets):
+    """
+    Return the ETag of a response built from ``querysets``.
+    """
+    # Pages embed a CSRF token, so a new CSRF secret must not be answered with 304.
+    get_token(request)
+    parts = [request.user.pk, request.META['CSRF_COOKIE']]
+    for queryset in querysets:
+        version = queryset.order_by().aggregate(count=Count('pk'), last_modified=Max('updated_at'))
+        parts.append((queryset.model._meta.label, version['count'], version['last_modified']))
+    return hashlib.sha1(repr(parts).encode(), usedforsecurity=False).hexdigest()
+
+
+def has_pending_messages(request):
+    # len() doesn't mark the messages as seen, unlike iterating over them.
+    return len(get_messages(request)) > 0
+
+
+def conditional(get_querysets):
+    """
+    Decorate a view (or a class-based view's ``get``) to answer conditional
+    requests. ``get_querysets(request, *args, **kwargs)`` returns the
+    querysets the response depends on.
+    """
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=lambda request, *args, **kwargs: etag(request, get_querysets(request, *args, **kwargs)),
+        )(view)
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if has_pending_messages(request):
+                response = view(request, *args, **kwargs)
+            else:
+                response = conditional_view(request, *args, **kwargs)
+            # Per-user content: browsers may keep it but must revalidate.
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return inner
+    return decorator
@@ -0,0 +1,195 @@
+"""
+Denormalised counters of subjects and topics.
+
+``Topic`` keeps ``document_count``, ``total_bytes`` and ``last_activity_at``
+(the latest upload among its documents, recomputed from the remaining ones
+when the latest goes), and ``Subject`` the same plus
+``topic_count``, so list pages and the dashboard read sizes from the row
+instead of aggregating documents and topics on every request.
+
+The counters change with ``F()`` expressions in the transaction that
+creates, moves or deletes the document or topic (see ``signals.py``; bulk
+imports call ``documents_added`` since ``bulk_create`` sends no signals), so
+concurrent uploads never lose an update. Deleting a subject cascades to its
+topics and documents without touching counters that are about to go too.
+``reconcile`` recomputes everything from the child rows; run it with the
+``reconcile_counters`` command after changing documents behind the ORM's
+back.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, Max, OuterRef, QuerySet, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Document, Subject, Topic
+
+# Rows written per query.
+BATCH_SIZE = 500
+
+TOPIC_FIELDS = ('document_count', 'total_bytes', 'last_activity_at')
+SUBJECT_FIELDS = ('topic_count',) + TOPIC_FIELDS
+
+
+def changes(documents, size, uploaded_at=None):
+    """
+    Update arguments adding ``documents`` documents of ``size`` bytes (both
+    negative for removals). Counters never go below zero, so a drifted row
+    can't make a delete fail.
+    """
+    values = {
+        'document_count': Greatest(F('document_count') + documents, Value(0)),
+        'total_bytes': Greatest(F('total_bytes') + size, Value(0)),
+    }
+    if uploaded_at is not None:
+        values['last_activity_at'] = Greatest(Coalesce('last_activity_at', Value(uploaded_at)), Value(uploaded_at))
+    return values
+
+
+def change(subject_id, topic_id, documents, size, uploaded_at=None):
+    values = changes(documents, size, uploaded_at)
+    Topic.objects.filter(pk=topic_id).update(**values)
+    Subject.objects.filter(pk=subject_id).update(**values)
+
+
+def document_added(document):
+    change(document.subject_id, document.topic_id, 1, document.file_size or 0, document.uploaded_at)
+
+
+def latest_removed(subject_id, topic_id, uploaded_at):
+    """
+    Recompute ``last_activity_at`` of the topic and subject whose latest
+    upload was at ``uploaded_at``, once that document is gone from them.
+    """
+    if uploaded_at is None:
+        return
+    for model, field, pk in ((Topic, 'topic', topic_id), (Subject, 'subject', subject_id)):
+        model.objects.filter(pk=pk, last_activity_at=uploaded_at).update(
+            last_activity_at=document_totals(field)['last_activity_at'],
+        )
+
+
+def document_removed(document):
+    change(document.subject_id, document.topic_id, -1, -(document.file_size or 0))
+    latest_removed(document.subject_id, document.topic_id, document.uploaded_at)
+
+
+def document_moved(document, subject_id, topic_id, file_size):
+    """
+    Move a saved document's counts from where it was (``subject_id``,
+    ``topic_id``, ``file_size`` as stored before the save) to where it is.
+    """
+    placement = (document.subject_id, document.topic_id, document.file_size or 0)
+    if placement == (subject_id, topic_id, file_size or 0):
+        return
+    with transaction.atomic():
+        change(subject_id, topic_id, -1, -(file_size or 0))
+        document_added(document)
+        latest_removed(subject_id, topic_id, document.uploaded_at)
+
+
+def documents_added(documents):
+    """
+    Count ``documents`` inserted together, with one update per topic and
+    subject.
+    """
+    totals = defaultdict(lambda: [0, 0, None])
+    for document in documents:
+        for key in ((Topic, document.topic_id), (Subject, document.subject_id)):
+            total = totals[key]
+            total[0] += 1
+            total[1] += document.file_size or 0
+            total[2] = max(total[2] or document.uploaded_at, document.uploaded_at)
+    for (model, pk), (count, size, latest) in totals.items():
+        model.objects.filter(pk=pk).update(**changes(count, size, latest))
+
+
+def topic_added(topic):
+    Subject.objects.filter(pk=topic.subject_id).update(topic_count=F('topic_count') + 1)
+
+
+def topic_removed(topic):
+    """
+    Take a deleted topic and the documents deleted with it off its subject.
+    """
+    Subject.objects.filter(pk=topic.subject_id).update(
+        topic_count=Greatest(F('topic_count') - 1, Value(0)),
+        **changes(-topic.document_count, -topic.total_bytes),
+    )
+    if topic.last_activity_at is not None:
+        Subject.objects.filter(pk=topic.subject_id, last_activity_at=topic.last_activity_at).update(
+            last_activity_at=document_totals('subject')['last_activity_at'],
+        )
+
+
+def deleted_by(origin, model):
+    """
+    Whether a delete started from ``model`` instances (rather than from a
+    parent whose counters are deleted too).
+    """
+    if isinstance(origin, QuerySet):
+        return issubclass(origin.model, model)
+    return isinstance(origin, model)
+
+
+def document_totals(field):
+    """
+    Subqueries of the document count, size and latest upload of the outer
+    row, which documents point at with ``field``.
+    """
+    documents = Document.objects.filter(**{field: OuterRef('pk')}).order_by().values(field)
+    return {
+        'document_count': Coalesce(
+            Subquery(documents.annotate(total=Count('pk')).values('total')), Value(0), output_field=IntegerField()
+        ),
+        'total_bytes': Coalesce(
+            Subquery(documents.annotate(total=Sum('file_size')).values('total')), Value(0),
+            output_field=IntegerField(),
+        ),
+        'last_activity_at': Subquery(documents.annotate(latest=Max('uploaded_at')).values('latest')),
+    }
+
+
+def _reconcile(queryset, fields, expected):
+    fixed = []
+    rows = queryset.annotate(**{f'expected_{name}': value for name, value in expected.items()})
+    for row in rows.only('pk', *fields).iterator():
+        stale = False
+        for name in fields:
+            value = getattr(row, f'expected_{name}')
+            if getattr(row, name) != value:
+                setattr(row, name, value)
+                stale = True
+        if stale:
+            fixed.append(row)
+    queryset.model.objects.bulk_update(fixed, fields, batch_size=BATCH_SIZE)
+    return len(fixed)
+
+
+def reconcile(subjects=None):
+    """
+    Recompute the counters of ``subjects`` (every subject by default) and
+    of their topics. Returns a ``Counter`` of the topics and subjects that
+    were off.
+    """
+    subjects = Subject.objects.all() if subjects is None else subjects
+    counts = Counter()
+    with transaction.atomic():
+        counts['topics'] = _reconcile(
+            Topic.objects.filter(subject__in=subjects.values('pk')),
+            TOPIC_FIELDS,
+            document_totals('topic'),
+        )
+        topics = Topic.objects.filter(subject=OuterRef('pk')).order_by().values('subject')
+        counts['subjects'] = _reconcile(
+            subjects,
+            SUBJECT_FIELDS,
+            {
+                'topic_count': Coalesce(
+                    Subquery(topics.annotate(total=Count('pk')).values('total')), Value(0),
+                    output_field=IntegerField(),
+                ),
+                **document_totals('subject'),
+            },
+        )
+    return counts
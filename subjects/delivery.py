@@ -0,0 +1,185 @@
+"""
+Delivery of document files to their owner.
+
+Files are never exposed under ``MEDIA_URL``; the download view checks
+ownership and then hands the bytes over according to the
+``DOCUMENT_DELIVERY`` setting:
+
+* ``'django'`` - stream from Python with ``FileResponse``. Single byte ranges
+  are honoured (``Range``/``If-Range``), so PDF viewers can fetch any page
+  without downloading the whole file, and WSGI servers that implement
+  ``wsgi.file_wrapper`` with ``sendfile()`` (e.g. gunicorn) copy the bytes
+  straight from the page cache to the socket.
+* ``'xsendfile'`` - send an ``X-Sendfile`` header with the absolute path for
+  Apache mod_xsendfile or lighttpd.
+* ``'accel'`` - send ``X-Accel-Redirect`` to ``DOCUMENT_ACCEL_REDIRECT_PREFIX``
+  plus the storage name, for nginx with an ``internal`` location aliased to
+  ``MEDIA_ROOT``::
+
+      location /protected-media/ {
+          internal;
+          alias /srv/luminote/media/;
+      }
+
+The front-end server handles ranges itself in the last two modes. Blob files
+are content addressed, so the blob's SHA-256 is a strong ETag. Page previews
+are small and always streamed from Python.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, quote_etag
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """
+    File-like view of ``length`` bytes of ``file`` from its current position.
+    It keeps ``fileno()`` so ``sendfile()`` can still be used; the server
+    bounds the copy by Content-Length.
+    """
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def seekable(self):
+        return False
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Return ``(start, end)`` (inclusive) for a single-range ``Range`` header,
+    None if the header should be ignored, or False if it can't be satisfied.
+    """
+    match = _RANGE.match(header.strip())
+    if not match:
+        # Multiple ranges and malformed headers are answered with the full file.
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            return False
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        return False
+    end = int(last) if last else size - 1
+    return start, min(end, size - 1)
+
+
+def download_name(document):
+    _root, ext = os.path.splitext(document.file.name)
+    return f'{document.title}{ext}'
+
+
+def serve_document(request, document, as_attachment=False):
+    """
+    Return the response delivering ``document``'s file to ``request``.
+    """
+    etag = quote_etag(document.blob.sha256) if document.blob_id else None
+    last_modified = document.uploaded_at.timestamp()
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        method = getattr(settings, 'DOCUMENT_DELIVERY', 'django')
+        filename = download_name(document)
+        if method == 'xsendfile':
+            response = HttpResponse(content_type=content_type_for(filename))
+            response['X-Sendfile'] = document.file.path
+        elif method == 'accel':
+            prefix = getattr(settings, 'DOCUMENT_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+            response = HttpResponse(content_type=content_type_for(filename))
+            response['X-Accel-Redirect'] = prefix + quote(document.file.name)
+        elif method == 'django':
+            response = stream_file(request, document, etag, last_modified, filename)
+        else:
+            raise ValueError(f'Unknown document delivery method: {method!r}')
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+
+    if etag:
+        response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, max_age=getattr(settings, 'DOCUMENT_CACHE_MAX_AGE', 3600))
+    return response
+
+
+def serve_preview(request, preview):
+    """
+    Return the response delivering a page preview. A preview URL always
+    shows the same image, so browsers may keep it for long.
+    """
+    etag = quote_etag(f'{preview.blob.sha256}-p{preview.page}-w{preview.width}')
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = FileResponse(preview.file.open('rb'), content_type='image/jpeg')
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=getattr(settings, 'PREVIEW_CACHE_MAX_AGE', 30 * 86400))
+    return response
+
+
+def stream_file(request, document, etag, last_modified, filename):
+    file = document.file.open('rb')
+    size = document.file.size
+    byte_range = None
+    if 'Range' in request.headers and if_range_matches(request, etag, last_modified):
+        byte_range = parse_range(request.headers['Range'], size)
+
+    if byte_range is False:
+        file.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type_for(filename))
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(FileRange(file, end - start + 1), status=206, content_type=content_type_for(filename))
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def if_range_matches(request, etag, last_modified):
+    """
+    A Range is only honoured if ``If-Range`` (when sent) still names this file.
+    """
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return etag is not None and if_range == etag
+    return if_range == http_date(last_modified)
+
+
+def content_type_for(filename):
+    content_type, _encoding = mimetypes.guess_type(filename)
+    return content_type or 'application/octet-stream'
@@ -0,0 +1,673 @@
+"""
+Constant-memory metadata extraction for uploaded documents.
+
+Nothing in here reads a whole upload into memory. PDFs are memory-mapped and
+only the cross-reference data, the trailer, the catalog and the root of the
+page tree are looked at, which is enough to read the page count. DOCX files
+are zip archives, so only the central directory and ``docProps/app.xml`` are
+read; when Word did not record a page count, ``word/document.xml`` is streamed
+through a layout estimator instead of being loaded into an object model. The
+same streaming approach is used to pull out the text for search.
+Files that do not follow the expected structure fall back to PyPDF2, which is
+still handed the open file rather than a copy of its contents.
+"""
+import math
+import mmap
+import os
+import re
+import tempfile
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional
+from xml.etree import ElementTree
+import zipfile
+
+from django.core.cache import cache
+
+import PyPDF2
+
+
+# How far from the end of the file to look for ``startxref``.
+PDF_TAIL_SIZE = 64 * 1024
+
+# Upper bound on how far to scan for the end of a single object.
+PDF_MAX_OBJECT_SIZE = 1024 * 1024
+
+APP_XML_NAMESPACE = 'http://schemas.openxmlformats.org/officeDocument/2006/extended-properties'
+WORD_NAMESPACE = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+# Page counts never change for given content, so cached entries don't expire.
+PAGE_COUNT_CACHE_PREFIX = 'page-count:v1:'
+
+# Layout assumptions for the DOCX estimator, in twips (1/20 pt). They match
+# Word's defaults: Letter paper, 1" margins, 11pt Calibri with 1.08 line
+# spacing and 8pt after each paragraph.
+DEFAULT_PAGE_WIDTH = 12240
+DEFAULT_PAGE_HEIGHT = 15840
+DEFAULT_MARGIN = 1440
+AVERAGE_CHAR_WIDTH = 105
+LINE_HEIGHT = 285
+PARAGRAPH_SPACING = 160
+
+
+class PdfStructureError(Exception):
+    """
+    Raised when the PDF does not have the structure the fast path expects.
+    """
+
+
+@dataclass
+class DocumentMetadata:
+    """
+    Metadata read from an uploaded file.
+    """
+    file_type: str
+    file_size: int
+    page_count: Optional[int] = None
+
+
+@contextmanager
+def local_path(file) -> Iterator[str]:
+    """
+    Yield a filesystem path for a Django ``File``/``FieldFile``/upload.
+
+    Temporary uploads and files in a local storage are used in place. Anything
+    else (in-memory uploads, remote storages) is spooled to a temporary file
+    in chunks, so memory use stays bounded.
+    """
+    if isinstance(file, (str, os.PathLike)):
+        yield os.fspath(file)
+        return
+
+    if hasattr(file, 'temporary_file_path'):
+        yield file.temporary_file_path()
+        return
+
+    try:
+        path = file.path
+    except (AttributeError, NotImplementedError):
+        path = None
+    if path and os.path.exists(path):
+        yield path
+        return
+
+    with tempfile.NamedTemporaryFile(suffix=os.path.splitext(file.name or '')[1]) as tmp:
+        file.open('rb')
+        try:
+            for chunk in file.chunks():
+                tmp.write(chunk)
+        finally:
+            file.seek(0)
+        tmp.flush()
+        yield tmp.name
+
+
+def extract_metadata(path, file_type=None, content_hash=None) -> DocumentMetadata:
+    """
+    Read type, size and page count from the file at ``path``.
+    """
+    if file_type is None:
+        _, ext = os.path.splitext(path)
+        file_type = ext.lower().lstrip('.')
+
+    metadata = DocumentMetadata(file_type=file_type, file_size=os.path.getsize(path))
+    if file_type == 'pdf':
+        metadata.page_count = pdf_page_count(path)
+    elif file_type == 'docx':
+        metadata.page_count = docx_page_count(path, content_hash)
+    return metadata
+
+
+def pdf_page_count(path) -> int:
+    """
+    Return the number of pages of the PDF at ``path``.
+    """
+    with open(path, 'rb') as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                return PdfIndex(buf).page_count()
+        except (PdfStructureError, ValueError, IndexError, zlib.error):
+            # Damaged or unusual files: let PyPDF2 recover the structure. It
+            # seeks around the open file instead of loading it.
+            f.seek(0)
+            return len(PyPDF2.PdfReader(f).pages)
+
+
+def docx_page_count(path, content_hash=None) -> int:
+    """
+    Return the page count of the DOCX at ``path``.
+
+    Uses the count Word stored in ``docProps/app.xml`` when there is one and
+    otherwise estimates it from ``word/document.xml``. Given the content hash
+    the caller already has, results are cached by it, so uploading the same
+    file again skips the zip entirely; the file is never hashed just for the
+    cache.
+    """
+    key = PAGE_COUNT_CACHE_PREFIX + content_hash if content_hash else None
+    pages = cache.get(key) if key else None
+    if pages is None:
+        with zipfile.ZipFile(path) as archive:
+            pages = _app_xml_pages(archive) or estimate_docx_pages(archive)
+        if key:
+            cache.set(key, pages, timeout=None)
+    return pages
+
+
+def _app_xml_pages(archive) -> Optional[int]:
+    try:
+        with archive.open('docProps/app.xml') as f:
+            root = ElementTree.parse(f).getroot()
+    except (KeyError, ElementTree.ParseError):
+        return None
+    pages = root.find(f'{{{APP_XML_NAMESPACE}}}Pages')
+    if pages is None or not (pages.text or '').strip().isdigit():
+        return None
+    return int(pages.text) or None
+
+
+def estimate_docx_pages(archive) -> int:
+    """
+    Estimate the page count by streaming ``word/document.xml``.
+
+    Paragraphs are wrapped into lines of the average character width and
+    flowed onto pages in the geometry of their section; explicit page
+    breaks, page-starting section breaks and "page break before" paragraphs
+    start a new page. If Word left ``lastRenderedPageBreak`` markers from
+    its last layout pass, those are trusted instead.
+    """
+    return len(_docx_pages(archive))
+
+
+def iter_docx_pages(path) -> Iterator[str]:
+    """
+    Yield the text of the DOCX at ``path`` page by page.
+
+    Pages come from the same layout as ``estimate_docx_pages``, so there are
+    exactly as many as it counts and page numbers point readers at the right
+    place.
+    """
+    with zipfile.ZipFile(path) as archive:
+        yield from _docx_pages(archive)
+
+
+def fit_pages(texts, page_count):
+    """
+    Make the ``texts`` of extracted pages match the document's
+    ``page_count`` (which for DOCX files may come from Word's own count):
+    text past the last page is appended to it and missing pages are empty.
+    """
+    texts = list(texts)
+    if not page_count:
+        return texts
+    if len(texts) > page_count:
+        texts[page_count - 1:] = ['\n'.join(texts[page_count - 1:])]
+    return texts + [''] * (page_count - len(texts))
+
+
+class _PageFlow:
+    """
+    Paragraphs flowed line by line onto estimated pages.
+    """
+
+    def __init__(self):
+        self.pages = [[]]
+        self.height = 0
+
+    def new_page(self):
+        self.pages.append([])
+        self.height = 0
+
+    def add_section(self, section, page_width, page_height, margins):
+        """
+        Lay out the ``(text, breaks)`` paragraphs of a section, whose
+        geometry is only known once the whole section has been read.
+        """
+        usable_width = max(page_width - margins[1] - margins[3], AVERAGE_CHAR_WIDTH)
+        usable_height = max(page_height - margins[0] - margins[2], LINE_HEIGHT)
+        chars_per_line = max(1, usable_width // AVERAGE_CHAR_WIDTH)
+        for text, breaks in section:
+            pieces = _split_at(text, breaks)
+            for i, piece in enumerate(pieces):
+                if i:
+                    self.new_page()
+                # A break at the start of a paragraph leaves nothing behind.
+                if piece or i == len(pieces) - 1:
+                    self._add_lines(piece, _line_count(piece, usable_width), usable_height, chars_per_line)
+            self.height += PARAGRAPH_SPACING
+
+    def _add_lines(self, text, lines, usable_height, chars_per_line):
+        while True:
+            room = (usable_height - self.height) // LINE_HEIGHT
+            if room < 1:
+                self.new_page()
+                continue
+            if lines <= room:
+                self.pages[-1].append(text)
+                self.height += lines * LINE_HEIGHT
+                return
+            cut = room * chars_per_line
+            self.pages[-1].append(text[:cut])
+            text, lines = text[cut:], lines - room
+            self.new_page()
+
+    def finish(self):
+        if len(self.pages) > 1 and not self.pages[-1]:
+            self.pages.pop()
+        return self.pages
+
+
+def _docx_pages(archive):
+    """
+    The text of each page of ``word/document.xml``: as Word last rendered
+    it if it left markers, else as estimated.
+    """
+    flow = _PageFlow()
+    rendered = [[]]
+    section = []
+    for event in _docx_events(archive):
+        if event[0] == 'paragraph':
+            _, text, breaks, rendered_breaks = event
+            section.append((text, breaks))
+            pieces = _split_at(text, rendered_breaks)
+            for i, piece in enumerate(pieces):
+                if i:
+                    rendered.append([])
+                if piece or len(pieces) == 1:
+                    rendered[-1].append(piece)
+            continue
+        _, page_width, page_height, margins, new_page = event
+        flow.add_section(section, page_width, page_height, margins)
+        section = []
+        if new_page:
+            flow.new_page()
+    if section:
+        # No body-level section properties: Word's defaults apply.
+        flow.add_section(section, DEFAULT_PAGE_WIDTH, DEFAULT_PAGE_HEIGHT, [DEFAULT_MARGIN] * 4)
+    pages = rendered if len(rendered) > 1 else flow.finish()
+    return ['\n'.join(page) for page in pages]
+
+
+def _split_at(text, offsets):
+    bounds = [0, *offsets, len(text)]
+    return [text[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def _docx_events(archive):
+    """
+    Stream ``word/document.xml`` as a sequence of layout events:
+    ``('paragraph', text, breaks, rendered_breaks)`` with the offsets in
+    ``text`` of the paragraph's explicit and last-rendered page breaks, and
+    ``('section', page_width, page_height, margins, new_page)`` after the
+    last paragraph of each section, since a section's properties are
+    stored at its end (on its last paragraph, or at the end of the body for
+    the final section).
+    """
+    w = f'{{{WORD_NAMESPACE}}}'
+    runs = []
+    offset = 0
+    breaks, rendered_breaks = [], []
+    paragraph_depth = 0
+    section_depth = 0
+    section_end = None
+    page_width, page_height = DEFAULT_PAGE_WIDTH, DEFAULT_PAGE_HEIGHT
+    margins = [DEFAULT_MARGIN] * 4
+
+    with archive.open('word/document.xml') as f:
+        for event, element in ElementTree.iterparse(f, events=('start', 'end')):
+            tag = element.tag
+            if event == 'start':
+                if tag == w + 'p':
+                    paragraph_depth += 1
+                elif tag == w + 'sectPr':
+                    section_depth += 1
+                    if section_depth == 1:
+                        page_width, page_height = DEFAULT_PAGE_WIDTH, DEFAULT_PAGE_HEIGHT
+                        margins = [DEFAULT_MARGIN] * 4
+                continue
+
+            if tag == w + 't':
+                runs.append(element.text or '')
+                offset += len(runs[-1])
+            elif tag == w + 'tab':
+                runs.append('\t')
+                offset += 1
+            elif tag == w + 'br' and element.get(w + 'type') == 'page':
+                breaks.append(offset)
+            elif tag == w + 'lastRenderedPageBreak':
+                rendered_breaks.append(offset)
+            elif tag == w + 'pageBreakBefore' and element.get(w + 'val', 'true') not in ('0', 'false'):
+                breaks.append(offset)
+            elif section_depth == 1 and tag == w + 'pgSz':
+                page_width = int(element.get(w + 'w', page_width))
+                page_height = int(element.get(w + 'h', page_height))
+            elif section_depth == 1 and tag == w + 'pgMar':
+                margins = [
+                    abs(int(element.get(w + side, default)))
+                    for side, default in zip(('top', 'right', 'bottom', 'left'), margins)
+                ]
+            elif tag == w + 'sectPr':
+                section_depth -= 1
+                if section_depth:
+                    # The previous properties inside a tracked change.
+                    continue
+                if paragraph_depth:
+                    # A section break stored on a paragraph ends the section
+                    # after that paragraph; unless it is continuous the next
+                    # one starts on a new page.
+                    section_type = element.find(w + 'type')
+                    kind = section_type.get(w + 'val') if section_type is not None else 'nextPage'
+                    section_end = (page_width, page_height, margins, kind != 'continuous')
+                else:
+                    yield ('section', page_width, page_height, margins, False)
+            elif tag == w + 'p':
+                paragraph_depth -= 1
+                yield ('paragraph', ''.join(runs), breaks, rendered_breaks)
+                runs, offset = [], 0
+                breaks, rendered_breaks = [], []
+                if section_end is not None:
+                    yield ('section', *section_end)
+                    section_end = None
+                element.clear()
+
+
+def _line_count(text, usable_width):
+    chars = len(text) + 3 * text.count('\t')
+    return max(1, math.ceil(chars * AVERAGE_CHAR_WIDTH / usable_width))
+
+
+def iter_pages(path, file_type=None) -> Iterator[str]:
+    """
+    Yield the plain text of each page of the document at ``path``.
+    """
+    if file_type is None:
+        _, ext = os.path.splitext(path)
+        file_type = ext.lower().lstrip('.')
+
+    if file_type == 'pdf':
+        with open(path, 'rb') as f:
+            for page in PyPDF2.PdfReader(f).pages:
+                yield page.extract_text() or ''
+    elif file_type == 'docx':
+        yield from iter_docx_pages(path)
+
+
+def extract_text(path, file_type=None) -> str:
+    """
+    Return the plain text of the document at ``path``.
+    """
+    return '\n\n'.join(iter_pages(path, file_type))
+
+
+_STARTXREF = re.compile(rb'startxref\s+(\d+)')
+_OBJ_HEADER = re.compile(rb'\s*(\d+)\s+(\d+)\s+obj\b')
+_DICT_TOKEN = re.compile(rb'<<|>>')
+_WHITESPACE = b' \t\r\n\f\x00'
+
+
+def _ref(dictionary, key):
+    m = re.search(rb'/' + key + rb'\s+(\d+)\s+(\d+)\s+R\b', dictionary)
+    return int(m.group(1)) if m else None
+
+
+def _int(dictionary, key):
+    m = re.search(rb'/' + key + rb'\s+(\d+)(\s+\d+\s+R\b)?', dictionary)
+    if not m or m.group(2):
+        return None
+    return int(m.group(1))
+
+
+def _int_array(dictionary, key):
+    m = re.search(rb'/' + key + rb'\s*\[([\d\s]*)\]', dictionary)
+    return [int(x) for x in m.group(1).split()] if m else None
+
+
+def _has_name(dictionary, key, value):
+    return re.search(rb'/' + key + rb'\s*/' + value + rb'\b', dictionary) is not None
+
+
+class PdfIndex:
+    """
+    Minimal reader for the cross-reference data of a PDF.
+
+    Supports classic xref tables, xref streams (PDF 1.5+), hybrid files,
+    incremental updates and objects stored inside object streams.
+    """
+    def __init__(self, buf):
+        self.buf = buf
+        self.offsets = {}
+        self.compressed = {}
+        self.trailer = None
+        self._object_streams = {}
+        self._load()
+
+    def page_count(self):
+        root = _ref(self.trailer, b'Root')
+        if root is None:
+            raise PdfStructureError('trailer has no /Root')
+        pages = _ref(self.object(root), b'Pages')
+        if pages is None:
+            raise PdfStructureError('catalog has no /Pages')
+        pages_dict = self.object(pages)
+        count = _int(pages_dict, b'Count')
+        if count is None or not _has_name(pages_dict, b'Type', b'Pages'):
+            raise PdfStructureError('page tree root has no /Count')
+        return count
+
+    def object(self, number):
+        """
+        Return the dictionary of object ``number`` as bytes.
+        """
+        if number in self.compressed and number not in self.offsets:
+            stream_number, index = self.compressed[number]
+            return self._object_stream(stream_number)[index]
+        dictionary, _ = self._dict_at(self._skip_obj_header(self._offset(number)))
+        return dictionary
+
+    def _offset(self, number):
+        try:
+            return self.offsets[number]
+        except KeyError:
+            raise PdfStructureError(f'object {number} is not in the xref') from None
+
+    def _load(self):
+        tail_start = max(0, len(self.buf) - PDF_TAIL_SIZE)
+        matches = list(_STARTXREF.finditer(self.buf, tail_start))
+        if not matches:
+            raise PdfStructureError('no startxref')
+
+        pending = [int(matches[-1].group(1))]
+        seen = set()
+        while pending:
+            offset = pending.pop(0)
+            if offset in seen or offset >= len(self.buf):
+                continue
+            seen.add(offset)
+            if self.buf[offset:offset + 4] == b'xref':
+                trailer = self._read_xref_table(offset)
+            else:
+                trailer = self._read_xref_stream(offset)
+            if self.trailer is None:
+                self.trailer = trailer
+            # Hybrid files keep part of the table in a stream that takes
+            # precedence over the older sections.
+            xref_stream = _int(trailer, b'XRefStm')
+            if xref_stream is not None:
+                pending.insert(0, xref_stream)
+            prev = _int(trailer, b'Prev')
+            if prev is not None:
+                pending.append(prev)
+
+        if self.trailer is None:
+            raise PdfStructureError('no trailer')
+
+    def _read_xref_table(self, offset):
+        end = self.buf.find(b'trailer', offset)
+        if end == -1:
+            raise PdfStructureError('xref table without trailer')
+        tokens = self.buf[offset + 4:end].split()
+        i = 0
+        while i < len(tokens):
+            start, count = int(tokens[i]), int(tokens[i + 1])
+            i += 2
+            for number in range(start, start + count):
+                entry_offset, _, kind = tokens[i:i + 3]
+                i += 3
+                if kind == b'n' and number not in self.offsets and number not in self.compressed:
+                    self.offsets[number] = int(entry_offset)
+        trailer, _ = self._dict_at(end + len(b'trailer'))
+        return trailer
+
+    def _read_xref_stream(self, offset):
+        dictionary, data = self._stream_at(self._skip_obj_header(offset))
+        if not _has_name(dictionary, b'Type', b'XRef'):
+            raise PdfStructureError('startxref does not point at an xref')
+        widths = _int_array(dictionary, b'W')
+        if not widths or len(widths) != 3:
+            raise PdfStructureError('xref stream without /W')
+        index = _int_array(dictionary, b'Index') or [0, _int(dictionary, b'Size') or 0]
+
+        position = 0
+        for start, count in zip(index[0::2], index[1::2]):
+            for number in range(start, start + count):
+                fields = []
+                for width in widths:
+                    fields.append(int.from_bytes(data[position:position + width], 'big') if width else None)
+                    position += width
+                kind = 1 if fields[0] is None else fields[0]
+                if number in self.offsets or number in self.compressed:
+                    continue
+                if kind == 1:
+                    self.offsets[number] = fields[1]
+                elif kind == 2:
+                    self.compressed[number] = (fields[1], fields[2] or 0)
+        if position > len(data):
+            raise PdfStructureError('truncated xref stream')
+        return dictionary
+
+    def _object_stream(self, number):
+        if number not in self._object_streams:
+            dictionary, data = self._stream_at(self._skip_obj_header(self._offset(number)))
+            count, first = _int(dictionary, b'N'), _int(dictionary, b'First')
+            if count is None or first is None:
+                raise PdfStructureError(f'object stream {number} without /N or /First')
+            header = [int(x) for x in data[:first].split()]
+            starts = [first + header[2 * i + 1] for i in range(count)]
+            ends = starts[1:] + [len(data)]
+            self._object_streams[number] = [data[s:e] for s, e in zip(starts, ends)]
+        return self._object_streams[number]
+
+    def _skip_obj_header(self, offset):
+        m = _OBJ_HEADER.match(self.buf, offset)
+        if not m:
+            raise PdfStructureError(f'no object at offset {offset}')
+        return m.end()
+
+    def _dict_at(self, position):
+        """
+        Return the ``<< ... >>`` dictionary starting at or after ``position``
+        and the offset just past it.
+        """
+        start = self.buf.find(b'<<', position, position + PDF_MAX_OBJECT_SIZE)
+        if start == -1:
+            raise PdfStructureError(f'no dictionary at offset {position}')
+        depth = 0
+        for m in _DICT_TOKEN.finditer(self.buf, start, start + PDF_MAX_OBJECT_SIZE):
+            depth += 1 if m.group() == b'<<' else -1
+            if depth == 0:
+                return self.buf[start:m.end()], m.end()
+        raise PdfStructureError(f'unterminated dictionary at offset {start}')
+
+    def _stream_at(self, position):
+        dictionary, end = self._dict_at(position)
+        while end < len(self.buf) and self.buf[end] in _WHITESPACE:
+            end += 1
+        if self.buf[end:end + 6] != b'stream':
+            raise PdfStructureError(f'expected stream at offset {end}')
+        start = end + 6
+        if self.buf[start:start + 2] == b'\r\n':
+            start += 2
+        elif self.buf[start:start + 1] in (b'\n', b'\r'):
+            start += 1
+
+        length = _int(dictionary, b'Length')
+        if length is None:
+            length_ref = _ref(dictionary, b'Length')
+            if length_ref is not None and length_ref in self.offsets:
+                m = re.match(rb'\s*(\d+)', self.buf, self._skip_obj_header(self.offsets[length_ref]))
+                length = int(m.group(1)) if m else None
+        if length is None:
+            stop = self.buf.find(b'endstream', start)
+            if stop == -1:
+                raise PdfStructureError(f'unterminated stream at offset {start}')
+            length = len(self.buf[start:stop].rstrip(b'\r\n'))
+        return dictionary, _decode_stream(dictionary, self.buf[start:start + length])
+
+
+def _decode_stream(dictionary, data):
+    if re.search(rb'/Filter\s*\[?\s*/FlateDecode\s*\]?', dictionary):
+        data = zlib.decompress(data)
+    elif re.search(rb'/Filter\b', dictionary):
+        raise PdfStructureError('unsupported stream filter')
+
+    predictor = _int(dictionary, b'Predictor') or 1
+    if predictor >= 10:
+        data = _png_unpredict(data, _int(dictionary, b'Columns') or 1)
+    elif predictor != 1:
+        raise PdfStructureError(f'unsupported predictor {predictor}')
+    return data
+
+
+def _png_unpredict(data, columns):
+    """
+    Undo the PNG row filters used by xref and object streams.
+    """
+    row_size = columns + 1
+    previous = bytearray(columns)
+    out = bytearray()
+    for i in range(0, len(data), row_size):
+        kind, row = data[i], bytearray(data[i + 1:i + row_size])
+        if kind == 2:
+            # "Up" is what nearly every writer uses, so give it a fast path.
+            row = bytearray(map(lambda a, b: (a + b) & 0xff, row, previous))
+            kind = 0
+        for j in range(len(row) if kind else 0):
+            left = row[j - 1] if j else 0
+            up = previous[j]
+            if kind == 1:
+                row[j] = (row[j] + left) & 0xff
+            elif kind == 2:
+                row[j] = (row[j] + up) & 0xff
+            elif kind == 3:
+                row[j] = (row[j] + ((left + up) >> 1)) & 0xff
+            elif kind == 4:
+                upper_left = previous[j - 1] if j else 0
+                p = left + up - upper_left
+                pa, pb, pc = abs(p - left), abs(p - up), abs(p - upper_left)
+                row[j] = (row[j] + (left if pa <= pb and pa <= pc else up if pb <= pc else upper_left)) & 0xff
+            elif kind != 0:
+                raise PdfStructureError(f'unknown PNG filter {kind}')
+        out += row
+        previous = row
+    return bytes(out)
+
+
+def legacy_extract_metadata(path, file_type=None) -> DocumentMetadata:
+    """
+    The previous in-request extraction, which copies the whole file into
+    memory. Kept for ``manage.py benchmark_extraction`` comparisons.
+    """
+    import io
+    import docx
+
+    if file_type is None:
+        _, ext = os.path.splitext(path)
+        file_type = ext.lower().lstrip('.')
+    metadata = DocumentMetadata(file_type=file_type, file_size=os.path.getsize(path))
+    with open(path, 'rb') as f:
+        if file_type == 'pdf':
+            metadata.page_count = len(PyPDF2.PdfReader(io.BytesIO(f.read())).pages)
+        elif file_type == 'docx':
+            metadata.page_count = len(docx.Document(io.BytesIO(f.read())).paragraphs)
+    return metadata
+
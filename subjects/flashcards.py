@@ -0,0 +1,217 @@
+"""
+Offline flashcard generation from the stored page text.
+
+Cards are found with cheap line and sentence heuristics, without any model
+or network access:
+
+* definitions - ``Term: definition`` and ``Term - definition`` lines, and
+  sentences such as "X is defined as ..." or "X refers to ...",
+* headings - short, title-like lines; the back is the start of the text
+  that follows,
+* key phrases - phrases set in capitals or in quotes; the back is the
+  sentence they appear in.
+
+Extracted text carries no formatting, so emphasis is recognised from
+capitals and quotes rather than from bold type. Pages are read from the page
+store (``pages.py``) one at a time, so the original files are never opened.
+
+Cards are identified by their front within a document. Generating again
+updates the backs of existing cards, adds new ones and removes those no
+longer found, so anything attached to a card that is still there is kept.
+"""
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import transaction
+
+from . import scheduling
+from .models import Document, DocumentPage, Flashcard
+
+MAX_FRONT_LENGTH = 255
+MAX_BACK_LENGTH = 500
+MIN_BACK_LENGTH = 20
+MAX_TERM_WORDS = 6
+MAX_HEADING_LENGTH = 80
+MAX_HEADING_WORDS = 10
+
+# Rows written per query.
+BATCH_SIZE = 500
+
+_DEFINITION_LINE = re.compile(
+    r'^(?:[-•*]\s*)?(?P<term>[A-Z][^:–—]{1,60}?)\s*(?::|\s[-–—]\s)\s*(?P<definition>\S.{9,})$'
+)
+_DEFINITION_SENTENCE = re.compile(
+    r'(?:^|[.!?]\s+)(?P<term>[A-Z][\w\'-]*(?:\s+[\w\'-]+){0,5}?)\s+'
+    r'(?:(?:is|are) defined as|refers? to|means?)\s+'
+    r'(?P<definition>[^.!?]{10,400})[.!?]'
+)
+_NUMBERED_HEADING = re.compile(r'^(?:\d+(?:\.\d+)*\.?|[IVXLC]+\.|[A-Z]\.)\s+\S')
+_CAPITALS = re.compile(r'\b[A-Z][A-Z\'-]+(?:\s+[A-Z][A-Z\'-]+){1,5}\b')
+_QUOTED = re.compile(r'["“](?P<phrase>[^"“”]{3,60})["”]')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=["“]?[A-Z])')
+_LEADING_ARTICLE = re.compile(r'^(?:the|a|an)\s+', re.IGNORECASE)
+_SMALL_WORDS = frozenset(('a', 'an', 'and', 'as', 'at', 'by', 'for', 'in', 'of', 'on', 'or', 'the', 'to', 'with'))
+
+
+@dataclass
+class Card:
+    kind: str
+    front: str
+    back: str
+    page: int
+
+
+def get_max_cards():
+    return getattr(settings, 'FLASHCARDS_MAX_PER_DOCUMENT', 200)
+
+
+def clip(text, length):
+    if len(text) <= length:
+        return text
+    cut = text.rfind(' ', 0, length - 1)
+    return text[:cut if cut > 0 else length - 1] + '…'
+
+
+def is_heading(line):
+    if not 3 <= len(line) <= MAX_HEADING_LENGTH or line[-1] in '.,;:!?':
+        return False
+    words = line.split()
+    if len(words) > MAX_HEADING_WORDS:
+        return False
+    if _NUMBERED_HEADING.match(line) or line.isupper():
+        return True
+    significant = [word for word in words if word.lower() not in _SMALL_WORDS]
+    return bool(significant) and all(word[0].isupper() or not word[0].isalpha() for word in significant)
+
+
+def term_of(text):
+    term = _LEADING_ARTICLE.sub('', text.strip(' \t-*•'))
+    if not term or len(term.split()) > MAX_TERM_WORDS:
+        return None
+    return term[0].upper() + term[1:]
+
+
+def page_cards(number, text):
+    """
+    Yield the cards found on one page.
+    """
+    lines = [line.strip() for line in text.splitlines()]
+    for index, line in enumerate(lines):
+        if not line:
+            continue
+        match = _DEFINITION_LINE.match(line)
+        if match:
+            term = term_of(match['term'])
+            if term:
+                yield Card(Flashcard.KIND_DEFINITION, term, match['definition'], number)
+                continue
+        if is_heading(line):
+            body = []
+            for following in lines[index + 1:]:
+                if not following:
+                    if body:
+                        break
+                    continue
+                if is_heading(following):
+                    break
+                body.append(following)
+                if sum(len(part) for part in body) >= MAX_BACK_LENGTH:
+                    break
+            back = ' '.join(body)
+            if len(back) >= MIN_BACK_LENGTH:
+                yield Card(Flashcard.KIND_HEADING, line.rstrip(), back, number)
+
+    flowing = ' '.join(text.split())
+    for match in _DEFINITION_SENTENCE.finditer(flowing):
+        term = term_of(match['term'])
+        if term:
+            yield Card(Flashcard.KIND_DEFINITION, term, match['definition'].strip(), number)
+    for sentence in _SENTENCE_END.split(flowing):
+        if len(sentence) < MIN_BACK_LENGTH:
+            continue
+        phrases = [match.group(0) for match in _CAPITALS.finditer(sentence)]
+        phrases += [match['phrase'] for match in _QUOTED.finditer(sentence)]
+        for phrase in phrases:
+            # A line set entirely in capitals is a heading, not emphasis.
+            if len(phrase.split()) <= MAX_TERM_WORDS and len(sentence) - len(phrase) >= MIN_BACK_LENGTH:
+                yield Card(Flashcard.KIND_PHRASE, phrase.strip(), sentence, number)
+
+
+def generate_cards(pages, limit=None):
+    """
+    Return the cards for ``(number, text)`` pages, at most one per front
+    (compared case-insensitively) and at most ``limit`` in total.
+    """
+    cards = []
+    seen = set()
+    for number, text in pages:
+        for card in page_cards(number, text):
+            card.front = clip(card.front, MAX_FRONT_LENGTH)
+            card.back = clip(card.back, MAX_BACK_LENGTH)
+            key = card.front.casefold()
+            if key in seen:
+                continue
+            seen.add(key)
+            cards.append(card)
+            if limit is not None and len(cards) >= limit:
+                return cards
+    return cards
+
+
+def document_pages(document):
+    for page in DocumentPage.objects.filter(blob_id=document.blob_id).order_by('number').iterator():
+        yield page.number, page.text
+
+
+def generate_for_document(document, user_id):
+    """
+    Replace the generated cards of ``document``, whose owner is ``user_id``;
+    new cards are scheduled for review. Returns a ``Counter`` of created,
+    updated and deleted cards.
+    """
+    counts = Counter()
+    if document.blob_id is None:
+        return counts
+    cards = generate_cards(document_pages(document), limit=get_max_cards())
+    with transaction.atomic():
+        existing = {card.front.casefold(): card for card in Flashcard.objects.filter(document=document)}
+        new, changed = [], []
+        for card in cards:
+            current = existing.pop(card.front.casefold(), None)
+            if current is None:
+                new.append(Flashcard(
+                    topic_id=document.topic_id,
+                    document=document,
+                    page=card.page,
+                    kind=card.kind,
+                    front=card.front,
+                    back=card.back,
+                ))
+            else:
+                values = (card.kind, card.back, card.page, document.topic_id)
+                if (current.kind, current.back, current.page, current.topic_id) != values:
+                    current.kind, current.back, current.page, current.topic_id = values
+                    changed.append(current)
+        Flashcard.objects.bulk_create(new, batch_size=BATCH_SIZE)
+        scheduling.enroll(user_id, new)
+        Flashcard.objects.bulk_update(changed, ['kind', 'back', 'page', 'topic'], batch_size=BATCH_SIZE)
+        if existing:
+            Flashcard.objects.filter(pk__in=[card.pk for card in existing.values()]).delete()
+    counts['created'] += len(new)
+    counts['updated'] += len(changed)
+    counts['deleted'] += len(existing)
+    return counts
+
+
+def generate_for_topic(topic):
+    """
+    Generate the cards of every ready document of ``topic``.
+    """
+    counts = Counter()
+    user_id = topic.subject.user_id
+    documents = Document.objects.filter(topic=topic, status=Document.STATUS_READY).only('topic_id', 'blob_id')
+    for document in documents.iterator():
+        counts += generate_for_document(document, user_id)
+    return counts
@@ -1,26 +1,37 @@
 from django import forms
 from django.utils.translation import gettext_lazy as _
-import PyPDF2
-import docx
-import io
 import os
-from .models import Subject, Topic, Document
+import zipfile
+from django.conf import settings
+from .models import Subject, Topic, Document, UploadSession
+from . import ingestion, tags as subject_tags
 
 class SubjectForm(forms.ModelForm):
     """
     Form for creating and editing subjects.
     """
+    tags = forms.CharField(
+        label=_('Tags'),
+        required=False,
+        max_length=1000,
+        widget=forms.TextInput(attrs={'placeholder': _('Enter comma-separated tags')}),
+    )
+
     class Meta:
         model = Subject
-        fields = ['name', 'description', 'tags']
+        fields = ['name', 'description']
         widgets = {
             'description': forms.Textarea(attrs={'rows': 4}),
-            'tags': forms.TextInput(attrs={'placeholder': _('Enter comma-separated tags')}),
         }
 
     def __init__(self, *args, **kwargs):
         self.user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.initial['tags'] = ', '.join(tag.name for tag in self.instance.tags.all())
+
+    def clean_tags(self):
+        return subject_tags.parse(self.cleaned_data['tags'])
 
     def save(self, commit=True):
         instance = super().save(commit=False)
@@ -28,8 +39,14 @@ class SubjectForm(forms.ModelForm):
             instance.user = self.user
         if commit:
             instance.save()
+            self._save_tags()
+        else:
+            self.save_m2m = self._save_tags
         return instance
 
+    def _save_tags(self):
+        subject_tags.set_tags(self.instance, self.cleaned_data['tags'])
+
 
 class TopicForm(forms.ModelForm):
     """
@@ -104,36 +121,112 @@ class DocumentForm(forms.ModelForm):
         if self.subject:
             instance.subject = self.subject
 
-        # Extract metadata from the file
+        # Record what is known without opening the file; page count and other
+        # metadata are filled in by the ingestion workers.
         file = self.cleaned_data.get('file')
         if file:
-            # Get file size
             instance.file_size = file.size
-
-            # Get file type
             _, ext = os.path.splitext(file.name)
             instance.file_type = ext.lower().lstrip('.')
-
-            # Get page count
-            try:
-                if instance.file_type == 'pdf':
-                    # Reset file pointer to beginning
-                    file.seek(0)
-                    reader = PyPDF2.PdfReader(io.BytesIO(file.read()))
-                    instance.page_count = len(reader.pages)
-                elif instance.file_type == 'docx':
-                    # Reset file pointer to beginning
-                    file.seek(0)
-                    doc = docx.Document(io.BytesIO(file.read()))
-                    instance.page_count = len(doc.paragraphs)
-            except Exception as e:
-                # If we can't get page count, just leave it as None
-                pass
-
-            # Reset file pointer to beginning for saving
-            file.seek(0)
+            instance.page_count = None
+            instance.status = Document.STATUS_PENDING
 
         if commit:
             instance.save()
+            ingestion.enqueue(instance)
+
+        return instance
+
+
+class UploadSessionForm(forms.ModelForm):
+    """
+    Form for starting a resumable upload; the file itself arrives in chunks.
+    """
+    class Meta:
+        model = UploadSession
+        fields = ['title', 'document_type', 'topic', 'filename', 'size']
+
+    def __init__(self, *args, **kwargs):
+        self.subject = kwargs.pop('subject')
+        super().__init__(*args, **kwargs)
+        self.fields['topic'].queryset = Topic.objects.filter(subject=self.subject)
+
+    def clean_filename(self):
+        filename = os.path.basename(self.cleaned_data['filename'])
+        _root, ext = os.path.splitext(filename)
+        if ext.lower().lstrip('.') not in ['pdf', 'docx']:
+            raise forms.ValidationError(_('Only PDF and DOCX files are allowed.'))
+        return filename
+
+    def clean_size(self):
+        size = self.cleaned_data['size']
+        max_size = getattr(settings, 'RESUMABLE_UPLOAD_MAX_SIZE', 2 * 1024 ** 3)
+        if size == 0:
+            raise forms.ValidationError(_('The file is empty.'))
+        if size > max_size:
+            raise forms.ValidationError(_('Files can be at most %(size)s bytes.') % {'size': max_size})
+        return size
 
+    def save(self, commit=True):
+        instance = super().save(commit=False)
+        instance.subject = self.subject
+        if commit:
+            instance.save()
         return instance
+
+
+class MultipleFileInput(forms.ClearableFileInput):
+    allow_multiple_selected = True
+
+
+class MultipleFileField(forms.FileField):
+    """
+    File field accepting several files; cleans to a list.
+    """
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('widget', MultipleFileInput())
+        super().__init__(*args, **kwargs)
+
+    def clean(self, data, initial=None):
+        if isinstance(data, (list, tuple)):
+            return [super(MultipleFileField, self).clean(item, initial) for item in data]
+        file = super().clean(data, initial)
+        return [file] if file else []
+
+
+class BulkUploadForm(forms.Form):
+    """
+    Form for importing many documents into a subject at once.
+    """
+    files = MultipleFileField(label=_('Files'), required=False)
+    archive = forms.FileField(
+        label=_('Zip archive'),
+        required=False,
+        help_text=_('Top-level folders become topics.')
+    )
+    topic = forms.ModelChoiceField(
+        label=_('Topic'),
+        queryset=Topic.objects.none(),
+        required=False,
+        help_text=_('For the selected files and files outside folders in the archive.')
+    )
+    document_type = forms.ChoiceField(label=_('Document type'), choices=Document.DOCUMENT_TYPES)
+
+    def __init__(self, *args, **kwargs):
+        self.subject = kwargs.pop('subject')
+        super().__init__(*args, **kwargs)
+        self.fields['topic'].queryset = Topic.objects.filter(subject=self.subject)
+
+    def clean_archive(self):
+        archive = self.cleaned_data.get('archive')
+        if archive and not zipfile.is_zipfile(archive):
+            raise forms.ValidationError(_('Upload a zip archive.'))
+        return archive
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('files') and not cleaned_data.get('archive'):
+            raise forms.ValidationError(_('Select files or a zip archive to import.'))
+        if cleaned_data.get('files') and not cleaned_data.get('topic'):
+            self.add_error('topic', _('Choose the topic for the selected files.'))
+        return cleaned_data
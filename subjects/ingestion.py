@@ -0,0 +1,348 @@
+"""
+Background ingestion of uploaded documents.
+
+Uploads are stored and saved with ``status='pending'``; the expensive work
+(opening the file, extracting metadata such as the page count, storing the
+text of each page and indexing it for search) happens outside the
+request/response cycle. Two queue backends are available and selected with
+the ``INGESTION_QUEUE_BACKEND`` setting:
+
+* ``'inprocess'`` - a thread pool inside the web process picks the document
+  up as soon as the upload transaction commits. A sweeper thread, started
+  with the web process, returns stale documents to the queue and picks up
+  pending ones every ``INGESTION_SWEEP_INTERVAL`` seconds: retries, and
+  uploads whose job was lost with a crashed process.
+* ``'database'`` - the ``documents`` table itself is the queue; pending rows
+  are claimed by workers started with ``manage.py run_ingestion_workers``.
+
+Both backends share the same claim/retry logic, so a document can never be
+processed twice concurrently and failures are retried up to
+``INGESTION_MAX_ATTEMPTS`` times before the document is marked as failed.
+A document that failed waits ``INGESTION_RETRY_DELAY`` seconds, doubled with
+every attempt, before it can be claimed again.
+Files are parsed in the sandboxed extraction pool (``sandbox.py``); a file
+that is invalid or exceeds its time or memory limit fails right away. Ready
+documents then get their page previews rendered (``previews.py``).
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import cache, extraction, pages, previews, sandbox, search, vectors
+from .models import Document
+
+logger = logging.getLogger(__name__)
+
+# Documents the in-process sweeper queues at a time.
+SWEEP_BATCH_SIZE = 100
+
+
+def get_setting(name, default):
+    return getattr(settings, name, default)
+
+
+class ExtractionFailed(Exception):
+    """
+    The sandboxed extraction returned an error ``result``.
+    """
+    def __init__(self, result):
+        super().__init__(str(result))
+        self.result = result
+
+
+def extract_metadata(document):
+    """
+    Fill in type, size and page count on the document.
+
+    Metadata is stored on the blob, so content that was extracted before
+    (for any document) is not read again.
+    """
+    blob = document.blob
+    if blob is not None and blob.is_extracted:
+        document.file_type = blob.file_type
+        document.file_size = blob.size
+        document.page_count = blob.page_count
+        return
+
+    with extraction.local_path(document.file) as path:
+        result = sandbox.extract_metadata(path, content_hash=blob.sha256 if blob else None)
+    if not result.ok:
+        raise ExtractionFailed(result)
+    metadata = result.metadata
+    document.file_type = metadata.file_type
+    document.file_size = metadata.file_size
+    document.page_count = metadata.page_count
+    if blob is not None:
+        blob.mark_extracted(metadata.page_count)
+
+
+def page_texts(document):
+    """
+    Return the text of each page of the document.
+
+    The pages are extracted and stored the first time the content is seen
+    and read back from the page store afterwards. There are as many as the
+    document's page count.
+    """
+    blob = document.blob
+    if blob is not None and pages.has_pages(blob):
+        return pages.iter_text(blob)
+    with extraction.local_path(document.file) as path:
+        result = sandbox.extract_pages(path, document.file_type)
+    if not result.ok:
+        raise ExtractionFailed(result)
+    texts = extraction.fit_pages(result.pages, document.page_count)
+    if blob is not None:
+        pages.store(blob, texts)
+    return texts
+
+
+def index_document(document):
+    """
+    Store the document's pages and put its text into the search index and
+    the vector index.
+    """
+    texts = list(page_texts(document))
+    backend = search.get_backend()
+    if backend.indexes_content:
+        backend.index_document(document, '\n\n'.join(texts))
+    vectors.index_document(document, texts)
+
+
+def retry_delay(attempts):
+    """
+    Seconds a document waits after its ``attempts``-th failed attempt.
+    """
+    return get_setting('INGESTION_RETRY_DELAY', 5) * 2 ** max(attempts - 1, 0)
+
+
+def due(now=None):
+    """
+    Filter for pending documents that can be claimed: new ones, and failed
+    ones whose retry delay is over.
+    """
+    now = now or timezone.now()
+    max_attempts = get_setting('INGESTION_MAX_ATTEMPTS', 3)
+    condition = Q(attempts=0) | Q(status_changed_at__isnull=True)
+    for attempts in range(1, max_attempts):
+        condition |= Q(attempts=attempts, status_changed_at__lte=now - timedelta(seconds=retry_delay(attempts)))
+    # Documents requeued after a crash may have used up their attempts.
+    condition |= Q(
+        attempts__gte=max_attempts,
+        status_changed_at__lte=now - timedelta(seconds=retry_delay(max_attempts)),
+    )
+    return Q(status=Document.STATUS_PENDING) & condition
+
+
+def claim(document_id):
+    """
+    Atomically move a pending document to processing.
+    Returns True if this caller won the claim.
+    """
+    return Document.objects.filter(
+        pk=document_id,
+        status=Document.STATUS_PENDING,
+    ).update(
+        status=Document.STATUS_PROCESSING,
+        attempts=F('attempts') + 1,
+        status_changed_at=timezone.now(),
+        updated_at=timezone.now(),
+    ) == 1
+
+
+def claim_next():
+    """
+    Claim the oldest due document, or return None if there is none.
+    """
+    while True:
+        document_id = Document.objects.filter(due()).order_by('uploaded_at', 'id').values_list('id', flat=True).first()
+        if document_id is None:
+            return None
+        if claim(document_id):
+            return document_id
+
+
+def requeue_stale(older_than=None):
+    """
+    Return documents stuck in processing (e.g. after a worker crash) to the queue.
+    """
+    if older_than is None:
+        older_than = get_setting('INGESTION_STALE_AFTER', 600)
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    return Document.objects.filter(
+        status=Document.STATUS_PROCESSING,
+        status_changed_at__lt=cutoff,
+    ).update(
+        status=Document.STATUS_PENDING,
+        status_changed_at=timezone.now(),
+        updated_at=timezone.now(),
+    )
+
+
+def process(document_id):
+    """
+    Process a document that has already been claimed.
+    Returns the resulting status, or None if the document no longer exists.
+    """
+    document = Document.objects.select_related('subject', 'topic').filter(pk=document_id).first()
+    if document is None:
+        return None
+    try:
+        extract_metadata(document)
+        index_document(document)
+    except Exception as e:
+        logger.warning('Ingestion of document %s failed (attempt %s): %s', document_id, document.attempts, e)
+        permanent = isinstance(e, ExtractionFailed) and not e.result.retryable
+        if permanent or document.attempts >= get_setting('INGESTION_MAX_ATTEMPTS', 3):
+            status = Document.STATUS_FAILED
+        else:
+            status = Document.STATUS_PENDING
+        Document.objects.filter(pk=document_id).update(
+            status=status,
+            last_error=f'{type(e).__name__}: {e}',
+            status_changed_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+        cache.invalidate_user(document.user_id)
+        return status
+
+    Document.objects.filter(pk=document_id).update(
+        file_type=document.file_type,
+        file_size=document.file_size,
+        page_count=document.page_count,
+        status=Document.STATUS_READY,
+        last_error='',
+        status_changed_at=timezone.now(),
+        updated_at=timezone.now(),
+    )
+    cache.invalidate_user(document.user_id)
+    # The document is usable without previews, so they don't hold it up.
+    try:
+        previews.render_document(document)
+    except Exception:
+        logger.exception('Rendering previews of document %s failed', document_id)
+    return Document.STATUS_READY
+
+
+def run_job(document_id):
+    """
+    Claim and process a single document. One that fails with a retryable
+    error stays pending and is picked up again once its retry delay is over.
+    Returns the resulting status, or None if the document wasn't claimed.
+    """
+    try:
+        if claim(document_id):
+            return process(document_id)
+    except Exception:
+        logger.exception('Unexpected error while ingesting document %s', document_id)
+    finally:
+        close_old_connections()
+    return None
+
+
+class DatabaseQueue:
+    """
+    Queue backed by the documents table; workers poll for pending rows.
+    """
+    def enqueue(self, document_id):
+        # The pending row is the job, nothing else to do.
+        pass
+
+
+class InProcessQueue:
+    """
+    Queue backed by a thread pool living in the current process, and a
+    sweeper thread that queues due documents nobody else has queued.
+    """
+    def __init__(self, workers, sweep_interval):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ingestion')
+        self.sweep_interval = sweep_interval
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._sweeper = None
+
+    def start(self):
+        with self._lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._sweep_forever, name='ingestion-sweeper', daemon=True)
+                self._sweeper.start()
+
+    def enqueue(self, document_id):
+        with self._lock:
+            if document_id in self._queued:
+                return
+            self._queued.add(document_id)
+        self.executor.submit(self._run, document_id)
+
+    def _run(self, document_id):
+        with self._lock:
+            self._queued.discard(document_id)
+        run_job(document_id)
+
+    def sweep(self):
+        """
+        Return stale documents to the queue and queue the due ones.
+        """
+        try:
+            requeued = requeue_stale()
+            if requeued:
+                logger.info('Requeued %s stale document(s).', requeued)
+            document_ids = Document.objects.filter(due()).order_by('uploaded_at', 'id').values_list('id', flat=True)
+            for document_id in document_ids[:SWEEP_BATCH_SIZE]:
+                self.enqueue(document_id)
+        finally:
+            close_old_connections()
+
+    def _sweep_forever(self):
+        while True:
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception('Sweeping the ingestion queue failed')
+            time.sleep(self.sweep_interval)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            backend = get_setting('INGESTION_QUEUE_BACKEND', 'inprocess')
+            if backend == 'database':
+                _queue = DatabaseQueue()
+            elif backend == 'inprocess':
+                _queue = InProcessQueue(
+                    get_setting('INGESTION_WORKERS', 2),
+                    get_setting('INGESTION_SWEEP_INTERVAL', 30),
+                )
+            else:
+                raise ValueError(f'Unknown ingestion queue backend: {backend!r}')
+        return _queue
+
+
+def start():
+    """
+    Start the in-process queue's sweeper with the web process, so documents
+    a crashed process left behind are picked up without waiting for the
+    next upload.
+    """
+    if get_setting('INGESTION_QUEUE_BACKEND', 'inprocess') == 'inprocess':
+        get_queue().start()
+
+
+def enqueue(document):
+    """
+    Schedule a saved document for ingestion once the current transaction commits.
+    """
+    document_id = document.pk
+    transaction.on_commit(lambda: get_queue().enqueue(document_id))
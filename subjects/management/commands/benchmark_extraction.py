@@ -0,0 +1,186 @@
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import time
+import zipfile
+
+from django.core.management.base import BaseCommand
+
+from subjects import extraction
+
+MB = 1024 * 1024
+
+
+def write_pdf(path, size):
+    """
+    Write a valid PDF of roughly ``size`` bytes, padded with page content.
+    """
+    pages = max(1, size // (2 * MB))
+    per_page = max(0, size // pages - 200)
+    offsets = {}
+    with open(path, 'wb') as f:
+        def start(number):
+            offsets[number] = f.tell()
+            f.write(b'%d 0 obj\n' % number)
+
+        f.write(b'%PDF-1.4\n')
+        start(1)
+        f.write(b'<< /Type /Catalog /Pages 2 0 R >>\nendobj\n')
+        start(2)
+        kids = b' '.join(b'%d 0 R' % (3 + 2 * i) for i in range(pages))
+        f.write(b'<< /Type /Pages /Kids [%s] /Count %d >>\nendobj\n' % (kids, pages))
+        for i in range(pages):
+            page, content = 3 + 2 * i, 4 + 2 * i
+            start(page)
+            f.write(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R >>\nendobj\n' % content)
+            start(content)
+            f.write(b'<< /Length %d >>\nstream\n' % per_page)
+            remaining = per_page
+            while remaining:
+                chunk = min(remaining, MB)
+                f.write(os.urandom(chunk))
+                remaining -= chunk
+            f.write(b'\nendstream\nendobj\n')
+
+        xref = f.tell()
+        count = 3 + 2 * pages
+        f.write(b'xref\n0 %d\n0000000000 65535 f \n' % count)
+        for number in range(1, count):
+            f.write(b'%010d 00000 n \n' % offsets[number])
+        f.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (count, xref))
+    return pages
+
+
+def write_docx(path, size):
+    """
+    Write a DOCX of roughly ``size`` bytes; the bulk is an embedded media part.
+    """
+    content_types = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Default Extension="bin" ContentType="application/octet-stream"/>'
+        '<Override PartName="/word/document.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+        '<Override PartName="/docProps/app.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.extended-properties+xml"/>'
+        '</Types>'
+    )
+    rels = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="word/document.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '<Relationship Id="rId2" Target="docProps/app.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/extended-properties"/>'
+        '</Relationships>'
+    )
+    pages = max(1, size // (2 * MB))
+    paragraphs = ''.join('<w:p><w:r><w:t>Paragraph %d</w:t></w:r></w:p>' % i for i in range(pages * 40))
+    document = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        '<w:body>%s</w:body></w:document>' % paragraphs
+    )
+    app = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<Properties xmlns="%s"><Pages>%d</Pages></Properties>' % (extraction.APP_XML_NAMESPACE, pages)
+    )
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', content_types)
+        archive.writestr('_rels/.rels', rels)
+        archive.writestr('word/document.xml', document)
+        archive.writestr('docProps/app.xml', app)
+        with archive.open(zipfile.ZipInfo('word/media/blob.bin'), 'w', force_zip64=True) as media:
+            remaining = size
+            while remaining > 0:
+                chunk = min(remaining, MB)
+                media.write(os.urandom(chunk))
+                remaining -= chunk
+    return pages
+
+
+def current_rss():
+    """
+    Resident set size of this process in KB (falls back to the peak off Linux).
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(path, legacy, results):
+    """
+    Runs in a fresh process so the peak RSS reflects a single extraction.
+    """
+    baseline = current_rss()
+    func = extraction.legacy_extract_metadata if legacy else extraction.extract_metadata
+    started = time.perf_counter()
+    metadata = func(path)
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((elapsed, baseline, peak, metadata.page_count))
+
+
+class Command(BaseCommand):
+    help = 'Compare peak RSS and latency of streaming and legacy metadata extraction.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1, 50, 500],
+            help='Input sizes in MB (default: 1 50 500).',
+        )
+        parser.add_argument(
+            '--types',
+            nargs='+',
+            choices=['pdf', 'docx'],
+            default=['pdf', 'docx'],
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Runs per case; the fastest latency is reported.',
+        )
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('spawn')
+        workdir = tempfile.mkdtemp(prefix='luminote-bench-')
+        try:
+            self.stdout.write(
+                f"{'file':<12}{'path':<11}{'pages':>7}{'latency ms':>13}{'peak RSS MB':>14}{'delta MB':>11}"
+            )
+            for file_type in options['types']:
+                for size in options['sizes']:
+                    path = os.path.join(workdir, f'{size}mb.{file_type}')
+                    writer = write_pdf if file_type == 'pdf' else write_docx
+                    writer(path, size * MB)
+                    for legacy in (True, False):
+                        runs = [self.run_case(context, path, legacy) for _ in range(max(1, options['repeat']))]
+                        elapsed = min(run[0] for run in runs)
+                        baseline = min(run[1] for run in runs)
+                        peak = max(run[2] for run in runs)
+                        self.stdout.write(
+                            f"{f'{size}MB {file_type}':<12}{'legacy' if legacy else 'streaming':<11}"
+                            f"{runs[0][3] or '-':>7}{elapsed * 1000:>13.1f}"
+                            f"{peak / 1024:>14.1f}{(peak - baseline) / 1024:>11.1f}"
+                        )
+                    os.remove(path)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def run_case(self, context, path, legacy):
+        results = context.Queue()
+        process = context.Process(target=measure, args=(path, legacy, results))
+        process.start()
+        result = results.get()
+        process.join()
+        return result
@@ -0,0 +1,66 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from subjects import flashcards
+
+WORDS = (
+    'cell membrane protein energy enzyme structure system process function reaction '
+    'market demand supply price contract liability court statute theory model'
+).split()
+
+
+def sample_page(rng, number):
+    """
+    A page of text with the structures the generator looks for: a numbered
+    heading, definition lines and sentences, capitals and quotes.
+    """
+    def phrase(count):
+        return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+    lines = [f'{number}.1 {phrase(3).title()}', '']
+    for _ in range(6):
+        lines.append(f'{phrase(2).capitalize()}: {phrase(12)}.')
+    lines.append('')
+    for _ in range(20):
+        sentence = f'{phrase(2).capitalize()} {number} is defined as {phrase(10)}.'
+        filler = ' '.join(f'{phrase(14).capitalize()}.' for _ in range(3))
+        lines.append(f'{sentence} {filler} The {phrase(2).upper()} rule and the "{phrase(2)}" test apply.')
+    return '\n'.join(lines)
+
+
+class Command(BaseCommand):
+    help = 'Measure flashcard generation throughput on synthetic page text (no database writes).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages',
+            type=int,
+            default=2000,
+            help='Number of pages to generate cards from (default: 2000).',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Runs; the fastest is reported.',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        pages = [(number, sample_page(rng, number)) for number in range(1, options['pages'] + 1)]
+        characters = sum(len(text) for _number, text in pages)
+
+        timings = []
+        for _ in range(max(1, options['repeat'])):
+            started = time.perf_counter()
+            cards = flashcards.generate_cards(pages)
+            timings.append(time.perf_counter() - started)
+        elapsed = min(timings)
+
+        self.stdout.write(f"{'pages':>8}{'MB text':>10}{'cards':>9}{'seconds':>10}{'pages/s':>10}{'cards/s':>10}")
+        self.stdout.write(
+            f'{len(pages):>8}{characters / 1024 / 1024:>10.1f}{len(cards):>9}{elapsed:>10.2f}'
+            f'{len(pages) / elapsed:>10.0f}{len(cards) / elapsed:>10.0f}'
+        )
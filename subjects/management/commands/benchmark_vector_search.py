@@ -0,0 +1,72 @@
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from subjects import vectors
+
+from .benchmark_flashcards import WORDS
+
+
+class Command(BaseCommand):
+    help = 'Measure vector index query latency on synthetic chunks (no database access).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunks',
+            type=int,
+            default=100000,
+            help='Number of chunks in the index (default: 100000).',
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=100,
+            help='Number of queries to time (default: 100).',
+        )
+
+    def handle(self, *args, **options):
+        if not vectors.is_enabled():
+            raise CommandError('The vector index needs numpy and VECTOR_INDEX_ENABLED.')
+        np = vectors.np
+        rng = random.Random(0)
+
+        def phrase(count):
+            return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+        root = tempfile.mkdtemp()
+        try:
+            with override_settings(VECTOR_INDEX_ROOT=root):
+                started = time.perf_counter()
+                # Embedding every chunk would dominate the run, so a sample
+                # of distinct chunks is tiled to the requested size.
+                sample = vectors.embed([phrase(200) for _ in range(1000)])
+                with open(vectors.index_path(0), 'wb') as index_file:
+                    for start in range(0, options['chunks'], len(sample)):
+                        index_file.write(sample[:options['chunks'] - start].tobytes())
+                built = time.perf_counter() - started
+
+                matrix = vectors.load(0)
+                timings = []
+                for _ in range(options['queries']):
+                    started = time.perf_counter()
+                    query = vectors.embed([phrase(6)])[0]
+                    scores = matrix @ query
+                    best = np.argpartition(-scores, 9)[:10]
+                    best[np.argsort(-scores[best])]
+                    timings.append(time.perf_counter() - started)
+                size = os.path.getsize(vectors.index_path(0))
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+        timings.sort()
+        self.stdout.write(f"{'chunks':>9}{'MB':>8}{'build s':>9}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}")
+        self.stdout.write(
+            f"{options['chunks']:>9}{size / 1024 / 1024:>8.0f}{built:>9.2f}"
+            f'{timings[len(timings) // 2] * 1000:>9.2f}{timings[int(len(timings) * 0.95)] * 1000:>9.2f}'
+            f'{timings[-1] * 1000:>9.2f}'
+        )
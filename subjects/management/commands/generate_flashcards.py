@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from subjects import flashcards
+from subjects.models import Topic
+
+
+class Command(BaseCommand):
+    help = 'Generate flashcards from the stored text of ready documents, one topic at a time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--topic',
+            type=int,
+            nargs='+',
+            help='Only these topic ids.',
+        )
+        parser.add_argument(
+            '--subject',
+            type=int,
+            help='Only the topics of this subject id.',
+        )
+        parser.add_argument(
+            '--user',
+            help='Only the topics of the user with this email.',
+        )
+
+    def handle(self, *args, **options):
+        topics = Topic.objects.select_related('subject').order_by('id')
+        if options['topic']:
+            topics = topics.filter(pk__in=options['topic'])
+        if options['subject']:
+            topics = topics.filter(subject_id=options['subject'])
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(email=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No user with email {options['user']!r}.")
+            topics = topics.filter(subject__user=user)
+
+        total = 0
+        for topic in topics.iterator():
+            counts = flashcards.generate_for_topic(topic)
+            total += counts['created']
+            self.stdout.write(
+                f"Topic {topic.pk}: {counts['created']} created, {counts['updated']} updated, "
+                f"{counts['deleted']} deleted"
+            )
+        self.stdout.write(self.style.SUCCESS(f'Created {total} flashcard(s).'))
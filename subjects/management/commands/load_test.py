@@ -0,0 +1,154 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from subjects.models import Subject, Topic
+
+from .benchmark_extraction import write_pdf
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure request throughput with concurrent upload and list clients against the configured '
+        'database. Every client is a separate process, like the workers of an application server. '
+        'A throwaway user is created and deleted again; run migrations first.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--uploaders',
+            type=int,
+            default=4,
+            help='Concurrent clients uploading documents (default: 4).',
+        )
+        parser.add_argument(
+            '--listers',
+            type=int,
+            default=8,
+            help='Concurrent clients loading the subject and document lists (default: 8).',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10,
+            help='Seconds to run (default: 10).',
+        )
+        parser.add_argument(
+            '--file-size',
+            type=int,
+            default=64 * 1024,
+            help='Size of each uploaded PDF in bytes (default: 65536).',
+        )
+        parser.add_argument(
+            '--no-write-queue',
+            action='store_true',
+            help='Disable the SQLite single-writer queue, for comparison.',
+        )
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp()
+        user = get_user_model().objects.create_user(f'load-test-{uuid.uuid4().hex[:12]}@example.invalid', None)
+        subject = Subject.objects.create(user=user, name='Load test')
+        topic = Topic.objects.create(subject=subject, name='Load test')
+
+        pdf_path = os.path.join(media_root, 'sample.pdf')
+        write_pdf(pdf_path, options['file_size'])
+        with open(pdf_path, 'rb') as f:
+            pdf = f.read()
+
+        timings = defaultdict(list)
+        errors = defaultdict(Counter)
+        deadline = time.monotonic() + options['duration']
+        overrides = override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            MEDIA_ROOT=media_root,
+            INGESTION_QUEUE_BACKEND='database',
+            SQLITE_WRITE_QUEUE=not options['no_write_queue'],
+        )
+
+        def run(kind, number):
+            client = Client()
+            client.force_login(user)
+            iteration = 0
+            durations, failures = [], Counter()
+            try:
+                while time.monotonic() < deadline:
+                    iteration += 1
+                    started = time.perf_counter()
+                    try:
+                        if kind == 'upload':
+                            # A unique trailing comment keeps every upload a new blob.
+                            content = pdf + f'%{number}-{iteration}\n'.encode()
+                            response = client.post(reverse('document_upload', args=[subject.pk]), {
+                                'title': f'Upload {number}-{iteration}',
+                                'document_type': 'study_material',
+                                'topic': topic.pk,
+                                'file': SimpleUploadedFile(f'upload-{number}-{iteration}.pdf', content),
+                            })
+                        else:
+                            url = reverse('document_list') if iteration % 2 else reverse('subject_list')
+                            response = client.get(url)
+                        error = f'HTTP {response.status_code}' if response.status_code >= 400 else None
+                    except Exception as e:
+                        error = f'{type(e).__name__}: {e}'
+                    elapsed = time.perf_counter() - started
+                    if error:
+                        failures[error] += 1
+                    else:
+                        durations.append(elapsed)
+            finally:
+                connection.close()
+                results.put((kind, durations, failures))
+
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [
+            context.Process(target=run, args=('upload', number)) for number in range(options['uploaders'])
+        ] + [
+            context.Process(target=run, args=('list', number)) for number in range(options['listers'])
+        ]
+        try:
+            with overrides:
+                # Children must open their own connections.
+                connections.close_all()
+                for process in processes:
+                    process.start()
+                for _ in processes:
+                    kind, durations, failures = results.get()
+                    timings[kind] += durations
+                    errors[kind] += failures
+                for process in processes:
+                    process.join()
+            vendor = connections['default'].vendor
+            self.stdout.write(
+                f"{vendor}, {options['uploaders']} upload and {options['listers']} list client(s), "
+                f"{options['duration']:.0f}s, write queue {'off' if options['no_write_queue'] else 'on'}"
+            )
+            self.stdout.write(f"{'clients':<9}{'requests':>9}{'errors':>8}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}")
+            for kind in ('upload', 'list'):
+                durations = sorted(timings[kind])
+                failed = sum(errors[kind].values())
+                p50 = durations[len(durations) // 2] * 1000 if durations else 0
+                p95 = durations[int(len(durations) * 0.95)] * 1000 if durations else 0
+                self.stdout.write(
+                    f'{kind:<9}{len(durations):>9}{failed:>8}{len(durations) / options["duration"]:>8.1f}'
+                    f'{p50:>9.1f}{p95:>9.1f}'
+                )
+                for message, count in errors[kind].most_common(3):
+                    self.stdout.write(f'  {count} x {message[:100]}')
+        finally:
+            with override_settings(MEDIA_ROOT=media_root):
+                user.delete()
+            shutil.rmtree(media_root, ignore_errors=True)
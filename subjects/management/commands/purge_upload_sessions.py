@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from subjects.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = 'Delete resumable upload sessions that were completed or abandoned a while ago.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=getattr(settings, 'RESUMABLE_UPLOAD_EXPIRY', 86400),
+            help='Age in seconds since the last received chunk (default: RESUMABLE_UPLOAD_EXPIRY).',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=options['older_than'])
+        deleted = 0
+        # Deleted one by one so the post_delete signal removes each part file.
+        for session in UploadSession.objects.filter(updated_at__lt=cutoff).iterator():
+            session.delete()
+            deleted += 1
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} upload session(s).'))
@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from subjects import ingestion, search
+from subjects.models import Document
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index from the stored documents.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Only rebuild the documents of the user with this email.',
+        )
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        documents = Document.objects.select_related('subject', 'topic').order_by('id')
+
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(email=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No user with email {options['user']!r}.")
+            documents = documents.filter(user=user)
+
+        backend.clear(user)
+        indexed = failed = 0
+        for document in documents.iterator():
+            try:
+                if document.status == Document.STATUS_READY:
+                    ingestion.index_document(document)
+                else:
+                    # Still queued; ingestion will add the content.
+                    backend.index_document(document)
+                indexed += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f'Document {document.pk}: {type(e).__name__}: {e}')
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} document(s), {failed} failed.'))
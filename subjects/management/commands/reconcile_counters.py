@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from subjects import counters
+from subjects.models import Subject
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the document, topic and size counters of subjects and topics from their rows, '
+        'and report how many were off.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--subject',
+            type=int,
+            nargs='+',
+            help='Only these subject ids.',
+        )
+        parser.add_argument(
+            '--user',
+            help='Only the subjects of the user with this email.',
+        )
+
+    def handle(self, *args, **options):
+        subjects = Subject.objects.all()
+        if options['subject']:
+            subjects = subjects.filter(pk__in=options['subject'])
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(email=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No user with email {options['user']!r}.")
+            subjects = subjects.filter(user=user)
+
+        counts = counters.reconcile(subjects)
+        self.stdout.write(self.style.SUCCESS(
+            f"Corrected {counts['subjects']} subject(s) and {counts['topics']} topic(s)."
+        ))
@@ -0,0 +1,83 @@
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from subjects import ingestion
+
+
+class Command(BaseCommand):
+    help = 'Run background workers that extract metadata from pending documents.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=getattr(settings, 'INGESTION_WORKERS', 2),
+            help='Number of worker threads (defaults to INGESTION_WORKERS).',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty instead of polling forever.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=getattr(settings, 'INGESTION_POLL_INTERVAL', 2.0),
+            help='Seconds to sleep when the queue is empty.',
+        )
+
+    def handle(self, *args, **options):
+        requeued = ingestion.requeue_stale()
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale document(s).')
+
+        stop = threading.Event()
+        workers = max(1, options['workers'])
+        self.stdout.write(f'Starting {workers} ingestion worker(s).')
+        if workers == 1:
+            # A single worker runs in the main thread.
+            try:
+                self.work(stop, options['once'], options['poll_interval'])
+            except KeyboardInterrupt:
+                self.stdout.write('Stopping worker...')
+            return
+
+        threads = [
+            threading.Thread(
+                target=self.work,
+                args=(stop, options['once'], options['poll_interval']),
+                name=f'ingestion-{i}',
+            )
+            for i in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping workers...')
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def work(self, stop, once, poll_interval):
+        while not stop.is_set():
+            try:
+                document_id = ingestion.claim_next()
+            finally:
+                close_old_connections()
+
+            if document_id is None:
+                if once:
+                    return
+                stop.wait(poll_interval)
+                continue
+
+            status = ingestion.process(document_id)
+            close_old_connections()
+            self.stdout.write(f'Document {document_id}: {status}')
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:58
+
+from django.db import migrations, models
+
+
+def mark_existing_documents_ready(apps, schema_editor):
+    """
+    Documents uploaded before background ingestion were processed synchronously.
+    """
+    Document = apps.get_model('subjects', 'Document')
+    Document.objects.update(status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subjects', '0007_auto_20250617_1651'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='attempts'),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='last_error',
+            field=models.TextField(blank=True, verbose_name='last error'),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], db_index=True, default='pending', help_text='State of the background metadata extraction', max_length=20, verbose_name='status'),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='status_changed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='status changed at'),
+        ),
+        migrations.RunPython(mark_existing_documents_ready, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:03
+
+import hashlib
+import os
+
+import django.db.models.deletion
+import subjects.models
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def link_existing_documents(apps, schema_editor):
+    """
+    Create blobs for files uploaded before content-addressed storage.
+    Files stay where they are; documents with identical content share a blob
+    and its file, and the duplicate copies are deleted.
+    """
+    Blob = apps.get_model('subjects', 'Blob')
+    Document = apps.get_model('subjects', 'Document')
+
+    for document in Document.objects.filter(blob__isnull=True).exclude(file=''):
+        if not default_storage.exists(document.file.name):
+            continue
+        hasher = hashlib.sha256()
+        with default_storage.open(document.file.name, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+        _, ext = os.path.splitext(document.file.name)
+
+        blob = Blob.objects.filter(sha256=digest).first()
+        if blob is None:
+            blob = Blob.objects.create(
+                sha256=digest,
+                file=document.file.name,
+                file_type=ext.lower().lstrip('.'),
+                size=default_storage.size(document.file.name),
+                page_count=document.page_count,
+                extracted_at=timezone.now() if document.status == 'ready' else None,
+                ref_count=0,
+            )
+        duplicate = document.file.name if document.file.name != blob.file.name else None
+        blob.ref_count += 1
+        blob.save(update_fields=['ref_count'])
+        document.blob = blob
+        document.file = blob.file.name
+        document.save(update_fields=['blob', 'file'])
+        if duplicate:
+            default_storage.delete(duplicate)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subjects', '0008_document_ingestion_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('file', models.FileField(upload_to=subjects.models.blob_file_path, verbose_name='file')),
+                ('file_type', models.CharField(max_length=10, verbose_name='file type')),
+                ('size', models.PositiveBigIntegerField(help_text='Size in bytes', verbose_name='size')),
+                ('page_count', models.PositiveIntegerField(blank=True, null=True, verbose_name='page count')),
+                ('extracted_at', models.DateTimeField(blank=True, help_text='When metadata was extracted; empty until ingestion ran', null=True, verbose_name='extracted at')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='reference count')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+            ],
+            options={
+                'verbose_name': 'blob',
+                'verbose_name_plural': 'blobs',
+            },
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='blob',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='documents', to='subjects.blob', verbose_name='blob'),
+        ),
+        migrations.RunPython(link_existing_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+def create_fts_table(apps, schema_editor):
+    """
+    Create the FTS5 index used by subjects.search.SQLiteFTS5Backend.
+    Other databases use a different backend and need no table here.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS subjects_document_fts USING fts5("
+        "owner, title, topic, content, "
+        "tokenize = 'porter unicode61 remove_diacritics 2')"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS subjects_document_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subjects', '0009_blob'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
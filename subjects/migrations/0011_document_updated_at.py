@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:20
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_updated_at(apps, schema_editor):
+    """
+    Existing documents last changed when ingestion last touched them.
+    """
+    Document = apps.get_model('subjects', 'Document')
+    Document.objects.update(updated_at=Coalesce('status_changed_at', 'uploaded_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subjects', '0010_document_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='updated at'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:17
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subjects', '0011_document_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=255, verbose_name='title')),
+                ('document_type', models.CharField(choices=[('study_material', 'Study Material'), ('exam', 'Exam')], default='study_material', max_length=20, verbose_name='document type')),
+                ('filename', models.CharField(max_length=255, verbose_name='file name')),
+                ('size', models.PositiveBigIntegerField(help_text='Announced size in bytes', verbose_name='size')),
+                ('offset', models.PositiveBigIntegerField(default=0, help_text='Bytes received so far', verbose_name='offset')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+                ('document', models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='subjects.document', verbose_name='document')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='subjects.subject', verbose_name='subject')),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='subjects.topic', verbose_name='topic')),
+            ],
+            options={
+                'verbose_name': 'upload session',
+                'verbose_name_plural': 'upload sessions',
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:26
+
+import django.db.models.deletion
+import django.utils.timezone
+import subjects.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subjects', '0012_upload_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Preview',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page', models.PositiveSmallIntegerField(verbose_name='page')),
+                ('width', models.PositiveSmallIntegerField(help_text='Width in pixels', verbose_name='width')),
+                ('file', models.FileField(upload_to=subjects.models.preview_file_path, verbose_name='file')),
+                ('size', models.PositiveIntegerField(help_text='Size in bytes', verbose_name='size')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('last_accessed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='last accessed at')),
+                ('blob', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='previews', to='subjects.blob', verbose_name='blob')),
+            ],
+            options={
+                'verbose_name': 'preview',
+                'verbose_name_plural': 'previews',
+                'unique_together': {('blob', 'page', 'width')},
+            },
+        ),
+    ]
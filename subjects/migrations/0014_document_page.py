@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subjects', '0013_preview'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(verbose_name='number')),
+                ('compressed_text', models.BinaryField(verbose_name='compressed text')),
+                ('char_count', models.PositiveIntegerField(help_text='Length of the uncompressed text', verbose_name='character count')),
+                ('blob', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pages', to='subjects.blob', verbose_name='blob')),
+            ],
+            options={
+                'verbose_name': 'document page',
+                'verbose_name_plural': 'document pages',
+                'ordering': ['blob', 'number'],
+                'unique_together': {('blob', 'number')},
+            },
+        ),
+    ]
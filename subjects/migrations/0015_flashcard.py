@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subjects', '0014_document_page'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Flashcard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page', models.PositiveIntegerField(verbose_name='page')),
+                ('kind', models.CharField(choices=[('definition', 'Definition'), ('heading', 'Heading'), ('phrase', 'Key phrase')], max_length=10, verbose_name='kind')),
+                ('front', models.CharField(max_length=255, verbose_name='front')),
+                ('back', models.TextField(verbose_name='back')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='flashcards', to='subjects.document', verbose_name='document')),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='flashcards', to='subjects.topic', verbose_name='topic')),
+            ],
+            options={
+                'verbose_name': 'flashcard',
+                'verbose_name_plural': 'flashcards',
+                'ordering': ['document', 'page', 'id'],
+                'unique_together': {('document', 'front')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subjects', '0015_flashcard'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('repetitions', models.PositiveSmallIntegerField(default=0, verbose_name='repetitions')),
+                ('interval_days', models.PositiveIntegerField(default=0, verbose_name='interval in days')),
+                ('ease_factor', models.FloatField(default=2.5, verbose_name='ease factor')),
+                ('lapses', models.PositiveIntegerField(default=0, verbose_name='lapses')),
+                ('due_at', models.DateTimeField(verbose_name='due at')),
+                ('last_reviewed_at', models.DateTimeField(blank=True, null=True, verbose_name='last reviewed at')),
+                ('flashcard', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_states', to='subjects.flashcard', verbose_name='flashcard')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_states', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'review state',
+                'verbose_name_plural': 'review states',
+                'indexes': [models.Index(fields=['user', 'due_at'], name='subjects_review_due_idx')],
+                'unique_together': {('user', 'flashcard')},
+            },
+        ),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:36
+
+import django.db.models.deletion
+import subjects.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subjects', '0016_review_state'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Question',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('study_material', 'Study Material'), ('exam', 'Exam')], max_length=20, verbose_name='source')),
+                ('page', models.PositiveIntegerField(blank=True, null=True, verbose_name='page')),
+                ('prompt', models.TextField(verbose_name='prompt')),
+                ('prompt_key', models.CharField(help_text='SHA-1 of the normalised prompt', max_length=40, verbose_name='prompt key')),
+                ('choices', models.JSONField(verbose_name='choices')),
+                ('answer_index', models.PositiveSmallIntegerField(verbose_name='answer index')),
+                ('explanation', models.TextField(blank=True, verbose_name='explanation')),
+                ('random_key', models.FloatField(default=subjects.models.random_key, verbose_name='random key')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='questions', to='subjects.document', verbose_name='document')),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='questions', to='subjects.topic', verbose_name='topic')),
+            ],
+            options={
+                'verbose_name': 'question',
+                'verbose_name_plural': 'questions',
+            },
+        ),
+        migrations.CreateModel(
+            name='Quiz',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('topic', 'Topic'), ('weak_areas', 'Weak areas')], default='topic', max_length=20, verbose_name='kind')),
+                ('question_count', models.PositiveSmallIntegerField(default=0, verbose_name='question count')),
+                ('answered_count', models.PositiveSmallIntegerField(default=0, verbose_name='answered count')),
+                ('correct_count', models.PositiveSmallIntegerField(default=0, verbose_name='correct count')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='completed at')),
+                ('topic', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='quizzes', to='subjects.topic', verbose_name='topic')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quizzes', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'quiz',
+                'verbose_name_plural': 'quizzes',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='QuizQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(verbose_name='position')),
+                ('selected_index', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='selected index')),
+                ('is_correct', models.BooleanField(blank=True, null=True, verbose_name='correct')),
+                ('answered_at', models.DateTimeField(blank=True, null=True, verbose_name='answered at')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='subjects.question', verbose_name='question')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='subjects.quiz', verbose_name='quiz')),
+            ],
+            options={
+                'verbose_name': 'quiz question',
+                'verbose_name_plural': 'quiz questions',
+                'ordering': ['quiz', 'position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TopicPerformance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answered_count', models.PositiveIntegerField(default=0, verbose_name='answered count')),
+                ('correct_count', models.PositiveIntegerField(default=0, verbose_name='correct count')),
+                ('last_answered_at', models.DateTimeField(blank=True, null=True, verbose_name='last answered at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='performances', to='subjects.topic', verbose_name='topic')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='topic_performances', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'topic performance',
+                'verbose_name_plural': 'topic performances',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['topic', 'random_key'], name='subjects_question_pick_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='question',
+            unique_together={('document', 'prompt_key')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='quizquestion',
+            unique_together={('quiz', 'position')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='topicperformance',
+            unique_together={('user', 'topic')},
+        ),
+    ]
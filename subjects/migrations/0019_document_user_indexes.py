@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_user(apps, schema_editor):
+    """
+    Copy each document's owner from its subject.
+    """
+    Document = apps.get_model('subjects', 'Document')
+    Subject = apps.get_model('subjects', 'Subject')
+    Document.objects.update(user=Subquery(Subject.objects.filter(pk=OuterRef('subject_id')).values('user_id')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subjects', '0018_document_chunk'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='user',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='documents', to=settings.AUTH_USER_MODEL, verbose_name='user'),
+        ),
+        migrations.RunPython(backfill_user, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='document',
+            name='user',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='documents', to=settings.AUTH_USER_MODEL, verbose_name='user'),
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='subject',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='documents', to='subjects.subject', verbose_name='subject'),
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='topic',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='documents', to='subjects.topic', verbose_name='topic'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['user', 'uploaded_at', 'id'], name='subjects_doc_user_upload_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['user', 'document_type', 'uploaded_at', 'id'], name='subjects_doc_user_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['subject', 'uploaded_at', 'id'], name='subjects_doc_subj_upload_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['topic', 'uploaded_at', 'id'], name='subjects_doc_topic_upload_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['user', 'updated_at'], name='subjects_doc_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='subjects_subj_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['user', 'updated_at'], name='subjects_subj_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['subject', 'updated_at'], name='subjects_topic_subj_upd_idx'),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def convert_tags(apps, schema_editor):
+    """
+    Turn the comma-separated tag strings into tags, normalised the way
+    ``subjects.tags.normalise`` does.
+    """
+    Subject = apps.get_model('subjects', 'Subject')
+    Tag = apps.get_model('subjects', 'Tag')
+    SubjectTag = apps.get_model('subjects', 'SubjectTag')
+    tag_ids = {}
+    links = []
+    for subject in Subject.objects.exclude(legacy_tags='').only('pk', 'user_id', 'legacy_tags').iterator():
+        names = {' '.join(name.split()).casefold()[:50].strip() for name in subject.legacy_tags.split(',')} - {''}
+        for name in sorted(names):
+            key = (subject.user_id, name)
+            if key not in tag_ids:
+                tag_ids[key] = Tag.objects.get_or_create(user_id=subject.user_id, name=name)[0].pk
+            links.append(SubjectTag(subject_id=subject.pk, tag_id=tag_ids[key]))
+    SubjectTag.objects.bulk_create(links, batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subjects', '0019_document_user_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='subject',
+            old_name='tags',
+            new_name='legacy_tags',
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, verbose_name='name')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='tags', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'tag',
+                'verbose_name_plural': 'tags',
+                'ordering': ['name'],
+                'unique_together': {('user', 'name')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SubjectTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='subject_tags', to='subjects.subject', verbose_name='subject')),
+                ('tag', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='subject_tags', to='subjects.tag', verbose_name='tag')),
+            ],
+            options={
+                'verbose_name': 'subject tag',
+                'verbose_name_plural': 'subject tags',
+            },
+        ),
+        migrations.AddField(
+            model_name='subject',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='subjects', through='subjects.SubjectTag', to='subjects.tag', verbose_name='tags'),
+        ),
+        migrations.AddIndex(
+            model_name='subjecttag',
+            index=models.Index(fields=['tag', 'subject'], name='subjects_subjtag_tag_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='subjecttag',
+            unique_together={('subject', 'tag')},
+        ),
+        migrations.RunPython(convert_tags, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='subject',
+            name='legacy_tags',
+        ),
+    ]
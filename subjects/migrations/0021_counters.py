@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:57
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def count_children(apps, schema_editor):
+    """
+    Fill the counters of existing topics and subjects from their rows.
+    """
+    Subject = apps.get_model('subjects', 'Subject')
+    Topic = apps.get_model('subjects', 'Topic')
+    Document = apps.get_model('subjects', 'Document')
+
+    def totals(model, field):
+        return model.objects.filter(**{field: OuterRef('pk')}).order_by().values(field)
+
+    for model, field in ((Topic, 'topic'), (Subject, 'subject')):
+        documents = totals(Document, field)
+        model.objects.update(
+            document_count=Coalesce(
+                Subquery(documents.annotate(total=Count('pk')).values('total')), Value(0), output_field=IntegerField()
+            ),
+            total_bytes=Coalesce(
+                Subquery(documents.annotate(total=Sum('file_size')).values('total')), Value(0),
+                output_field=IntegerField(),
+            ),
+            last_activity_at=Subquery(documents.annotate(latest=Max('uploaded_at')).values('latest')),
+        )
+    topics = totals(Topic, 'subject')
+    Subject.objects.update(topic_count=Coalesce(
+        Subquery(topics.annotate(total=Count('pk')).values('total')), Value(0), output_field=IntegerField()
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subjects', '0020_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subject',
+            name='document_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='document count'),
+        ),
+        migrations.AddField(
+            model_name='subject',
+            name='last_activity_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='last activity at'),
+        ),
+        migrations.AddField(
+            model_name='subject',
+            name='topic_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='topic count'),
+        ),
+        migrations.AddField(
+            model_name='subject',
+            name='total_bytes',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='total bytes'),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='document_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='document count'),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='last_activity_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='last activity at'),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='total_bytes',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='total bytes'),
+        ),
+        migrations.RunPython(count_children, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subjects', '0021_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='document',
+            name='file_size',
+            field=models.PositiveBigIntegerField(help_text='Size in bytes', verbose_name='file size'),
+        ),
+    ]
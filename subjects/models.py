@@ -1,22 +1,41 @@
+import hashlib
 import os
-from django.db import models
+import random
+import uuid
+import zlib
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
 from django.conf import settings
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import FileExtensionValidator
 
+from luminote.database import write_transaction
+
 class Subject(models.Model):
     """
     Subject model for organizing materials by course.
     """
     name = models.CharField(_('name'), max_length=100)
     description = models.TextField(_('description'), blank=True)
-    tags = models.CharField(_('tags'), max_length=255, blank=True, help_text=_('Comma-separated tags'))
+    tags = models.ManyToManyField(
+        'Tag',
+        through='SubjectTag',
+        related_name='subjects',
+        blank=True,
+        verbose_name=_('tags')
+    )
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name='subjects',
         verbose_name=_('user')
     )
+    # Maintained by subjects.counters; reconcile_counters recomputes them.
+    topic_count = models.PositiveIntegerField(_('topic count'), default=0, editable=False)
+    document_count = models.PositiveIntegerField(_('document count'), default=0, editable=False)
+    total_bytes = models.PositiveBigIntegerField(_('total bytes'), default=0, editable=False)
+    last_activity_at = models.DateTimeField(_('last activity at'), null=True, blank=True, editable=False)
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
 
@@ -24,11 +43,81 @@ class Subject(models.Model):
         verbose_name = _('subject')
         verbose_name_plural = _('subjects')
         ordering = ['-created_at']
+        indexes = [
+            # Subject list (keyset pages) and its ETag, and the dashboard's
+            # most recently updated subject.
+            models.Index(fields=['user', 'created_at', 'id'], name='subjects_subj_user_created_idx'),
+            models.Index(fields=['user', 'updated_at'], name='subjects_subj_user_updated_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        with write_transaction():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        # Cascades to the topics and documents, and releases their blobs.
+        with write_transaction():
+            return super().delete(*args, **kwargs)
+
+
+class Tag(models.Model):
+    """
+    A user's tag, stored normalised (see ``subjects.tags``) so that
+    ``(user, name)`` is unique and tag names can be looked up by prefix.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='tags',
+        db_index=False,
+        verbose_name=_('user')
+    )
+    name = models.CharField(_('name'), max_length=50)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('tag')
+        verbose_name_plural = _('tags')
+        ordering = ['name']
+        # Also the index for tag lookups and prefix autocompletion.
+        unique_together = ['user', 'name']
 
     def __str__(self):
         return self.name
 
 
+class SubjectTag(models.Model):
+    """
+    A tag on a subject.
+    """
+    subject = models.ForeignKey(
+        Subject,
+        on_delete=models.CASCADE,
+        related_name='subject_tags',
+        db_index=False,
+        verbose_name=_('subject')
+    )
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='subject_tags',
+        db_index=False,
+        verbose_name=_('tag')
+    )
+
+    class Meta:
+        verbose_name = _('subject tag')
+        verbose_name_plural = _('subject tags')
+        unique_together = ['subject', 'tag']
+        indexes = [
+            # Subjects with a tag.
+            models.Index(fields=['tag', 'subject'], name='subjects_subjtag_tag_idx'),
+        ]
+
+
 class Topic(models.Model):
     """
     Topic model for organizing materials within a subject.
@@ -41,6 +130,10 @@ class Topic(models.Model):
     )
     name = models.CharField(_('name'), max_length=100)
     description = models.TextField(_('description'), blank=True)
+    # Maintained by subjects.counters; reconcile_counters recomputes them.
+    document_count = models.PositiveIntegerField(_('document count'), default=0, editable=False)
+    total_bytes = models.PositiveBigIntegerField(_('total bytes'), default=0, editable=False)
+    last_activity_at = models.DateTimeField(_('last activity at'), null=True, blank=True, editable=False)
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
 
@@ -49,10 +142,23 @@ class Topic(models.Model):
         verbose_name_plural = _('topics')
         ordering = ['name']
         unique_together = ['subject', 'name']
+        indexes = [
+            # ETags of the topic dropdowns and lists (count and max(updated_at)).
+            models.Index(fields=['subject', 'updated_at'], name='subjects_topic_subj_upd_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.subject.name})"
 
+    def save(self, *args, **kwargs):
+        # Commits together with the subject's topic count (see signals.py).
+        with write_transaction():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with write_transaction():
+            return super().delete(*args, **kwargs)
+
 
 def document_file_path(instance, filename):
     """
@@ -62,6 +168,146 @@ def document_file_path(instance, filename):
     return f'documents/{instance.subject.user.id}/{instance.subject.id}/{instance.topic.id}/{filename}'
 
 
+def blob_file_path(instance, filename):
+    """
+    Generate file path for a content-addressed blob.
+    Format: blobs/ab/cd/abcd...ef.ext
+    """
+    _, ext = os.path.splitext(filename)
+    return f'blobs/{instance.sha256[:2]}/{instance.sha256[2:4]}/{instance.sha256}{ext.lower()}'
+
+
+def preview_file_path(instance, filename):
+    """
+    Generate file path for a page preview, keyed by the blob's content hash.
+    Format: previews/ab/cd/abcd...ef-p1-w320.jpg
+    """
+    sha256 = instance.blob.sha256
+    return f'previews/{sha256[:2]}/{sha256[2:4]}/{sha256}-p{instance.page}-w{instance.width}.jpg'
+
+
+class BlobManager(models.Manager):
+    """
+    Manager that stores uploads once per distinct content.
+    """
+    def stage(self, file, content_hash=None):
+        """
+        Put the bytes of ``file`` where the blob of its content is stored,
+        unless they are there already. Returns ``(blob, written)``: an
+        unsaved ``Blob`` to pass to ``claim`` and whether a file was written.
+
+        The hash computed by the upload handlers is used when available.
+        Call this outside transactions: moving or copying a large upload
+        while holding the write lock would hold up every other writer.
+        """
+        digest = content_hash or getattr(file, 'sha256', None)
+        if digest is None:
+            hasher = hashlib.sha256()
+            for chunk in file.chunks():
+                hasher.update(chunk)
+            file.seek(0)
+            digest = hasher.hexdigest()
+
+        _, ext = os.path.splitext(file.name)
+        blob = self.model(sha256=digest, size=file.size, file_type=ext.lower().lstrip('.'), ref_count=1)
+        name = blob_file_path(blob, file.name)
+        if blob.file.storage.exists(name):
+            # Stored for an existing blob, or left over from an earlier one.
+            blob.file.name = name
+            return blob, False
+        blob.file.save(os.path.basename(file.name), file, save=False)
+        return blob, True
+
+    def claim(self, staged, written=False):
+        """
+        Return ``(blob, created)`` for a blob from ``stage`` and count a
+        reference to it. The existing blob's row is locked while its count
+        goes up, so a concurrent ``release`` can't delete it in between.
+        """
+        with transaction.atomic():
+            blob = self.select_for_update().filter(sha256=staged.sha256).first()
+            if blob is None:
+                try:
+                    with transaction.atomic():
+                        staged.save()
+                    return staged, True
+                except IntegrityError:
+                    # Stored by a concurrent upload in the meantime.
+                    blob = self.select_for_update().get(sha256=staged.sha256)
+            self.acquire(blob)
+        if written and staged.file.name != blob.file.name:
+            # Both uploads wrote the content; keep the stored blob's copy.
+            transaction.on_commit(lambda: staged.file.delete(save=False))
+        return blob, False
+
+    def store(self, file, content_hash=None):
+        """
+        ``stage`` and ``claim`` the content of ``file``.
+        """
+        return self.claim(*self.stage(file, content_hash))
+
+    def acquire(self, blob):
+        self.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+        blob.ref_count += 1
+
+    def release(self, blob_id):
+        """
+        Drop one reference and delete the blob once nothing refers to it.
+        """
+        with transaction.atomic():
+            self.filter(pk=blob_id, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+            # Only an update that finds the count at zero locks the row for
+            # the delete; a concurrent ``store`` either raised the count
+            # first or finds no blob afterwards.
+            if not self.filter(pk=blob_id, ref_count=0).update(ref_count=0):
+                return
+            blob = self.get(pk=blob_id)
+            blob.delete()
+        transaction.on_commit(lambda: self._delete_file(blob))
+
+    def _delete_file(self, blob):
+        # The same content may have been uploaded again in the meantime.
+        if not self.filter(sha256=blob.sha256).exists():
+            blob.file.delete(save=False)
+
+
+class Blob(models.Model):
+    """
+    Uploaded file content, stored once and shared by every document with the same bytes.
+    """
+    sha256 = models.CharField(_('SHA-256'), max_length=64, unique=True)
+    file = models.FileField(_('file'), upload_to=blob_file_path)
+    file_type = models.CharField(_('file type'), max_length=10)
+    size = models.PositiveBigIntegerField(_('size'), help_text=_('Size in bytes'))
+    page_count = models.PositiveIntegerField(_('page count'), null=True, blank=True)
+    extracted_at = models.DateTimeField(
+        _('extracted at'),
+        null=True,
+        blank=True,
+        help_text=_('When metadata was extracted; empty until ingestion ran')
+    )
+    ref_count = models.PositiveIntegerField(_('reference count'), default=0)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    objects = BlobManager()
+
+    class Meta:
+        verbose_name = _('blob')
+        verbose_name_plural = _('blobs')
+
+    def __str__(self):
+        return self.sha256
+
+    @property
+    def is_extracted(self):
+        return self.extracted_at is not None
+
+    def mark_extracted(self, page_count):
+        self.page_count = page_count
+        self.extracted_at = timezone.now()
+        Blob.objects.filter(pk=self.pk).update(page_count=page_count, extracted_at=self.extracted_at)
+
+
 class Document(models.Model):
     """
     Document model for storing uploaded files with metadata.
@@ -71,18 +317,42 @@ class Document(models.Model):
         ('exam', _('Exam')),
     )
 
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_READY = 'ready'
+    STATUS_FAILED = 'failed'
+    STATUSES = (
+        (STATUS_PENDING, _('Pending')),
+        (STATUS_PROCESSING, _('Processing')),
+        (STATUS_READY, _('Ready')),
+        (STATUS_FAILED, _('Failed')),
+    )
+
+    # Indexed by the composite indexes in Meta, which lead with them.
     subject = models.ForeignKey(
         Subject,
         on_delete=models.CASCADE,
         related_name='documents',
+        db_index=False,
         verbose_name=_('subject')
     )
     topic = models.ForeignKey(
         Topic,
         on_delete=models.CASCADE,
         related_name='documents',
+        db_index=False,
         verbose_name=_('topic')
     )
+    # The subject's owner, copied so listing a user's documents needs no
+    # join with subjects.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='documents',
+        editable=False,
+        db_index=False,
+        verbose_name=_('user')
+    )
     title = models.CharField(_('title'), max_length=255)
     document_type = models.CharField(
         _('document type'),
@@ -95,27 +365,490 @@ class Document(models.Model):
         upload_to=document_file_path,
         validators=[FileExtensionValidator(allowed_extensions=['pdf', 'docx'])]
     )
+    blob = models.ForeignKey(
+        Blob,
+        on_delete=models.PROTECT,
+        related_name='documents',
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_('blob')
+    )
     file_type = models.CharField(_('file type'), max_length=10)
-    file_size = models.PositiveIntegerField(_('file size'), help_text=_('Size in bytes'))
+    file_size = models.PositiveBigIntegerField(_('file size'), help_text=_('Size in bytes'))
     page_count = models.PositiveIntegerField(_('page count'), null=True, blank=True)
+    status = models.CharField(
+        _('status'),
+        max_length=20,
+        choices=STATUSES,
+        default=STATUS_PENDING,
+        db_index=True,
+        help_text=_('State of the background metadata extraction')
+    )
+    attempts = models.PositiveSmallIntegerField(_('attempts'), default=0)
+    last_error = models.TextField(_('last error'), blank=True)
+    status_changed_at = models.DateTimeField(_('status changed at'), null=True, blank=True)
     uploaded_at = models.DateTimeField(_('uploaded at'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
 
     class Meta:
         verbose_name = _('document')
         verbose_name_plural = _('documents')
         ordering = ['-uploaded_at']
+        indexes = [
+            # Keyset pages of the document list, newest first, unfiltered or
+            # filtered by type, subject or topic; id breaks ties.
+            models.Index(fields=['user', 'uploaded_at', 'id'], name='subjects_doc_user_upload_idx'),
+            models.Index(fields=['user', 'document_type', 'uploaded_at', 'id'], name='subjects_doc_user_type_idx'),
+            models.Index(fields=['subject', 'uploaded_at', 'id'], name='subjects_doc_subj_upload_idx'),
+            models.Index(fields=['topic', 'uploaded_at', 'id'], name='subjects_doc_topic_upload_idx'),
+            # Covers the document list ETag (count and max(updated_at)).
+            models.Index(fields=['user', 'updated_at'], name='subjects_doc_user_updated_idx'),
+        ]
+
+    # ``(blob, written)`` from ``stage_upload`` until the blob is claimed.
+    _staged_blob = None
 
     def __str__(self):
         return self.title
 
+    @property
+    def is_ready(self):
+        return self.status == self.STATUS_READY
+
+    def stage_upload(self):
+        """
+        Put the bytes of a new upload in blob storage ahead of ``save``,
+        which does this itself. Callers saving inside a transaction of their
+        own call it first, so the file isn't moved or copied while the write
+        lock is held.
+        """
+        if self.file and not self.file._committed:
+            self._staged_blob = Blob.objects.stage(self.file.file)
+            self.file = self._staged_blob[0].file.name
+
     def save(self, *args, **kwargs):
-        # Set file type based on extension
-        if self.file:
-            _, ext = os.path.splitext(self.file.name)
-            self.file_type = ext.lower().lstrip('.')
+        if self.user_id is None and self.subject_id is not None:
+            self.user_id = self.subject.user_id
+
+        # New uploads are stored as (possibly shared) blobs; the document
+        # only points at the blob's file.
+        self.stage_upload()
+        # Commits together with the blob reference and the topic and subject
+        # counters (see signals.py).
+        with write_transaction():
+            if self._staged_blob is not None:
+                blob, _created = Blob.objects.claim(*self._staged_blob)
+                self._staged_blob = None
+                self.blob = blob
+                self.file = blob.file.name
+                if blob.is_extracted:
+                    # Same content was processed before, no need to look at it again.
+                    self.page_count = blob.page_count
+            elif self._state.adding and self.blob_id:
+                Blob.objects.acquire(self.blob)
+
+            # Set file type based on extension
+            if self.file:
+                _, ext = os.path.splitext(self.file.name)
+                self.file_type = ext.lower().lstrip('.')
+
+                # Set file size
+                if self.blob_id:
+                    self.file_size = self.blob.size
+                elif hasattr(self.file, 'size'):
+                    self.file_size = self.file.size
+
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        # Commits together with the blob release and the counters.
+        with write_transaction():
+            return super().delete(*args, **kwargs)
 
-            # Set file size
-            if hasattr(self.file, 'size'):
-                self.file_size = self.file.size
 
-        super().save(*args, **kwargs)
+class UploadSession(models.Model):
+    """
+    A resumable chunked upload; the document is created once all bytes have
+    arrived (see ``uploads.py``).
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    subject = models.ForeignKey(
+        Subject,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions',
+        verbose_name=_('subject')
+    )
+    topic = models.ForeignKey(
+        Topic,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions',
+        verbose_name=_('topic')
+    )
+    title = models.CharField(_('title'), max_length=255)
+    document_type = models.CharField(
+        _('document type'),
+        max_length=20,
+        choices=Document.DOCUMENT_TYPES,
+        default='study_material'
+    )
+    filename = models.CharField(_('file name'), max_length=255)
+    size = models.PositiveBigIntegerField(_('size'), help_text=_('Announced size in bytes'))
+    offset = models.PositiveBigIntegerField(_('offset'), default=0, help_text=_('Bytes received so far'))
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+',
+        verbose_name=_('document')
+    )
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('upload session')
+        verbose_name_plural = _('upload sessions')
+
+    def __str__(self):
+        return self.filename
+
+    @property
+    def is_complete(self):
+        return self.document_id is not None
+
+
+class Preview(models.Model):
+    """
+    A rendered page of a blob, kept on disk within a size budget and evicted
+    least recently used first (see ``previews.py``).
+    """
+    blob = models.ForeignKey(
+        Blob,
+        on_delete=models.CASCADE,
+        related_name='previews',
+        verbose_name=_('blob')
+    )
+    page = models.PositiveSmallIntegerField(_('page'))
+    width = models.PositiveSmallIntegerField(_('width'), help_text=_('Width in pixels'))
+    file = models.FileField(_('file'), upload_to=preview_file_path)
+    size = models.PositiveIntegerField(_('size'), help_text=_('Size in bytes'))
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    last_accessed_at = models.DateTimeField(_('last accessed at'), default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = _('preview')
+        verbose_name_plural = _('previews')
+        unique_together = ['blob', 'page', 'width']
+
+    def __str__(self):
+        return f'{self.blob_id} page {self.page}'
+
+
+class DocumentPage(models.Model):
+    """
+    Extracted text of one page, stored zlib-compressed. Pages belong to the
+    blob, so documents with the same content share them (see ``pages.py``).
+    """
+    blob = models.ForeignKey(
+        Blob,
+        on_delete=models.CASCADE,
+        related_name='pages',
+        verbose_name=_('blob')
+    )
+    number = models.PositiveIntegerField(_('number'))
+    compressed_text = models.BinaryField(_('compressed text'))
+    char_count = models.PositiveIntegerField(_('character count'), help_text=_('Length of the uncompressed text'))
+
+    class Meta:
+        verbose_name = _('document page')
+        verbose_name_plural = _('document pages')
+        ordering = ['blob', 'number']
+        unique_together = ['blob', 'number']
+
+    def __str__(self):
+        return f'{self.blob_id} page {self.number}'
+
+    @property
+    def text(self):
+        return zlib.decompress(self.compressed_text).decode('utf-8')
+
+
+class DocumentChunk(models.Model):
+    """
+    A run of words on one page of a document, stored as row ``row`` of its
+    owner's vector index (see ``vectors.py``). The text isn't copied; it is
+    read back from the page store by character range.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='document_chunks',
+        verbose_name=_('user')
+    )
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.CASCADE,
+        related_name='chunks',
+        verbose_name=_('document')
+    )
+    row = models.PositiveIntegerField(_('row'))
+    page = models.PositiveIntegerField(_('page'))
+    start = models.PositiveIntegerField(_('start'))
+    end = models.PositiveIntegerField(_('end'))
+
+    class Meta:
+        verbose_name = _('document chunk')
+        verbose_name_plural = _('document chunks')
+        unique_together = ['user', 'row']
+
+    def __str__(self):
+        return f'{self.document_id} page {self.page} [{self.start}:{self.end}]'
+
+
+class Flashcard(models.Model):
+    """
+    A question/answer card generated from a document's text
+    (see ``flashcards.py``).
+    """
+    KIND_DEFINITION = 'definition'
+    KIND_HEADING = 'heading'
+    KIND_PHRASE = 'phrase'
+    KINDS = (
+        (KIND_DEFINITION, _('Definition')),
+        (KIND_HEADING, _('Heading')),
+        (KIND_PHRASE, _('Key phrase')),
+    )
+
+    topic = models.ForeignKey(
+        Topic,
+        on_delete=models.CASCADE,
+        related_name='flashcards',
+        verbose_name=_('topic')
+    )
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.CASCADE,
+        related_name='flashcards',
+        verbose_name=_('document')
+    )
+    page = models.PositiveIntegerField(_('page'))
+    kind = models.CharField(_('kind'), max_length=10, choices=KINDS)
+    front = models.CharField(_('front'), max_length=255)
+    back = models.TextField(_('back'))
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('flashcard')
+        verbose_name_plural = _('flashcards')
+        ordering = ['document', 'page', 'id']
+        unique_together = ['document', 'front']
+
+    def __str__(self):
+        return self.front
+
+
+class ReviewState(models.Model):
+    """
+    Spaced-repetition state of a flashcard for a user (see ``scheduling.py``).
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='review_states',
+        verbose_name=_('user')
+    )
+    flashcard = models.ForeignKey(
+        Flashcard,
+        on_delete=models.CASCADE,
+        related_name='review_states',
+        verbose_name=_('flashcard')
+    )
+    repetitions = models.PositiveSmallIntegerField(_('repetitions'), default=0)
+    interval_days = models.PositiveIntegerField(_('interval in days'), default=0)
+    ease_factor = models.FloatField(_('ease factor'), default=2.5)
+    lapses = models.PositiveIntegerField(_('lapses'), default=0)
+    due_at = models.DateTimeField(_('due at'))
+    last_reviewed_at = models.DateTimeField(_('last reviewed at'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('review state')
+        verbose_name_plural = _('review states')
+        unique_together = ['user', 'flashcard']
+        indexes = [
+            models.Index(fields=['user', 'due_at'], name='subjects_review_due_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} / {self.flashcard_id}'
+
+
+def random_key():
+    """
+    Sort key that spreads questions uniformly, so a quiz can pick a random
+    run of them from an index.
+    """
+    return random.random()
+
+
+class Question(models.Model):
+    """
+    A multiple-choice question in a topic's question bank (see ``quizzes.py``).
+    """
+    topic = models.ForeignKey(
+        Topic,
+        on_delete=models.CASCADE,
+        related_name='questions',
+        verbose_name=_('topic')
+    )
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.CASCADE,
+        related_name='questions',
+        verbose_name=_('document')
+    )
+    source = models.CharField(_('source'), max_length=20, choices=Document.DOCUMENT_TYPES)
+    page = models.PositiveIntegerField(_('page'), null=True, blank=True)
+    prompt = models.TextField(_('prompt'))
+    prompt_key = models.CharField(_('prompt key'), max_length=40, help_text=_('SHA-1 of the normalised prompt'))
+    choices = models.JSONField(_('choices'))
+    answer_index = models.PositiveSmallIntegerField(_('answer index'))
+    explanation = models.TextField(_('explanation'), blank=True)
+    random_key = models.FloatField(_('random key'), default=random_key)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('question')
+        verbose_name_plural = _('questions')
+        unique_together = ['document', 'prompt_key']
+        indexes = [
+            models.Index(fields=['topic', 'random_key'], name='subjects_question_pick_idx'),
+        ]
+
+    def __str__(self):
+        return self.prompt[:80]
+
+
+class Quiz(models.Model):
+    """
+    A set of questions drawn from one topic's bank, or from the user's
+    weakest topics. Answers are scored as they come in.
+    """
+    KIND_TOPIC = 'topic'
+    KIND_WEAK_AREAS = 'weak_areas'
+    KINDS = (
+        (KIND_TOPIC, _('Topic')),
+        (KIND_WEAK_AREAS, _('Weak areas')),
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='quizzes',
+        verbose_name=_('user')
+    )
+    topic = models.ForeignKey(
+        Topic,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='quizzes',
+        verbose_name=_('topic')
+    )
+    kind = models.CharField(_('kind'), max_length=20, choices=KINDS, default=KIND_TOPIC)
+    question_count = models.PositiveSmallIntegerField(_('question count'), default=0)
+    answered_count = models.PositiveSmallIntegerField(_('answered count'), default=0)
+    correct_count = models.PositiveSmallIntegerField(_('correct count'), default=0)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    completed_at = models.DateTimeField(_('completed at'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('quiz')
+        verbose_name_plural = _('quizzes')
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.get_kind_display()} quiz {self.pk}'
+
+    @property
+    def is_complete(self):
+        return self.completed_at is not None
+
+    @property
+    def score_percentage(self):
+        if not self.answered_count:
+            return 0
+        return int(self.correct_count / self.answered_count * 100)
+
+
+class QuizQuestion(models.Model):
+    """
+    A question of a quiz and the user's answer to it.
+    """
+    quiz = models.ForeignKey(
+        Quiz,
+        on_delete=models.CASCADE,
+        related_name='items',
+        verbose_name=_('quiz')
+    )
+    question = models.ForeignKey(
+        Question,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name=_('question')
+    )
+    position = models.PositiveSmallIntegerField(_('position'))
+    selected_index = models.PositiveSmallIntegerField(_('selected index'), null=True, blank=True)
+    is_correct = models.BooleanField(_('correct'), null=True, blank=True)
+    answered_at = models.DateTimeField(_('answered at'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('quiz question')
+        verbose_name_plural = _('quiz questions')
+        ordering = ['quiz', 'position']
+        unique_together = ['quiz', 'position']
+
+    def __str__(self):
+        return f'{self.quiz_id} #{self.position}'
+
+    @property
+    def is_answered(self):
+        return self.answered_at is not None
+
+
+class TopicPerformance(models.Model):
+    """
+    Running totals of a user's quiz answers in a topic.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='topic_performances',
+        verbose_name=_('user')
+    )
+    topic = models.ForeignKey(
+        Topic,
+        on_delete=models.CASCADE,
+        related_name='performances',
+        verbose_name=_('topic')
+    )
+    answered_count = models.PositiveIntegerField(_('answered count'), default=0)
+    correct_count = models.PositiveIntegerField(_('correct count'), default=0)
+    last_answered_at = models.DateTimeField(_('last answered at'), null=True, blank=True)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('topic performance')
+        verbose_name_plural = _('topic performances')
+        unique_together = ['user', 'topic']
+
+    def __str__(self):
+        return f'{self.user_id} / {self.topic_id}'
+
+    @property
+    def accuracy_percentage(self):
+        if not self.answered_count:
+            return 0
+        return int(self.correct_count / self.answered_count * 100)
@@ -0,0 +1,63 @@
+"""
+Per-page text of documents.
+
+The text of every page is extracted once per content during ingestion and
+kept as zlib-compressed ``DocumentPage`` rows, so reading, search indexing
+and anything built on the text later never has to open the original file
+again. Pages are loaded by number range and decompressed one by one when
+their text is accessed, so a single page costs the same whatever the size of
+the document.
+"""
+import zlib
+
+from django.conf import settings
+
+from .models import DocumentPage
+
+COMPRESSION_LEVEL = 6
+
+# Rows inserted per query when storing the pages of a document.
+STORE_BATCH_SIZE = 200
+
+
+def get_max_range():
+    return getattr(settings, 'DOCUMENT_PAGES_MAX_RANGE', 50)
+
+
+def has_pages(blob):
+    return DocumentPage.objects.filter(blob=blob).exists()
+
+
+def store(blob, texts):
+    """
+    Save the text of each page of ``blob``, first page first. Pages stored
+    concurrently for the same content are left alone.
+    """
+    DocumentPage.objects.bulk_create(
+        (
+            DocumentPage(
+                blob=blob,
+                number=number,
+                compressed_text=zlib.compress(text.encode('utf-8'), COMPRESSION_LEVEL),
+                char_count=len(text),
+            )
+            for number, text in enumerate(texts, start=1)
+        ),
+        batch_size=STORE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def get_range(blob, start, end):
+    """
+    Pages ``start`` to ``end`` (inclusive) of ``blob``.
+    """
+    return DocumentPage.objects.filter(blob=blob, number__gte=start, number__lte=end).order_by('number')
+
+
+def iter_text(blob):
+    """
+    Yield the text of every stored page of ``blob`` in order.
+    """
+    for page in DocumentPage.objects.filter(blob=blob).order_by('number').iterator():
+        yield page.text
@@ -0,0 +1,181 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are fetched with ``WHERE (key) < (last key seen) ORDER BY key LIMIT n``
+rather than ``OFFSET``, so every page costs the same however deep it is.
+The position and the list filters are packed into a signed cursor token;
+following a cursor therefore always continues the same filtered listing,
+and clients doing infinite scroll only need to pass the token back.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from django.core import signing
+from django.db.models import Q
+from django.http import Http404, JsonResponse
+from django.utils.http import urlencode
+from django.utils.translation import gettext_lazy as _
+
+from . import cache
+
+CURSOR_SALT = 'subjects.pagination.cursor'
+
+
+@dataclass
+class KeysetPage:
+    object_list: List[Any]
+    has_next: bool
+    next_cursor: Optional[str] = None
+    is_first: bool = True
+    filters: Dict[str, str] = field(default_factory=dict)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginate ``queryset`` by the fields in ``ordering`` (e.g.
+    ``('-uploaded_at', '-id')``). The last field must be unique.
+    """
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = ordering
+        self.per_page = per_page
+        self.fields = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+    def page(self, position=None, filters=None):
+        queryset = self.queryset.order_by(*self.ordering)
+        if position is not None:
+            if len(position) != len(self.fields):
+                raise Http404(_('Invalid cursor.'))
+            queryset = queryset.filter(self.after(position))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        next_cursor = None
+        if has_next:
+            next_cursor = encode_cursor(self.position_of(rows[-1]), filters or {})
+        return KeysetPage(
+            object_list=rows,
+            has_next=has_next,
+            next_cursor=next_cursor,
+            is_first=position is None,
+            filters=filters or {},
+        )
+
+    def after(self, position):
+        """
+        Condition selecting the rows that sort after ``position``.
+        """
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.fields, position):
+            lookup = f'{name}__lt' if descending else f'{name}__gt'
+            condition |= equal & Q(**{lookup: value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def position_of(self, obj):
+        values = []
+        for name, _descending in self.fields:
+            value = getattr(obj, name)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            values.append(value)
+        return values
+
+
+def encode_cursor(position, filters):
+    return signing.dumps({'p': position, 'f': filters}, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(token):
+    """
+    Return ``(position, filters)`` from a cursor token.
+    """
+    try:
+        data = signing.loads(token, salt=CURSOR_SALT)
+        return data['p'], data['f']
+    except (signing.BadSignature, KeyError, TypeError):
+        raise Http404(_('Invalid cursor.'))
+
+
+class KeysetPaginationMixin:
+    """
+    Keyset pagination for list views.
+
+    Views read their filters from ``self.filters`` instead of ``request.GET``
+    so that a cursor carries them along. ``?format=json`` returns the page as
+    JSON built from ``serialize_object`` for infinite scrolling. Setting
+    ``page_cache_namespace`` caches pages per user (see ``subjects.cache``).
+    """
+    paginate_by = 24
+    keyset_ordering = ('-id',)
+    cursor_filters = ()
+    page_cache_namespace = None
+
+    def setup(self, request, *args, **kwargs):
+        super().setup(request, *args, **kwargs)
+        token = request.GET.get('cursor')
+        if token:
+            self.position, self.filters = decode_cursor(token)
+        else:
+            self.position = None
+            self.filters = {
+                name: request.GET[name]
+                for name in self.cursor_filters
+                if request.GET.get(name)
+            }
+
+    def get_keyset_ordering(self):
+        return self.keyset_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        ordering = self.get_keyset_ordering()
+        paginator = KeysetPaginator(queryset, ordering, page_size)
+        if self.page_cache_namespace:
+            page = cache.cached(
+                self.request.user.pk,
+                self.page_cache_namespace,
+                (ordering, self.position, self.filters, page_size),
+                lambda: paginator.page(self.position, self.filters),
+            )
+        else:
+            page = paginator.page(self.position, self.filters)
+        return paginator, page, page.object_list, page.has_next or not page.is_first
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['first_page_query'] = urlencode(self.filters)
+        return context
+
+    def wants_json(self):
+        return self.request.GET.get('format') == 'json'
+
+    def serialize_object(self, obj):
+        return {'id': obj.pk}
+
+    def get_json_extra(self):
+        """
+        Keys added to the JSON page next to ``results`` and ``next``.
+        """
+        return {}
+
+    def render_to_response(self, context, **response_kwargs):
+        if self.wants_json():
+            return json_page(context['page_obj'], self.serialize_object, **self.get_json_extra())
+        return super().render_to_response(context, **response_kwargs)
+
+
+def json_page(page, serialize, **extra):
+    return JsonResponse({
+        'results': [serialize(obj) for obj in page.object_list],
+        'next': page.next_cursor,
+        **extra,
+    })
@@ -0,0 +1,185 @@
+"""
+Page previews of documents.
+
+After a document has been ingested, its first ``PREVIEW_PAGES`` pages are
+rendered once (in the extraction sandbox, see ``rendering.py``) and stored
+under the blob's content hash, so documents with the same content share
+their previews. Every stored preview has a ``Preview`` row recording its size
+and when it was last served; once the total exceeds
+``PREVIEW_CACHE_MAX_BYTES`` the least recently served previews are deleted.
+A preview requested after it was evicted is rendered again in the
+background.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import extraction, rendering, sandbox
+from .models import Document, Preview, preview_file_path
+
+logger = logging.getLogger(__name__)
+
+# Eviction frees space down to this fraction of the budget, so it doesn't run
+# again for every new preview.
+EVICTION_TARGET = 0.9
+
+# Rows deleted per query during eviction.
+EVICTION_BATCH_SIZE = 500
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def get_max_bytes():
+    return getattr(settings, 'PREVIEW_CACHE_MAX_BYTES', 512 * 1024 ** 2)
+
+
+def wanted_pages(blob):
+    pages = rendering.get_pages()
+    if blob.page_count:
+        pages = min(pages, blob.page_count)
+    return range(1, pages + 1)
+
+
+def render_document(document):
+    """
+    Render and store the previews of ``document`` that don't exist yet.
+    Returns the number of previews stored.
+    """
+    blob = document.blob
+    if blob is None or not rendering.can_render(document.file_type):
+        return 0
+    existing = set(
+        Preview.objects.filter(blob=blob, width=rendering.get_width()).values_list('page', flat=True)
+    )
+    if all(page in existing for page in wanted_pages(blob)):
+        return 0
+
+    with extraction.local_path(document.file) as path:
+        result = sandbox.render_previews(path, document.file_type)
+    if not result.ok:
+        logger.warning('Rendering previews of document %s failed: %s', document.pk, result)
+        return 0
+    return store(blob, result.images, skip=existing)
+
+
+def store(blob, images, skip=()):
+    """
+    Save ``images`` (JPEG bytes, first page first) as previews of ``blob``.
+    """
+    width = rendering.get_width()
+    stored = 0
+    for page, image in enumerate(images, start=1):
+        if page in skip:
+            continue
+        preview = Preview(blob=blob, page=page, width=width, size=len(image))
+        name = preview_file_path(preview, '')
+        if preview.file.storage.exists(name):
+            # Rendered by a concurrent job; the image is the same.
+            preview.file.name = name
+        else:
+            preview.file.save(name, ContentFile(image), save=False)
+        try:
+            with transaction.atomic():
+                preview.save()
+        except IntegrityError:
+            continue
+        stored += 1
+    if stored:
+        evict()
+    return stored
+
+
+def evict(max_bytes=None):
+    """
+    Delete the least recently served previews while the total size is over
+    budget. Returns the number of previews deleted.
+    """
+    if max_bytes is None:
+        max_bytes = get_max_bytes()
+    total = Preview.objects.aggregate(total=Sum('size'))['total'] or 0
+    if total <= max_bytes:
+        return 0
+
+    target = max_bytes * EVICTION_TARGET
+    victims = []
+    for pk, size in Preview.objects.order_by('last_accessed_at', 'pk').values_list('pk', 'size').iterator():
+        if total <= target:
+            break
+        victims.append(pk)
+        total -= size
+
+    deleted = 0
+    for start in range(0, len(victims), EVICTION_BATCH_SIZE):
+        # The post_delete signal removes the files.
+        deleted += Preview.objects.filter(pk__in=victims[start:start + EVICTION_BATCH_SIZE]).delete()[0]
+    return deleted
+
+
+def get_preview(document, page):
+    """
+    Return the stored preview of ``page`` of ``document``, or None. A missing
+    preview of a ready document is scheduled for rendering.
+    """
+    if document.blob_id is None or page not in wanted_pages(document.blob):
+        return None
+    preview = Preview.objects.filter(
+        blob_id=document.blob_id,
+        page=page,
+        width=rendering.get_width(),
+    ).first()
+    if preview is None:
+        if document.is_ready and rendering.can_render(document.file_type):
+            schedule(document)
+        return None
+    preview.blob = document.blob
+    return preview
+
+
+def touch(preview):
+    """
+    Record that ``preview`` was served. The row is written at most once per
+    ``PREVIEW_TOUCH_INTERVAL`` seconds, which is plenty for LRU ordering.
+    """
+    now = timezone.now()
+    interval = timedelta(seconds=getattr(settings, 'PREVIEW_TOUCH_INTERVAL', 3600))
+    if preview.last_accessed_at > now - interval:
+        return
+    Preview.objects.filter(pk=preview.pk).update(last_accessed_at=now)
+    preview.last_accessed_at = now
+
+
+def schedule(document):
+    """
+    Render the previews of ``document`` in a background thread; a blob
+    already being rendered isn't queued again.
+    """
+    global _executor
+    with _lock:
+        if document.blob_id in _pending:
+            return
+        _pending.add(document.blob_id)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='previews')
+    _executor.submit(_render_job, document.pk, document.blob_id)
+
+
+def _render_job(document_id, blob_id):
+    try:
+        document = Document.objects.select_related('blob').filter(pk=document_id).first()
+        if document is not None:
+            render_document(document)
+    except Exception:
+        logger.exception('Unexpected error while rendering previews of document %s', document_id)
+    finally:
+        with _lock:
+            _pending.discard(blob_id)
+        close_old_connections()
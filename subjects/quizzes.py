@@ -0,0 +1,359 @@
+"""
+Quizzes built from per-topic question banks.
+
+Question banks are built offline from the stored page text (``pages.py``),
+without any model or network access:
+
+* exam documents are scanned for numbered questions with lettered options,
+  answered either by an "Answer: b" line under the question or by an answer
+  key ("1. b", "2-c", ...) after an "Answers" heading,
+* study material turns the definitions found by the flashcard generator into
+  "which term is defined as ..." questions, using other terms of the topic as
+  wrong choices.
+
+Every question gets a random sort key, and ``(topic, random_key)`` is
+indexed, so a quiz is assembled with one index range scan from a random
+starting point per topic instead of sorting the whole bank randomly.
+
+Answers are scored one at a time: the quiz's counters and the user's running
+``TopicPerformance`` totals for the question's topic are bumped with ``F()``
+expressions. A weak-areas quiz reads those totals, one row per topic, and
+never goes back to the attempt history.
+"""
+import hashlib
+import random
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import List
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from luminote.database import write_transaction
+
+from . import flashcards
+from .models import Document, Flashcard, Question, Quiz, QuizQuestion, TopicPerformance
+
+MIN_CHOICES = 2
+MAX_CHOICES = 4
+MAX_PROMPT_LENGTH = 1000
+MAX_CHOICE_LENGTH = 255
+
+# Rows written per query.
+BATCH_SIZE = 500
+
+_QUESTION_LINE = re.compile(r'^(?:Q(?:uestion)?\s*)?(?P<number>\d{1,3})\s*[.):]\s+(?P<text>\S.*)$', re.IGNORECASE)
+_OPTION_LINE = re.compile(r'^\(?(?P<letter>[a-hA-H])[.)]\s+(?P<text>\S.*)$')
+_ANSWER_LINE = re.compile(r'^(?:correct\s+)?(?:answer|ans)\s*[:.\-]\s*\(?(?P<letter>[a-hA-H])\b', re.IGNORECASE)
+_ANSWER_KEY_HEADING = re.compile(r'^(?:answer\s+key|answers)\s*:?$', re.IGNORECASE)
+_ANSWER_KEY_ENTRY = re.compile(r'\b(?P<number>\d{1,3})\s*[.):\-]\s*\(?(?P<letter>[a-hA-H])\b')
+
+
+@dataclass
+class ParsedQuestion:
+    number: int
+    prompt: str
+    page: int
+    choices: List[str] = field(default_factory=list)
+    answer: str = ''
+
+
+def get_question_count():
+    return getattr(settings, 'QUIZ_QUESTION_COUNT', 10)
+
+
+def get_weak_topic_count():
+    return getattr(settings, 'QUIZ_WEAK_TOPICS', 3)
+
+
+def prompt_key(prompt):
+    return hashlib.sha1(' '.join(prompt.casefold().split()).encode('utf-8')).hexdigest()
+
+
+def parse_exam(pages):
+    """
+    Return the multiple-choice questions with a known answer found in
+    ``(number, text)`` pages.
+    """
+    questions = []
+    current = None
+    in_key = False
+    key = {}
+    for number, text in pages:
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if _ANSWER_KEY_HEADING.match(line):
+                in_key, current = True, None
+                continue
+            if in_key:
+                for match in _ANSWER_KEY_ENTRY.finditer(line):
+                    key[int(match['number'])] = match['letter'].lower()
+                continue
+            match = _ANSWER_LINE.match(line)
+            if match:
+                if current is not None:
+                    current.answer = match['letter'].lower()
+                continue
+            match = _OPTION_LINE.match(line)
+            if match and current is not None and ord(match['letter'].lower()) - ord('a') == len(current.choices):
+                current.choices.append(match['text'])
+                continue
+            match = _QUESTION_LINE.match(line)
+            if match:
+                current = ParsedQuestion(int(match['number']), match['text'], number)
+                questions.append(current)
+            elif current is not None:
+                # Prompts and options may wrap onto the following lines.
+                if current.choices:
+                    current.choices[-1] += ' ' + line
+                else:
+                    current.prompt += ' ' + line
+
+    found = []
+    for question in questions:
+        answer = question.answer or key.get(question.number, '')
+        index = ord(answer) - ord('a') if answer else -1
+        if len(question.choices) >= MIN_CHOICES and 0 <= index < len(question.choices):
+            question.answer = answer
+            found.append(question)
+    return found
+
+
+def exam_questions(document):
+    for parsed in parse_exam(flashcards.document_pages(document)):
+        yield Question(
+            page=parsed.page,
+            prompt=flashcards.clip(parsed.prompt, MAX_PROMPT_LENGTH),
+            choices=[flashcards.clip(choice, MAX_CHOICE_LENGTH) for choice in parsed.choices],
+            answer_index=ord(parsed.answer) - ord('a'),
+        )
+
+
+def definitions_of(document):
+    return [
+        card for card in flashcards.generate_cards(flashcards.document_pages(document))
+        if card.kind == Flashcard.KIND_DEFINITION
+    ]
+
+
+def definition_questions(definitions, terms):
+    """
+    Turn definition cards into questions, with wrong choices drawn from
+    ``terms``. Choices are picked and shuffled with a generator seeded by the
+    prompt, so building the bank again gives the same questions.
+    """
+    for card in definitions:
+        others = sorted({term for term in terms if term.casefold() != card.front.casefold()})
+        if len(others) < MIN_CHOICES - 1:
+            continue
+        prompt = f'Which term is defined as "{card.back}"?'
+        rng = random.Random(prompt_key(prompt))
+        choices = rng.sample(others, min(len(others), MAX_CHOICES - 1)) + [card.front]
+        rng.shuffle(choices)
+        yield Question(
+            page=card.page,
+            prompt=flashcards.clip(prompt, MAX_PROMPT_LENGTH),
+            choices=[flashcards.clip(choice, MAX_CHOICE_LENGTH) for choice in choices],
+            answer_index=choices.index(card.front),
+            explanation=f'{card.front}: {card.back}',
+        )
+
+
+def save_questions(document, questions):
+    """
+    Replace the questions of ``document``. Questions are identified by their
+    prompt, so quizzes that include a question still found keep it. Returns
+    a ``Counter`` of created, updated and deleted questions.
+    """
+    counts = Counter()
+    with write_transaction():
+        existing = {question.prompt_key: question for question in Question.objects.filter(document=document)}
+        now = timezone.now()
+        new, changed = [], []
+        seen = set()
+        for question in questions:
+            key = prompt_key(question.prompt)
+            if key in seen:
+                continue
+            seen.add(key)
+            current = existing.pop(key, None)
+            if current is None:
+                question.topic_id = document.topic_id
+                question.document = document
+                question.source = document.document_type
+                question.prompt_key = key
+                new.append(question)
+                continue
+            values = (question.choices, question.answer_index, question.explanation, question.page, document.topic_id)
+            if (current.choices, current.answer_index, current.explanation, current.page, current.topic_id) != values:
+                (current.choices, current.answer_index, current.explanation, current.page,
+                 current.topic_id) = values
+                current.updated_at = now
+                changed.append(current)
+        Question.objects.bulk_create(new, batch_size=BATCH_SIZE)
+        Question.objects.bulk_update(
+            changed,
+            ['choices', 'answer_index', 'explanation', 'page', 'topic', 'updated_at'],
+            batch_size=BATCH_SIZE,
+        )
+        if existing:
+            Question.objects.filter(pk__in=[question.pk for question in existing.values()]).delete()
+    counts['created'] += len(new)
+    counts['updated'] += len(changed)
+    counts['deleted'] += len(existing)
+    return counts
+
+
+def build_for_topic(topic):
+    """
+    Build the question bank of ``topic`` from its ready documents.
+    """
+    counts = Counter()
+    documents = list(
+        Document.objects.filter(topic=topic, status=Document.STATUS_READY, blob__isnull=False)
+        .only('topic_id', 'blob_id', 'document_type')
+    )
+    # Wrong choices come from every definition in the topic, so small
+    # documents still get full questions.
+    definitions = {}
+    for document in documents:
+        if document.document_type != 'exam':
+            definitions[document.pk] = definitions_of(document)
+    terms = [card.front for cards in definitions.values() for card in cards]
+
+    for document in documents:
+        if document.document_type == 'exam':
+            questions = exam_questions(document)
+        else:
+            questions = definition_questions(definitions[document.pk], terms)
+        counts += save_questions(document, list(questions))
+    return counts
+
+
+def pick_questions(topic_id, count, exclude=()):
+    """
+    Return up to ``count`` random questions of a topic: a run of the
+    ``(topic, random_key)`` index from a random point, continued from the
+    start when it reaches the end.
+    """
+    questions = Question.objects.filter(topic_id=topic_id).exclude(pk__in=exclude).order_by('random_key')
+    start = random.random()
+    picked = list(questions.filter(random_key__gte=start)[:count])
+    if len(picked) < count:
+        picked += questions.filter(random_key__lt=start)[:count - len(picked)]
+    return picked
+
+
+def create_quiz(user, questions, topic=None, kind=Quiz.KIND_TOPIC):
+    """
+    Save a quiz of ``questions`` for ``user``, or return None when there are
+    no questions.
+    """
+    if not questions:
+        return None
+    with write_transaction():
+        quiz = Quiz.objects.create(user=user, topic=topic, kind=kind, question_count=len(questions))
+        QuizQuestion.objects.bulk_create(
+            [
+                QuizQuestion(quiz=quiz, question=question, position=position)
+                for position, question in enumerate(questions, start=1)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+    return quiz
+
+
+def create_topic_quiz(user, topic, count=None):
+    return create_quiz(user, pick_questions(topic.pk, count or get_question_count()), topic=topic)
+
+
+def weak_topics(user, limit=None):
+    """
+    Ids of the user's topics with the lowest quiz accuracy, read from the
+    running totals.
+    """
+    performances = (
+        TopicPerformance.objects.filter(user=user, answered_count__gt=0)
+        .annotate(accuracy=Cast('correct_count', FloatField()) / F('answered_count'))
+        .order_by('accuracy', '-answered_count')
+    )
+    return list(performances.values_list('topic_id', flat=True)[:limit or get_weak_topic_count()])
+
+
+def create_weak_areas_quiz(user, count=None):
+    """
+    A quiz on the user's weakest topics, the weakest getting the most
+    questions. Returns None when the user hasn't answered any questions yet
+    or those topics have no questions left.
+    """
+    count = count or get_question_count()
+    topic_ids = weak_topics(user)
+    questions = []
+    for index, topic_id in enumerate(topic_ids):
+        share = -(-(count - len(questions)) // (len(topic_ids) - index))
+        questions += pick_questions(topic_id, share, exclude=[question.pk for question in questions])
+    # Topics with too few questions leave their share to the weakest ones.
+    for topic_id in topic_ids:
+        if len(questions) >= count:
+            break
+        questions += pick_questions(topic_id, count - len(questions), exclude=[question.pk for question in questions])
+    return create_quiz(user, questions, kind=Quiz.KIND_WEAK_AREAS)
+
+
+def answer(item, choice, now=None):
+    """
+    Score ``choice`` for a quiz question and add it to the quiz's and the
+    topic's running totals. A question is only scored once; returns whether
+    this call scored it.
+    """
+    now = now or timezone.now()
+    question = item.question
+    correct = choice == question.answer_index
+    with write_transaction():
+        scored = QuizQuestion.objects.filter(pk=item.pk, answered_at__isnull=True).update(
+            selected_index=choice,
+            is_correct=correct,
+            answered_at=now,
+        )
+        if not scored:
+            return False
+        Quiz.objects.filter(pk=item.quiz_id).update(
+            answered_count=F('answered_count') + 1,
+            correct_count=F('correct_count') + int(correct),
+        )
+        Quiz.objects.filter(
+            Q(pk=item.quiz_id, completed_at__isnull=True) & Q(answered_count__gte=F('question_count'))
+        ).update(completed_at=now)
+        record_performance(item.quiz.user_id, question.topic_id, correct, now)
+    item.selected_index, item.is_correct, item.answered_at = choice, correct, now
+    return True
+
+
+def record_performance(user_id, topic_id, correct, now):
+    changes = {
+        'answered_count': F('answered_count') + 1,
+        'correct_count': F('correct_count') + int(correct),
+        'last_answered_at': now,
+        'updated_at': now,
+    }
+    performances = TopicPerformance.objects.filter(user_id=user_id, topic_id=topic_id)
+    if performances.update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            TopicPerformance.objects.create(
+                user_id=user_id,
+                topic_id=topic_id,
+                answered_count=1,
+                correct_count=int(correct),
+                last_answered_at=now,
+            )
+    except IntegrityError:
+        # Created by a concurrent answer in the meantime.
+        performances.update(**changes)
@@ -0,0 +1,104 @@
+"""
+Rendering of document pages to small JPEG images.
+
+Two renderers are supported, both optional: PyMuPDF (``fitz``) and the
+``pdftoppm`` command of poppler-utils. ``PREVIEW_RENDERER`` picks one
+(``'pymupdf'`` or ``'pdftoppm'``); ``'auto'`` uses whichever is installed
+and ``None`` turns rendering off. Only PDFs are rendered.
+
+The functions here are called inside the extraction sandbox, so they may be
+interrupted by its time limit at any point.
+"""
+import glob
+import os
+import shutil
+import subprocess
+import tempfile
+
+from django.conf import settings
+
+try:
+    import fitz
+except ImportError:
+    fitz = None
+
+RENDERABLE_TYPES = ('pdf',)
+
+
+def get_pages():
+    return getattr(settings, 'PREVIEW_PAGES', 1)
+
+
+def get_width():
+    return getattr(settings, 'PREVIEW_WIDTH', 320)
+
+
+def get_quality():
+    return getattr(settings, 'PREVIEW_JPEG_QUALITY', 70)
+
+
+def get_renderer():
+    """
+    Name of the renderer to use, or None if previews can't be rendered.
+    """
+    renderer = getattr(settings, 'PREVIEW_RENDERER', 'auto')
+    if renderer == 'auto':
+        if fitz is not None:
+            return 'pymupdf'
+        if shutil.which('pdftoppm'):
+            return 'pdftoppm'
+        return None
+    if renderer not in (None, 'pymupdf', 'pdftoppm'):
+        raise ValueError(f'Unknown preview renderer: {renderer!r}')
+    return renderer
+
+
+def can_render(file_type):
+    return file_type in RENDERABLE_TYPES and get_renderer() is not None
+
+
+def render_pages(path, file_type):
+    """
+    Return the first ``PREVIEW_PAGES`` pages of the file at ``path`` as JPEG
+    images ``PREVIEW_WIDTH`` pixels wide, as a list of bytes.
+    """
+    if file_type not in RENDERABLE_TYPES:
+        return []
+    renderer = get_renderer()
+    if renderer == 'pymupdf':
+        return _render_pymupdf(path, get_pages(), get_width(), get_quality())
+    if renderer == 'pdftoppm':
+        return _render_pdftoppm(path, get_pages(), get_width(), get_quality())
+    return []
+
+
+def _render_pymupdf(path, pages, width, quality):
+    images = []
+    with fitz.open(path) as pdf:
+        for number in range(min(pages, pdf.page_count)):
+            page = pdf[number]
+            zoom = width / page.rect.width
+            pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            images.append(pixmap.tobytes('jpeg', jpg_quality=quality))
+    return images
+
+
+def _render_pdftoppm(path, pages, width, quality):
+    with tempfile.TemporaryDirectory(dir=settings.FILE_UPLOAD_TEMP_DIR) as out_dir:
+        subprocess.run(
+            [
+                'pdftoppm', '-jpeg', '-jpegopt', f'quality={quality}',
+                '-scale-to-x', str(width), '-scale-to-y', '-1',
+                '-f', '1', '-l', str(pages),
+                path, os.path.join(out_dir, 'page'),
+            ],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        # Page numbers in the output names are zero-padded to the same width.
+        images = []
+        for name in sorted(glob.glob(os.path.join(out_dir, 'page-*.jpg'))):
+            with open(name, 'rb') as f:
+                images.append(f.read())
+        return images
@@ -0,0 +1,333 @@
+"""
+Metadata and text extraction and page rendering in a pool of worker processes.
+
+Parsing untrusted PDF/DOCX files runs in ``EXTRACTION_WORKERS`` separate
+processes, so a malformed file can only tie up the worker handling it, and
+only for a bounded time:
+
+* ``EXTRACTION_TIMEOUT`` seconds of wall-clock time and of CPU time per file,
+  counted from when a worker starts on it (``SIGALRM`` and
+  ``RLIMIT_CPU``/``SIGXCPU`` in the worker; if the worker doesn't come back
+  shortly after, the parent kills and replaces that worker),
+* ``EXTRACTION_MEMORY_LIMIT`` bytes of address space per worker
+  (``RLIMIT_AS``; note that PDFs are memory-mapped, so this must be larger
+  than the biggest accepted upload).
+
+Failures are returned as an ``ExtractionResult`` carrying an error code and
+message rather than raised, and dead workers are replaced. A file still
+queued for a free worker after ``EXTRACTION_QUEUE_TIMEOUT`` seconds fails
+with the retryable ``ERROR_BUSY`` instead. With
+``EXTRACTION_WORKERS = 0`` files are parsed in the calling process, without
+any limits.
+"""
+import math
+import multiprocessing
+import queue
+import resource
+import signal
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from django.conf import settings
+
+from . import extraction, rendering
+
+ERROR_INVALID = 'invalid'
+ERROR_TIMEOUT = 'timeout'
+ERROR_MEMORY = 'memory'
+ERROR_CRASHED = 'crashed'
+ERROR_BUSY = 'busy'
+
+# Extra seconds the parent waits for a worker before giving up on it.
+KILL_GRACE = 5
+
+
+TASK_METADATA = 'metadata'
+TASK_PAGES = 'pages'
+TASK_PREVIEW = 'preview'
+
+
+@dataclass
+class ExtractionResult:
+    metadata: Optional[extraction.DocumentMetadata] = None
+    pages: List[str] = field(default_factory=list)
+    images: List[bytes] = field(default_factory=list)
+    error: str = ''
+    message: str = ''
+
+    @property
+    def ok(self):
+        return not self.error
+
+    @property
+    def retryable(self):
+        """
+        Only a crashed worker or a file that never got a worker is worth
+        another try; the other errors come from the file itself.
+        """
+        return self.error in (ERROR_CRASHED, ERROR_BUSY)
+
+    def __str__(self):
+        return f'{self.error}: {self.message}' if self.error else 'ok'
+
+
+class ExtractionTimeout(Exception):
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise ExtractionTimeout()
+
+
+def _init_worker(memory_limit):
+    import django
+
+    # The DOCX page-count cache uses Django's cache framework.
+    django.setup()
+    if memory_limit:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.signal(signal.SIGXCPU, _raise_timeout)
+
+
+def _call(task, path, file_type, content_hash):
+    try:
+        if task == TASK_PAGES:
+            return ExtractionResult(pages=list(extraction.iter_pages(path, file_type)))
+        if task == TASK_PREVIEW:
+            return ExtractionResult(images=rendering.render_pages(path, file_type))
+        return ExtractionResult(metadata=extraction.extract_metadata(path, file_type, content_hash))
+    except MemoryError:
+        return ExtractionResult(error=ERROR_MEMORY, message='Extraction ran out of memory.')
+    except ExtractionTimeout:
+        raise
+    except Exception as e:
+        return ExtractionResult(error=ERROR_INVALID, message=f'{type(e).__name__}: {e}')
+
+
+def _extract(task, path, file_type, content_hash, timeout):
+    """
+    Runs in a worker process.
+    """
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    # RLIMIT_CPU counts the worker's total CPU time, so the limit for this
+    # file is what has been used so far plus the timeout.
+    resource.setrlimit(resource.RLIMIT_CPU, (math.ceil(usage.ru_utime + usage.ru_stime + timeout), hard))
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return _call(task, path, file_type, content_hash)
+    except ExtractionTimeout:
+        return ExtractionResult(error=ERROR_TIMEOUT, message=f'Extraction took longer than {timeout} seconds.')
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+
+class _Worker:
+    """
+    A worker process and the pipe the parent talks to it over.
+    """
+
+    def __init__(self, memory_limit):
+        # Forking a threaded web process is unsafe.
+        context = multiprocessing.get_context('spawn')
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child, memory_limit), daemon=True)
+        self.process.start()
+        child.close()
+        # Wait for Django to be set up, so start-up doesn't count against
+        # the first file's time.
+        self.connection.recv()
+
+    def run(self, item, timeout):
+        """
+        Extract ``item`` with ``timeout`` seconds counted from now, when the
+        idle worker receives it. Raises ``EOFError`` if the worker dies.
+        """
+        try:
+            self.connection.send((*item, timeout))
+        except OSError:
+            raise EOFError()
+        if not self.connection.poll(timeout + KILL_GRACE):
+            return None
+        return self.connection.recv()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+def _worker_main(connection, memory_limit):
+    _init_worker(memory_limit)
+    try:
+        connection.send(None)
+        while True:
+            connection.send(_extract(*connection.recv()))
+    except (EOFError, OSError):
+        # The parent went away.
+        return
+
+
+class ExtractionPool:
+    """
+    ``workers`` worker processes, each fed by a thread of the parent from a
+    shared queue. A worker that overruns its file's timeout or dies is
+    replaced without disturbing the others.
+    """
+
+    def __init__(self, workers, timeout, memory_limit, queue_timeout=None):
+        self.workers = workers
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.queue_timeout = queue_timeout
+        self._queue = queue.Queue()
+        self._threads = []
+        self._running = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(
+                    target=self._dispatch, name=f'extraction-{len(self._threads)}', daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def close(self):
+        """
+        Stop the dispatching threads and kill their workers.
+        """
+        with self._lock:
+            threads, self._threads = self._threads, []
+            for _thread in threads:
+                self._queue.put(None)
+            workers = list(self._running.values())
+        for worker in workers:
+            worker.kill()
+
+    def _dispatch(self):
+        worker = None
+        while True:
+            if worker is None:
+                try:
+                    worker = _Worker(self.memory_limit)
+                except EOFError:
+                    pass
+                else:
+                    with self._lock:
+                        self._running[threading.get_ident()] = worker
+            job = self._queue.get()
+            if job is None:
+                with self._lock:
+                    self._running.pop(threading.get_ident(), None)
+                if worker is not None:
+                    worker.kill()
+                return
+            item, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if worker is None:
+                    raise EOFError()
+                result = worker.run(item, self.timeout)
+            except EOFError:
+                result = ExtractionResult(error=ERROR_CRASHED, message='The extraction worker died.')
+                if worker is not None:
+                    worker.kill()
+                worker = None
+            else:
+                if result is None:
+                    # Stuck where its own signals can't reach it; only this
+                    # worker is killed and replaced.
+                    result = ExtractionResult(
+                        error=ERROR_TIMEOUT, message=f'Extraction took longer than {self.timeout} seconds.',
+                    )
+                    worker.kill()
+                    worker = None
+            future.set_result(result)
+
+    def submit(self, item):
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def run_many(self, items):
+        """
+        Run ``(task, path, file_type, content_hash)`` items in parallel and
+        return their ``ExtractionResult``s in the same order.
+        """
+        if not self.workers:
+            return [_call(*item) for item in items]
+
+        self.start()
+        futures = [self.submit(item) for item in items]
+        deadline = None if self.queue_timeout is None else time.monotonic() + self.queue_timeout
+        return [self._wait(future, deadline) for future in futures]
+
+    def _wait(self, future, deadline):
+        """
+        The result of ``future``, or a retryable ``ERROR_BUSY`` if no worker
+        picked it up before ``deadline``. Once a worker has the file, the
+        worker's own timeout bounds the wait.
+        """
+        if deadline is not None:
+            try:
+                return future.result(timeout=max(deadline - time.monotonic(), 0))
+            except FutureTimeoutError:
+                if future.cancel():
+                    return ExtractionResult(
+                        error=ERROR_BUSY, message='No extraction worker became free in time.',
+                    )
+        return future.result()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ExtractionPool(
+                workers=getattr(settings, 'EXTRACTION_WORKERS', 2),
+                timeout=getattr(settings, 'EXTRACTION_TIMEOUT', 30),
+                memory_limit=getattr(settings, 'EXTRACTION_MEMORY_LIMIT', 3 * 1024 ** 3),
+                queue_timeout=getattr(settings, 'EXTRACTION_QUEUE_TIMEOUT', 120),
+            )
+        return _pool
+
+
+def extract_metadata(path, file_type=None, content_hash=None):
+    """
+    Extract metadata of the file at ``path`` in the pool; returns an
+    ``ExtractionResult``.
+    """
+    return get_pool().run_many([(TASK_METADATA, path, file_type, content_hash)])[0]
+
+
+def extract_metadata_many(items):
+    """
+    Extract metadata of ``(path, file_type, content_hash)`` items in parallel.
+    """
+    return get_pool().run_many([(TASK_METADATA, *item) for item in items])
+
+
+def extract_pages(path, file_type=None):
+    """
+    Extract the plain text of each page of the file at ``path`` in the pool.
+    """
+    return get_pool().run_many([(TASK_PAGES, path, file_type, None)])[0]
+
+
+def render_previews(path, file_type=None):
+    """
+    Render the preview pages of the file at ``path`` in the pool.
+    """
+    return get_pool().run_many([(TASK_PREVIEW, path, file_type, None)])[0]
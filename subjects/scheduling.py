@@ -0,0 +1,104 @@
+"""
+Spaced-repetition scheduling of flashcards (SM-2).
+
+Every card a user studies has a ``ReviewState`` with its SM-2 parameters and
+the time it is next due. ``(user, due_at)`` is indexed, so the cards due now
+are one range scan over the user's part of that index, whatever the size of
+the deck.
+
+The review page sends grades in batches; a batch is applied in one
+transaction with a single ``bulk_update`` rather than one write per card.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from luminote.database import write_transaction
+
+from . import cache
+from .models import ReviewState
+
+QUALITY_MIN = 0
+QUALITY_MAX = 5
+# Grades below this count as forgotten and restart the card.
+PASSING_QUALITY = 3
+MIN_EASE_FACTOR = 1.3
+
+# Rows written per query.
+BATCH_SIZE = 500
+
+STATE_FIELDS = ['repetitions', 'interval_days', 'ease_factor', 'lapses', 'due_at', 'last_reviewed_at']
+
+
+def get_batch_size():
+    return getattr(settings, 'REVIEW_BATCH_SIZE', 20)
+
+
+def apply_review(state, quality, now):
+    """
+    Update ``state`` in place for a review graded ``quality`` (0-5) at ``now``.
+    """
+    if quality < PASSING_QUALITY:
+        state.repetitions = 0
+        state.interval_days = 1
+        state.lapses += 1
+    else:
+        state.repetitions += 1
+        if state.repetitions == 1:
+            state.interval_days = 1
+        elif state.repetitions == 2:
+            state.interval_days = 6
+        else:
+            state.interval_days = round(state.interval_days * state.ease_factor)
+    miss = QUALITY_MAX - quality
+    state.ease_factor = max(MIN_EASE_FACTOR, state.ease_factor + 0.1 - miss * (0.08 + miss * 0.02))
+    state.due_at = now + timedelta(days=state.interval_days)
+    state.last_reviewed_at = now
+
+
+def enroll(user_id, flashcards, now=None):
+    """
+    Make new ``flashcards`` due for ``user_id`` right away.
+    """
+    now = now or timezone.now()
+    with write_transaction():
+        ReviewState.objects.bulk_create(
+            [ReviewState(user_id=user_id, flashcard=card, due_at=now) for card in flashcards],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        cache.invalidate_user(user_id)
+
+
+def due(user, now=None, topic_id=None):
+    """
+    The user's review states due at ``now``, most overdue first.
+    """
+    states = ReviewState.objects.filter(user=user, due_at__lte=now or timezone.now())
+    if topic_id is not None:
+        states = states.filter(flashcard__topic_id=topic_id)
+    return states.order_by('due_at')
+
+
+def record_reviews(user, reviews, now=None):
+    """
+    Apply ``(state_id, quality)`` reviews of the user's cards in the order
+    given. Ids of other users' states are ignored. Returns the number of
+    states updated.
+    """
+    now = now or timezone.now()
+    with write_transaction():
+        states = ReviewState.objects.select_for_update().filter(user=user).in_bulk(
+            {state_id for state_id, _quality in reviews}
+        )
+        reviewed = {}
+        for state_id, quality in reviews:
+            state = states.get(state_id)
+            if state is not None:
+                apply_review(state, quality, now)
+                reviewed[state_id] = state
+        ReviewState.objects.bulk_update(reviewed.values(), STATE_FIELDS, batch_size=BATCH_SIZE)
+        if reviewed:
+            cache.invalidate_user(user.pk)
+    return len(reviewed)
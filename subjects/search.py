@@ -0,0 +1,273 @@
+"""
+Full-text search over document titles, topics and extracted content.
+
+The backend is chosen with the ``SEARCH_BACKEND`` setting (a dotted path);
+when it is unset, SQLite databases use ``SQLiteFTS5Backend`` and others
+``DatabaseSearchBackend``. ``SQLiteFTS5Backend`` keeps an FTS5 inverted index
+next to the documents table and returns BM25-ranked hits with highlighted
+snippets; it does nothing where migration 0010 created no index table.
+``DatabaseSearchBackend`` is a portable fallback that only matches titles and
+topic names. ``VectorSearchBackend`` ranks documents by the semantic
+similarity of their best chunk (see ``vectors.py``). Custom backends
+subclass ``BaseSearchBackend``.
+"""
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+# Control characters can't appear in extracted text, so they make safe
+# highlight markers that are turned into HTML after escaping.
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+
+@dataclass
+class SearchHit:
+    document_id: int
+    rank: float
+    snippet: str = ''
+
+
+class BaseSearchBackend:
+    """
+    Interface every search backend implements.
+    """
+    # Whether the backend wants the extracted text of each document.
+    indexes_content = True
+
+    def index_document(self, document, text=''):
+        """
+        Add or replace ``document`` in the index with its extracted ``text``.
+        """
+        raise NotImplementedError
+
+    def update_document(self, document):
+        """
+        Refresh the title and topic name stored for an edited document.
+        """
+
+    def update_topic(self, topic):
+        """
+        Refresh the topic name stored for the topic's documents.
+        """
+
+    def remove_document(self, document_id):
+        raise NotImplementedError
+
+    def search(self, user, query, limit=None):
+        """
+        Return up to ``limit`` ``SearchHit``s for ``user``, best first.
+        """
+        raise NotImplementedError
+
+    def clear(self, user=None):
+        raise NotImplementedError
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """
+    Substring matching on title and topic name; works on every database.
+    """
+    indexes_content = False
+
+    def index_document(self, document, text=''):
+        pass
+
+    def remove_document(self, document_id):
+        pass
+
+    def search(self, user, query, limit=None):
+        from .models import Document
+
+        ids = Document.objects.filter(
+            Q(title__icontains=query) | Q(topic__name__icontains=query),
+            user=user,
+        ).order_by('-uploaded_at').values_list('id', flat=True)[:limit or get_result_limit()]
+        return [SearchHit(document_id=pk, rank=position) for position, pk in enumerate(ids)]
+
+    def clear(self, user=None):
+        pass
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    """
+    SQLite FTS5 index. The rowid is the document id and the owner is stored
+    as a token, so per-user searches intersect posting lists instead of
+    filtering matches afterwards.
+    """
+    table = 'subjects_document_fts'
+
+    # bm25() weights for owner, title, topic and content.
+    weights = (0.0, 10.0, 4.0, 1.0)
+
+    # Whether the table exists, per database file.
+    _available = {}
+
+    @staticmethod
+    def owner_token(user_id):
+        return f'u{user_id}'
+
+    def is_available(self):
+        """
+        Whether the connection has the FTS5 table; it is only created on
+        SQLite.
+        """
+        if connection.vendor != 'sqlite':
+            return False
+        name = str(connection.settings_dict['NAME'])
+        if name not in self._available:
+            self._available[name] = self.table in connection.introspection.table_names()
+        return self._available[name]
+
+    def index_document(self, document, text=''):
+        if not self.is_available():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [document.pk])
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, owner, title, topic, content) VALUES (%s, %s, %s, %s, %s)',
+                [document.pk, self.owner_token(document.user_id), document.title, document.topic.name, text],
+            )
+
+    def update_document(self, document):
+        if not self.is_available():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {self.table} SET title = %s, topic = %s WHERE rowid = %s',
+                [document.title, document.topic.name, document.pk],
+            )
+
+    def update_topic(self, topic):
+        from .models import Document
+
+        if not self.is_available():
+            return
+        ids = list(Document.objects.filter(topic=topic).values_list('id', flat=True))
+        if not ids:
+            return
+        placeholders = ', '.join(['%s'] * len(ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {self.table} SET topic = %s WHERE rowid IN ({placeholders})',
+                [topic.name, *ids],
+            )
+
+    def remove_document(self, document_id):
+        if not self.is_available():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [document_id])
+
+    def search(self, user, query, limit=None):
+        match = self.build_match(user.pk, query)
+        if match is None or not self.is_available():
+            return []
+        weights = ', '.join(str(w) for w in self.weights)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, bm25({self.table}, {weights}) AS rank, '
+                f"snippet({self.table}, 3, %s, %s, '…', 16) "
+                f'FROM {self.table} WHERE {self.table} MATCH %s ORDER BY rank LIMIT %s',
+                [_MARK_START, _MARK_END, match, limit or get_result_limit()],
+            )
+            return [
+                SearchHit(document_id=rowid, rank=rank, snippet=highlight(snippet))
+                for rowid, rank, snippet in cursor.fetchall()
+            ]
+
+    def build_match(self, user_id, query):
+        """
+        Turn free text into an FTS5 query: every word must match as a prefix
+        in the title, topic or content of one of the user's documents.
+        """
+        terms = _TERM.findall(query)
+        if not terms:
+            return None
+        words = ' AND '.join('"{}"*'.format(term.replace('"', '')) for term in terms)
+        return f'owner:{self.owner_token(user_id)} AND {{title topic content}} : ({words})'
+
+    def clear(self, user=None):
+        if not self.is_available():
+            return
+        with connection.cursor() as cursor:
+            if user is None:
+                cursor.execute(f'DELETE FROM {self.table}')
+            else:
+                cursor.execute(
+                    f'DELETE FROM {self.table} WHERE {self.table} MATCH %s',
+                    [f'owner:{self.owner_token(user.pk)}'],
+                )
+
+
+class VectorSearchBackend(BaseSearchBackend):
+    """
+    Ranks documents by their chunk most similar to the query. The vector
+    index is kept up to date by ingestion and the document signals whatever
+    the search backend, so there is nothing to do here on changes.
+    """
+    indexes_content = False
+
+    # Chunks considered per document returned, as a document often has
+    # several of the best chunks.
+    chunks_per_hit = 4
+
+    def index_document(self, document, text=''):
+        pass
+
+    def remove_document(self, document_id):
+        pass
+
+    def search(self, user, query, limit=None):
+        from . import vectors
+
+        limit = limit or get_result_limit()
+        hits = {}
+        for hit in vectors.search(user, query, limit=limit * self.chunks_per_hit):
+            if hit.chunk.document_id not in hits:
+                hits[hit.chunk.document_id] = SearchHit(document_id=hit.chunk.document_id, rank=-hit.score)
+        return list(hits.values())[:limit]
+
+    def clear(self, user=None):
+        from . import vectors
+
+        vectors.clear(user.pk if user is not None else None)
+
+
+def highlight(snippet):
+    """
+    Escape a snippet and turn the highlight markers into ``<mark>`` tags.
+    """
+    html = escape(snippet or '')
+    return mark_safe(html.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
+
+
+def get_result_limit():
+    return getattr(settings, 'SEARCH_RESULT_LIMIT', 200)
+
+
+def get_backend_path():
+    path = getattr(settings, 'SEARCH_BACKEND', None)
+    if path:
+        return path
+    if connection.vendor == 'sqlite':
+        return 'subjects.search.SQLiteFTS5Backend'
+    return 'subjects.search.DatabaseSearchBackend'
+
+
+@lru_cache(maxsize=None)
+def _load_backend(path):
+    return import_string(path)()
+
+
+def get_backend():
+    return _load_backend(get_backend_path())
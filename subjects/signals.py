@@ -0,0 +1,148 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import cache, counters, search, uploads, vectors
+from .models import Blob, Document, Preview, Subject, Topic, UploadSession
+
+
+@receiver(post_delete, sender=Document)
+def release_document_blob(sender, instance, **kwargs):
+    """
+    Drop the document's reference, which ``Document.save`` took; this also
+    runs for cascade deletes.
+    """
+    if instance.blob_id:
+        Blob.objects.release(instance.blob_id)
+
+
+@receiver(post_save, sender=Document)
+def index_new_document(sender, instance, created, raw=False, **kwargs):
+    """
+    Make new documents findable by title and topic right away; ingestion
+    adds their content later.
+    """
+    if created and not raw:
+        search.get_backend().index_document(instance)
+
+
+@receiver(post_save, sender=Document)
+def reindex_document_title(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if created or raw:
+        return
+    if update_fields is None or {'title', 'topic'} & set(update_fields):
+        search.get_backend().update_document(instance)
+
+
+@receiver(post_delete, sender=Document)
+def unindex_document(sender, instance, **kwargs):
+    search.get_backend().remove_document(instance.pk)
+
+
+@receiver(pre_delete, sender=Document)
+def unindex_document_chunks(sender, instance, **kwargs):
+    """
+    Runs before the cascade removes the chunks, while their rows in the
+    vector index are still known.
+    """
+    vectors.remove_document(instance.pk)
+
+
+@receiver(pre_save, sender=Document)
+def remember_document_placement(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Note where an existing document is counted before it is saved, so its
+    counts can follow it to another topic.
+    """
+    instance._counted_as = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not {'subject', 'topic', 'file_size'} & set(update_fields):
+        return
+    instance._counted_as = Document.objects.filter(pk=instance.pk).values_list(
+        'subject_id', 'topic_id', 'file_size'
+    ).first()
+
+
+@receiver(post_save, sender=Document)
+def count_document(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.document_added(instance)
+    elif getattr(instance, '_counted_as', None) is not None:
+        counters.document_moved(instance, *instance._counted_as)
+
+
+@receiver(post_delete, sender=Document)
+def uncount_document(sender, instance, origin=None, **kwargs):
+    """
+    Documents deleted along with their topic or subject are taken off by
+    ``uncount_topic``, or go with the subject's counters.
+    """
+    if counters.deleted_by(origin, Document):
+        counters.document_removed(instance)
+
+
+@receiver(post_save, sender=Topic)
+def count_topic(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.topic_added(instance)
+
+
+@receiver(post_delete, sender=Topic)
+def uncount_topic(sender, instance, origin=None, **kwargs):
+    if counters.deleted_by(origin, Topic):
+        counters.topic_removed(instance)
+
+
+@receiver(post_save, sender=Topic)
+def reindex_topic_name(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        search.get_backend().update_topic(instance)
+
+
+def subject_owner(instance):
+    """
+    User id owning the subject of a topic or document, without a query when
+    the subject is already loaded.
+    """
+    subject = instance._meta.get_field('subject').get_cached_value(instance, default=None)
+    if subject is not None:
+        return subject.user_id
+    return Subject.objects.filter(pk=instance.subject_id).values_list('user_id', flat=True).first()
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def invalidate_subject_cache(sender, instance, **kwargs):
+    cache.invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=Topic)
+@receiver(post_delete, sender=Topic)
+@receiver(post_save, sender=Document)
+@receiver(post_delete, sender=Document)
+def invalidate_subject_content_cache(sender, instance, **kwargs):
+    """
+    During a cascade delete the subject row is already gone and the owner
+    can't be looked up; the subject's own signal covers that case.
+    """
+    cache.invalidate_user(subject_owner(instance))
+
+
+@receiver(post_delete, sender=UploadSession)
+def discard_upload_part(sender, instance, **kwargs):
+    """
+    Remove the received bytes of abandoned uploads, including those of
+    deleted subjects and topics.
+    """
+    uploads.discard(instance)
+
+
+@receiver(post_delete, sender=Preview)
+def delete_preview_file(sender, instance, **kwargs):
+    """
+    Remove the image of evicted previews and of those of deleted blobs.
+    """
+    transaction.on_commit(lambda: instance.file.delete(save=False))
@@ -0,0 +1,94 @@
+"""
+Subject tags.
+
+Tags are rows of their own, unique per user by normalised name (whitespace
+collapsed, case folded), and linked to subjects through ``SubjectTag``. The
+``(user, name)`` unique index serves exact lookups for the ``?tag=`` list
+filters as well as autocompletion, which reads a range of it:
+``name >= prefix AND name < prefix + U+10FFFF`` instead of a ``LIKE``
+pattern the database can't use the index for.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from luminote.database import write_transaction
+
+from .models import SubjectTag, Tag
+
+MAX_LENGTH = 50
+
+# Sorts after every character, so it closes the range of a prefix.
+_PREFIX_END = '\U0010ffff'
+
+
+def get_autocomplete_limit():
+    return getattr(settings, 'TAG_AUTOCOMPLETE_LIMIT', 10)
+
+
+def normalise(name):
+    return ' '.join(name.split()).casefold()[:MAX_LENGTH].strip()
+
+
+def parse(text):
+    """
+    Normalised, distinct tag names of comma-separated ``text``, in order.
+    """
+    names = []
+    for name in text.split(','):
+        name = normalise(name)
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def get_or_create_tags(user, names):
+    """
+    Return ``{name: Tag}`` for normalised ``names``, creating missing tags.
+    """
+    tags = {tag.name: tag for tag in Tag.objects.filter(user=user, name__in=names)}
+    for name in names:
+        if name in tags:
+            continue
+        try:
+            with transaction.atomic():
+                tags[name] = Tag.objects.create(user=user, name=name)
+        except IntegrityError:
+            # Created by a concurrent request in the meantime.
+            tags[name] = Tag.objects.get(user=user, name=name)
+    return tags
+
+
+def set_tags(subject, names):
+    """
+    Make ``names`` the tags of ``subject``. The subject is saved again when
+    they change, which bumps its ``updated_at`` for list ETags and
+    invalidates the owner's cached pages. Returns whether anything changed.
+    """
+    names = [name for name in dict.fromkeys(normalise(name) for name in names) if name]
+    with write_transaction():
+        current = dict(SubjectTag.objects.filter(subject=subject).values_list('tag__name', 'pk'))
+        removed = [pk for name, pk in current.items() if name not in names]
+        added = [name for name in names if name not in current]
+        if not removed and not added:
+            return False
+        if removed:
+            SubjectTag.objects.filter(pk__in=removed).delete()
+        tags = get_or_create_tags(subject.user, added)
+        SubjectTag.objects.bulk_create(
+            [SubjectTag(subject=subject, tag=tags[name]) for name in added],
+            ignore_conflicts=True,
+        )
+        subject.save(update_fields=['updated_at'])
+    return True
+
+
+def autocomplete(user, prefix, limit=None):
+    """
+    Up to ``limit`` of the user's tag names starting with ``prefix``.
+    """
+    prefix = ' '.join(prefix.split()).casefold()
+    tags = Tag.objects.filter(user=user)
+    if prefix:
+        tags = tags.filter(name__gte=prefix, name__lt=prefix + _PREFIX_END)
+    return list(tags.order_by('name').values_list('name', flat=True)[:limit or get_autocomplete_limit()])
+
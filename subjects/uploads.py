@@ -0,0 +1,219 @@
+"""
+Resumable chunked uploads.
+
+A client opens an ``UploadSession`` announcing the file name and size, then
+PUTs the bytes in chunks. Every chunk carries an ``Upload-Offset`` header that
+must equal the number of bytes the server already holds; after a dropped
+connection the client asks for the current offset (HEAD/GET) and continues
+from there. Finally it POSTs to ``complete/`` and the document is created.
+Files upload independently, so several can be sent in parallel.
+
+Chunks are appended to a part file under ``RESUMABLE_UPLOAD_DIR`` and hashed
+while they are written. The running SHA-256 is kept in process memory; a
+worker that doesn't have it (another process, or after a restart) rehashes
+the bytes received so far once and carries on. On completion the part file
+is moved, not copied, into blob storage, before the write transaction that
+creates the document.
+"""
+import hashlib
+import os
+import threading
+
+from django.conf import settings
+from django.core.files import File, locks
+from django.utils import timezone
+
+from luminote.database import write_transaction
+
+from . import ingestion
+from .models import Document, UploadSession
+
+# Read size when copying a chunk from the request to disk.
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Hashers of sessions uploading through this process: id -> (offset, hasher).
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+class OffsetMismatch(Exception):
+    """
+    The chunk doesn't start where the stored bytes end.
+    """
+    def __init__(self, offset):
+        super().__init__(f'Upload is at offset {offset}.')
+        self.offset = offset
+
+
+class ChunkTooLarge(Exception):
+    pass
+
+
+class IncompleteUpload(Exception):
+    pass
+
+
+class PartialUpload(File):
+    """
+    A complete file sitting in a local temporary location. Storage backends
+    that support it (the file system one does) move it into place instead of
+    copying it.
+    """
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def upload_dir():
+    return getattr(settings, 'RESUMABLE_UPLOAD_DIR', os.path.join(settings.MEDIA_ROOT, 'uploads'))
+
+
+def part_path(session):
+    return os.path.join(upload_dir(), f'{session.pk}.part')
+
+
+def lock_path(session):
+    return os.path.join(upload_dir(), f'{session.pk}.lock')
+
+
+def _take_hasher(session, offset):
+    """
+    Return the SHA-256 state of the first ``offset`` bytes of the part file.
+    """
+    with _hashers_lock:
+        saved = _hashers.pop(session.pk, None)
+    if saved is not None and saved[0] == offset:
+        return saved[1]
+    hasher = hashlib.sha256()
+    if offset:
+        with open(part_path(session), 'rb') as f:
+            remaining = offset
+            while remaining:
+                chunk = f.read(min(COPY_BUFFER_SIZE, remaining))
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                remaining -= len(chunk)
+    return hasher
+
+
+def _put_hasher(session, offset, hasher):
+    with _hashers_lock:
+        _hashers[session.pk] = (offset, hasher)
+
+
+def forget(session):
+    with _hashers_lock:
+        _hashers.pop(session.pk, None)
+
+
+def append_chunk(session, offset, stream, length):
+    """
+    Append ``length`` bytes read from ``stream`` at ``offset`` and return the
+    new offset. Bytes that arrived before the client went away are kept, so
+    the next chunk resumes after them.
+    """
+    os.makedirs(upload_dir(), exist_ok=True)
+    with open(part_path(session), 'ab') as f:
+        # Parallel requests for the same session take turns.
+        locks.lock(f, locks.LOCK_EX)
+        try:
+            current = UploadSession.objects.filter(pk=session.pk).values_list('offset', flat=True).get()
+            if offset != current:
+                raise OffsetMismatch(current)
+            if current + length > session.size:
+                raise ChunkTooLarge(f'Chunk ends past the announced size of {session.size} bytes.')
+
+            # Drop bytes written after the last recorded offset (a crash
+            # between writing and recording them).
+            f.truncate(current)
+            hasher = _take_hasher(session, current)
+            written = 0
+            try:
+                while written < length:
+                    chunk = stream.read(min(COPY_BUFFER_SIZE, length - written))
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    hasher.update(chunk)
+                    written += len(chunk)
+            finally:
+                f.flush()
+                os.fsync(f.fileno())
+                session.offset = current + written
+                UploadSession.objects.filter(pk=session.pk).update(offset=session.offset, updated_at=timezone.now())
+                _put_hasher(session, session.offset, hasher)
+        finally:
+            locks.unlock(f)
+    return session.offset
+
+
+def complete(session):
+    """
+    Create the document from a fully received upload and queue it for
+    ingestion. Completing twice, even concurrently, returns the same
+    document.
+
+    The part file is hashed and moved into blob storage before the write
+    transaction, which only claims the session and inserts the rows.
+    Completions of the same session take turns on a lock file, so a second
+    one finds the document rather than a part file that is already gone.
+    """
+    if session.is_complete:
+        return session.document
+    if session.offset != session.size:
+        raise IncompleteUpload(f'{session.offset} of {session.size} bytes received.')
+
+    os.makedirs(upload_dir(), exist_ok=True)
+    with open(lock_path(session), 'a') as lock:
+        locks.lock(lock, locks.LOCK_EX)
+        try:
+            current = UploadSession.objects.get(pk=session.pk)
+            if current.is_complete:
+                return current.document
+
+            digest = _take_hasher(session, session.offset).hexdigest()
+            _root, ext = os.path.splitext(session.filename)
+            with open(part_path(session), 'rb') as f:
+                upload = PartialUpload(f, name=session.filename)
+                upload.sha256 = digest
+                document = Document(
+                    subject=session.subject,
+                    topic=session.topic,
+                    title=session.title,
+                    document_type=session.document_type,
+                    file=upload,
+                    file_size=session.size,
+                    file_type=ext.lower().lstrip('.'),
+                    page_count=None,
+                    status=Document.STATUS_PENDING,
+                )
+                document.stage_upload()
+
+            with write_transaction():
+                # Sessions completed outside this host's lock file still
+                # can't get two documents.
+                claimed = UploadSession.objects.select_for_update().get(pk=session.pk)
+                if claimed.is_complete:
+                    return claimed.document
+                document.save()
+                session.document = document
+                session.save(update_fields=['document', 'updated_at'])
+                ingestion.enqueue(document)
+        finally:
+            locks.unlock(lock)
+
+    # Still there if the content was already stored as a blob.
+    discard(session)
+    return document
+
+
+def discard(session):
+    """
+    Remove the part file, lock file and hasher of a session.
+    """
+    forget(session)
+    for path in (part_path(session), lock_path(session)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
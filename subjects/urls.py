@@ -18,8 +18,31 @@ urlpatterns = [
     # Document URLs
     path('documents/', views.DocumentListView.as_view(), name='document_list'),
     path('<int:subject_pk>/documents/upload/', views.DocumentUploadView.as_view(), name='document_upload'),
+    path('<int:subject_pk>/documents/bulk/', views.DocumentBulkUploadView.as_view(), name='document_bulk_upload'),
     path('documents/<int:pk>/delete/', views.DocumentDeleteView.as_view(), name='document_delete'),
+    path('documents/<int:pk>/download/', views.download_document, name='document_download'),
+    path('documents/<int:pk>/preview/<int:page>/', views.document_preview, name='document_preview'),
+    path('documents/<int:pk>/pages/', views.document_pages, name='document_pages'),
+
+    # Resumable upload URLs
+    path('<int:subject_pk>/uploads/', views.UploadSessionCreateView.as_view(), name='upload_session_create'),
+    path('uploads/<uuid:pk>/', views.UploadSessionView.as_view(), name='upload_session'),
+    path('uploads/<uuid:pk>/complete/', views.UploadSessionCompleteView.as_view(), name='upload_session_complete'),
+
+    # Flashcard review URLs
+    path('reviews/', views.ReviewView.as_view(), name='review'),
+
+    # Quiz URLs
+    path('topics/<int:pk>/quizzes/create/', views.TopicQuizCreateView.as_view(), name='topic_quiz_create'),
+    path('quizzes/weak-areas/', views.WeakAreasQuizCreateView.as_view(), name='weak_areas_quiz_create'),
+    path('quizzes/<int:pk>/', views.QuizDetailView.as_view(), name='quiz_detail'),
+    path('quizzes/<int:pk>/questions/<int:position>/', views.QuizAnswerView.as_view(), name='quiz_answer'),
 
     # API URLs
     path('api/subjects/<int:subject_id>/topics/', views.get_topics_for_subject, name='api_get_topics'),
+    path('api/search/semantic/', views.semantic_search, name='api_semantic_search'),
+    path('api/tags/', views.tag_autocomplete, name='api_tag_autocomplete'),
+    path('api/cache/stats/', views.cache_stats, name='api_cache_stats'),
+    path('api/reviews/', views.record_reviews, name='api_record_reviews'),
+    path('api/reviews/due/', views.due_reviews, name='api_due_reviews'),
 ]
@@ -0,0 +1,377 @@
+"""
+Semantic search over document chunks with a per-user vector index.
+
+During ingestion every page of a document is cut into overlapping chunks of
+``VECTOR_CHUNK_WORDS`` words, and each chunk is embedded with a hashing
+vectorizer: words and word pairs are hashed into ``VECTOR_DIMENSIONS``
+signed buckets, weighted by ``1 + log(count)`` and L2-normalised. The
+vectorizer has no vocabulary to fit, so chunks can be added one document at
+a time and the embedding of a query never changes as the index grows.
+
+The vectors of a user's chunks are the rows of one float32 file under
+``VECTOR_INDEX_ROOT``, opened as a NumPy memory map, and ``DocumentChunk``
+rows map those row numbers back to a document, page and character range.
+Adding a document appends rows to the file; deleting one zeroes its rows
+once the deleting transaction commits, so they never match again, and the
+file is rewritten without them once dead rows outnumber live ones. Writers
+hold the user's lock exclusively; searches share it. A query is one matrix-vector product over the
+user's rows followed by a partial sort, which takes milliseconds even for
+100,000 chunks. Each process keeps the maps of the
+``VECTOR_MAP_CACHE_SIZE`` most recently searched users open.
+
+NumPy is optional. Without it (or with ``VECTOR_INDEX_ENABLED = False``)
+nothing is indexed and semantic search returns no results.
+"""
+import fcntl
+import math
+import os
+import re
+import threading
+import zlib
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import DocumentChunk, DocumentPage
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DTYPE = 'float32'
+ITEM_SIZE = 4
+
+# The file is compacted when dead rows outnumber live ones and there are at
+# least this many of them.
+COMPACT_MIN_DEAD_ROWS = 1000
+
+# Rows written per query.
+BATCH_SIZE = 500
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+_WORD = re.compile(r'\S+')
+
+# Index path -> (file identity, memory map), least recently used first.
+_maps = OrderedDict()
+_maps_lock = threading.Lock()
+
+
+@dataclass
+class ChunkHit:
+    chunk: DocumentChunk
+    score: float
+
+
+def get_dimensions():
+    return getattr(settings, 'VECTOR_DIMENSIONS', 384)
+
+
+def get_chunk_words():
+    return getattr(settings, 'VECTOR_CHUNK_WORDS', 200)
+
+
+def get_chunk_overlap():
+    return getattr(settings, 'VECTOR_CHUNK_OVERLAP', 40)
+
+
+def get_map_cache_size():
+    return getattr(settings, 'VECTOR_MAP_CACHE_SIZE', 32)
+
+
+def get_root():
+    return getattr(settings, 'VECTOR_INDEX_ROOT', os.path.join(settings.MEDIA_ROOT, 'vectors'))
+
+
+def is_enabled():
+    return np is not None and getattr(settings, 'VECTOR_INDEX_ENABLED', True)
+
+
+def features(text):
+    """
+    Words and adjacent word pairs of ``text``, lower-cased.
+    """
+    words = [word.lower() for word in _TERM.findall(text)]
+    return words + [f'{first} {second}' for first, second in zip(words, words[1:])]
+
+
+def embed(texts):
+    """
+    Return a ``(len(texts), dimensions)`` array of unit-length vectors; text
+    without any words gives a zero vector.
+    """
+    dimensions = get_dimensions()
+    matrix = np.zeros((len(texts), dimensions), dtype=DTYPE)
+    for index, text in enumerate(texts):
+        for feature, count in Counter(features(text)).items():
+            # crc32 is stable across processes, unlike hash().
+            digest = zlib.crc32(feature.encode('utf-8'))
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            matrix[index, (digest & 0x7fffffff) % dimensions] += sign * (1.0 + math.log(count))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def chunk_spans(text, words=None, overlap=None):
+    """
+    Yield ``(start, end)`` character ranges of ``text`` covering ``words``
+    words each, consecutive ranges sharing ``overlap`` words.
+    """
+    words = words or get_chunk_words()
+    overlap = get_chunk_overlap() if overlap is None else overlap
+    spans = [match.span() for match in _WORD.finditer(text)]
+    step = max(words - overlap, 1)
+    for first in range(0, len(spans), step):
+        last = min(first + words, len(spans)) - 1
+        yield spans[first][0], spans[last][1]
+        if last == len(spans) - 1:
+            break
+
+
+def index_path(user_id):
+    return os.path.join(get_root(), f'u{user_id}.f32')
+
+
+@contextmanager
+def locked(user_id, shared=False):
+    """
+    Hold the user's index lock, shared by threads and processes: exclusively
+    to change the index, or ``shared`` with other readers.
+    """
+    os.makedirs(get_root(), exist_ok=True)
+    with open(os.path.join(get_root(), f'u{user_id}.lock'), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def row_count(user_id):
+    try:
+        return os.path.getsize(index_path(user_id)) // (get_dimensions() * ITEM_SIZE)
+    except FileNotFoundError:
+        return 0
+
+
+def load(user_id):
+    """
+    The user's index as a read-only ``(rows, dimensions)`` memory map, or
+    None when it is empty. Maps are reused until the file changes.
+    """
+    path = index_path(user_id)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    rows = stat.st_size // (get_dimensions() * ITEM_SIZE)
+    if not rows:
+        return None
+    key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    with _maps_lock:
+        cached = _maps.get(path)
+        if cached is not None and cached[0] == key:
+            _maps.move_to_end(path)
+            return cached[1]
+        matrix = np.memmap(path, dtype=DTYPE, mode='r', shape=(rows, get_dimensions()))
+        _maps[path] = (key, matrix)
+        _maps.move_to_end(path)
+        # The mapping and its file descriptor go once nothing refers to it.
+        while len(_maps) > get_map_cache_size():
+            _maps.popitem(last=False)
+    return matrix
+
+
+def file_id(user_id):
+    """
+    Identity of the user's index file, which compaction changes.
+    """
+    try:
+        return os.stat(index_path(user_id)).st_ino
+    except FileNotFoundError:
+        return None
+
+
+def index_document(document, texts):
+    """
+    Replace the chunks of ``document`` with those of its page ``texts``.
+    Returns the number of chunks indexed.
+    """
+    if not is_enabled():
+        return 0
+    user_id = document.user_id
+
+    chunks, bodies = [], []
+    for number, text in enumerate(texts, start=1):
+        for start, end in chunk_spans(text):
+            chunks.append(DocumentChunk(user_id=user_id, document_id=document.pk, page=number, start=start, end=end))
+            bodies.append(text[start:end])
+    vectors = embed(bodies) if chunks else None
+
+    # The old chunks go under the same lock the new ones are added with, so
+    # a concurrent run for the document can't leave both sets behind.
+    with locked(user_id):
+        removed = _remove_chunks(user_id, DocumentChunk.objects.filter(document_id=document.pk))
+        if chunks:
+            first = row_count(user_id)
+            with open(index_path(user_id), 'ab') as index_file:
+                index_file.write(vectors.tobytes())
+            for row, chunk in enumerate(chunks, start=first):
+                chunk.row = row
+            DocumentChunk.objects.bulk_create(chunks, batch_size=BATCH_SIZE)
+    if removed:
+        _compact_if_sparse(user_id)
+    return len(chunks)
+
+
+def remove_document(document_id):
+    """
+    Drop ``document_id`` from the index: its chunks are deleted, and their
+    vectors zeroed once the transaction commits, so they no longer match
+    and a rollback leaves the index whole. Indexes that are mostly dead
+    rows are then compacted.
+    """
+    if not is_enabled():
+        return
+    chunks = DocumentChunk.objects.filter(document_id=document_id)
+    user_id = chunks.values_list('user_id', flat=True).first()
+    if user_id is None:
+        return
+    rows = list(chunks.values_list('row', flat=True))
+    chunks.delete()
+    identity = file_id(user_id)
+
+    def zero():
+        with locked(user_id):
+            # A compaction in the meantime renumbered the rows. These may
+            # still be in the file it wrote, but searches skip rows without
+            # a chunk and the next compaction drops them.
+            if file_id(user_id) != identity:
+                return
+            # Never zero rows of existing chunks, should the file id repeat.
+            reused = set(DocumentChunk.objects.filter(user_id=user_id, row__in=rows).values_list('row', flat=True))
+            _zero_rows(user_id, [row for row in rows if row not in reused])
+        _compact_if_sparse(user_id)
+
+    transaction.on_commit(zero)
+
+
+def _remove_chunks(user_id, chunks):
+    """
+    Delete ``chunks`` and zero their rows; the caller holds the user's
+    lock. Returns the number of chunks removed.
+    """
+    rows = list(chunks.values_list('row', flat=True))
+    if not rows:
+        return 0
+    chunks.delete()
+    _zero_rows(user_id, rows)
+    return len(rows)
+
+
+def _zero_rows(user_id, rows):
+    total = row_count(user_id)
+    rows = [row for row in rows if row < total]
+    if rows:
+        matrix = np.memmap(index_path(user_id), dtype=DTYPE, mode='r+', shape=(total, get_dimensions()))
+        matrix[rows] = 0
+        matrix.flush()
+        del matrix
+
+
+def _compact_if_sparse(user_id):
+    total = row_count(user_id)
+    dead = total - DocumentChunk.objects.filter(user_id=user_id).count()
+    if dead >= COMPACT_MIN_DEAD_ROWS and dead > total - dead:
+        compact(user_id)
+
+
+def compact(user_id):
+    """
+    Rewrite the user's index with only the rows of existing chunks.
+    """
+    with locked(user_id), transaction.atomic():
+        total = row_count(user_id)
+        chunks = list(DocumentChunk.objects.filter(user_id=user_id).order_by('row').only('pk', 'row'))
+        path = index_path(user_id)
+        if total:
+            matrix = np.memmap(path, dtype=DTYPE, mode='r', shape=(total, get_dimensions()))
+            live = np.ascontiguousarray(matrix[[chunk.row for chunk in chunks]])
+            del matrix
+        else:
+            live = np.zeros((0, get_dimensions()), dtype=DTYPE)
+        # Move every row out of the way first, so renumbering never
+        # collides with a row that hasn't been renumbered yet.
+        DocumentChunk.objects.filter(user_id=user_id).update(row=F('row') + total)
+        for row, chunk in enumerate(chunks):
+            chunk.row = row
+        DocumentChunk.objects.bulk_update(chunks, ['row'], batch_size=BATCH_SIZE)
+        with open(f'{path}.tmp', 'wb') as index_file:
+            index_file.write(live.tobytes())
+        os.replace(f'{path}.tmp', path)
+    return len(chunks)
+
+
+def clear(user_id=None):
+    """
+    Remove the index of one user, or of every user.
+    """
+    chunks = DocumentChunk.objects.all()
+    if user_id is None:
+        names = [name for name in os.listdir(get_root()) if name.endswith('.f32')] if os.path.isdir(get_root()) else []
+        users = [int(name[1:-4]) for name in names if name[1:-4].isdigit()]
+    else:
+        chunks = chunks.filter(user_id=user_id)
+        users = [user_id]
+    chunks.delete()
+    for user in users:
+        with locked(user):
+            if os.path.exists(index_path(user)):
+                os.remove(index_path(user))
+
+
+def search(user, query, limit=10):
+    """
+    Return up to ``limit`` ``ChunkHit``s of the user's chunks most similar
+    to ``query``, best first.
+    """
+    if not is_enabled() or limit <= 0:
+        return []
+    vector = embed([query])[0]
+    if not vector.any():
+        return []
+    # Compaction renumbers rows, so the rows scored must be looked up
+    # before another process can rewrite the index.
+    with locked(user.pk, shared=True):
+        matrix = load(user.pk)
+        if matrix is None:
+            return []
+        scores = matrix @ vector
+        count = min(limit, len(scores))
+        best = np.argpartition(-scores, count - 1)[:count]
+        best = best[np.argsort(-scores[best])]
+        best = [row for row in best.tolist() if scores[row] > 0]
+        chunks = DocumentChunk.objects.filter(user=user, row__in=best).select_related('document')
+        by_row = {chunk.row: chunk for chunk in chunks}
+    return [ChunkHit(by_row[row], float(scores[row])) for row in best if row in by_row]
+
+
+def chunk_texts(chunks):
+    """
+    Map each chunk to its text, reading each page once.
+    """
+    keys = {(chunk.document.blob_id, chunk.page) for chunk in chunks if chunk.document.blob_id}
+    texts = {}
+    for blob_id, page in keys:
+        stored = DocumentPage.objects.filter(blob_id=blob_id, number=page).first()
+        if stored is not None:
+            texts[blob_id, page] = stored.text
+    return {
+        chunk.pk: texts.get((chunk.document.blob_id, chunk.page), '')[chunk.start:chunk.end]
+        for chunk in chunks
+    }
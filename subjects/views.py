@@ -1,31 +1,172 @@
+import json
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse_lazy, reverse
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, View
+from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, FormView, TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import require_POST
 from django.utils.translation import gettext_lazy as _
-from django.http import HttpResponseRedirect, JsonResponse
-from django.db.models import Q
+from django.http import Http404, HttpResponse, HttpResponseRedirect, JsonResponse
+from django.db.models import Case, IntegerField, When
+
+from luminote.database import replica_reads
+
+from .models import Subject, Topic, Document, UploadSession, Question, Quiz, QuizQuestion, TopicPerformance
+from .forms import SubjectForm, TopicForm, DocumentForm, UploadSessionForm, BulkUploadForm
+from . import (
+    bulk, cache as user_cache, delivery, pages, previews, quizzes, rendering, scheduling, search, tags as subject_tags,
+    uploads, vectors,
+)
+from .conditional import conditional
+from .pagination import KeysetPaginationMixin, KeysetPaginator, decode_cursor, json_page
+
+# Columns the document list templates and JSON endpoints actually use.
+DOCUMENT_LIST_FIELDS = (
+    'title', 'document_type', 'file_type', 'file_size', 'page_count',
+    'status', 'uploaded_at', 'subject__name', 'topic__name',
+)
+
+
+def user_subjects(user):
+    """
+    The user's subjects as ``{'id', 'name'}`` dicts for filter dropdowns.
+    """
+    return user_cache.cached(user.pk, 'subject-choices', (), lambda: list(
+        Subject.objects.filter(user=user).values('id', 'name')
+    ))
+
+
+def subject_topics(user, subject_id):
+    """
+    Topics of one of the user's subjects as ``{'id', 'name'}`` dicts, or None
+    if the subject doesn't exist or belongs to someone else.
+    """
+    def compute():
+        if not Subject.objects.filter(pk=subject_id, user=user).exists():
+            return None
+        return list(Topic.objects.filter(subject_id=subject_id).order_by('name').values('id', 'name'))
+    return user_cache.cached(user.pk, 'topic-choices', (int(subject_id),), compute)
+
+
+def subject_list_querysets(request, *args, **kwargs):
+    # The cards show counters that change with the subjects' topics and documents.
+    return [
+        Subject.objects.filter(user=request.user),
+        Topic.objects.filter(subject__user=request.user),
+        Document.objects.filter(user=request.user),
+    ]
+
+
+def document_list_querysets(request, *args, **kwargs):
+    # The list also shows subject and topic names and the filter dropdowns.
+    return [
+        Document.objects.filter(user=request.user),
+        Subject.objects.filter(user=request.user),
+        Topic.objects.filter(subject__user=request.user),
+    ]
+
+
+def topic_detail_querysets(request, pk, *args, **kwargs):
+    return [
+        Topic.objects.filter(pk=pk),
+        Subject.objects.filter(topics=pk),
+        Document.objects.filter(topic_id=pk),
+        Question.objects.filter(topic_id=pk),
+        TopicPerformance.objects.filter(topic_id=pk, user=request.user),
+    ]
+
 
-from .models import Subject, Topic, Document
-from .forms import SubjectForm, TopicForm, DocumentForm
+def subject_topics_querysets(request, subject_id, *args, **kwargs):
+    return [
+        Subject.objects.filter(pk=subject_id, user=request.user),
+        Topic.objects.filter(subject_id=subject_id, subject__user=request.user),
+    ]
 
-class SubjectListView(LoginRequiredMixin, ListView):
+
+class CachedObjectMixin:
+    """
+    Fetch the object once per request; ``test_func`` and ``get`` both ask for it.
+    """
+    def get_object(self, queryset=None):
+        if queryset is None and getattr(self, '_object', None) is not None:
+            return self._object
+        obj = super().get_object(queryset)
+        if queryset is None:
+            self._object = obj
+        return obj
+
+
+def serialize_document(document, snippet=''):
+    """
+    JSON representation of a document for the paginated list endpoints.
+    """
+    return {
+        'id': document.pk,
+        'title': document.title,
+        'document_type': document.document_type,
+        'file_type': document.file_type,
+        'file_size': document.file_size,
+        'page_count': document.page_count,
+        'status': document.status,
+        'uploaded_at': document.uploaded_at.isoformat(),
+        'url': reverse('document_download', kwargs={'pk': document.pk}),
+        'subject': {'id': document.subject_id, 'name': document.subject.name},
+        'topic': {'id': document.topic_id, 'name': document.topic.name},
+        'snippet': snippet,
+    }
+
+
+@method_decorator(replica_reads, name='dispatch')
+class SubjectListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """
     View for displaying a list of subjects belonging to the current user.
     """
     model = Subject
     template_name = 'subjects/subject_list.html'
     context_object_name = 'subjects'
+    keyset_ordering = ('-created_at', '-id')
+    cursor_filters = ('tag',)
+    page_cache_namespace = 'subject-list'
+
+    @method_decorator(conditional(subject_list_querysets))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
         """
-        Return only subjects belonging to the current user.
+        Return only subjects belonging to the current user, optionally
+        only those with the ``?tag=`` tag.
         """
-        return Subject.objects.filter(user=self.request.user)
+        queryset = Subject.objects.filter(user=self.request.user).prefetch_related('tags')
+        tag = self.filters.get('tag')
+        if tag:
+            queryset = queryset.filter(subject_tags__tag__user=self.request.user,
+                                       subject_tags__tag__name=subject_tags.normalise(tag))
+        return queryset
 
-class SubjectDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['current_tag'] = self.filters.get('tag', '')
+        return context
+
+    def serialize_object(self, subject):
+        return {
+            'id': subject.pk,
+            'name': subject.name,
+            'description': subject.description,
+            'tags': [tag.name for tag in subject.tags.all()],
+            'topic_count': subject.topic_count,
+            'document_count': subject.document_count,
+            'total_bytes': subject.total_bytes,
+            'last_activity_at': subject.last_activity_at.isoformat() if subject.last_activity_at else None,
+            'created_at': subject.created_at.isoformat(),
+            'url': reverse('subject_detail', kwargs={'pk': subject.pk}),
+        }
+
+class SubjectDetailView(LoginRequiredMixin, UserPassesTestMixin, CachedObjectMixin, DetailView):
     """
     View for displaying details of a specific subject.
     """
@@ -38,14 +179,14 @@ class SubjectDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
         Ensure the subject belongs to the current user.
         """
         subject = self.get_object()
-        return subject.user == self.request.user
+        return subject.user_id == self.request.user.pk
 
     def get_context_data(self, **kwargs):
         """
-        Add topics to context.
+        Add topics to context; they carry their own document counts.
         """
         context = super().get_context_data(**kwargs)
-        context['topics'] = self.object.topics.all().order_by('name')
+        context['topics'] = self.object.topics.order_by('name')
         return context
 
 class SubjectCreateView(LoginRequiredMixin, CreateView):
@@ -220,6 +361,194 @@ class DocumentDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
         return super().delete(request, *args, **kwargs)
 
 
+@login_required
+def download_document(request, pk):
+    """
+    Deliver a document's file to its owner; ``?download=1`` asks the browser
+    to save it instead of opening it.
+    """
+    document = get_object_or_404(Document.objects.select_related('blob'), pk=pk, user=request.user)
+    return delivery.serve_document(request, document, as_attachment='download' in request.GET)
+
+
+@login_required
+def document_preview(request, pk, page):
+    """
+    Deliver the rendered image of a page of a document; 404 until it has
+    been rendered.
+    """
+    document = get_object_or_404(Document.objects.select_related('blob'), pk=pk, user=request.user)
+    preview = previews.get_preview(document, page)
+    if preview is None:
+        raise Http404(_('No preview available.'))
+    previews.touch(preview)
+    return delivery.serve_preview(request, preview)
+
+
+@login_required
+def document_pages(request, pk):
+    """
+    Return the text of pages ``start`` to ``end`` of a document from the
+    page store, without opening the file.
+    """
+    document = get_object_or_404(Document.objects.only('page_count', 'status', 'blob_id'), pk=pk, user=request.user)
+    try:
+        start = int(request.GET.get('start', 1))
+        end = int(request.GET.get('end', start))
+    except ValueError:
+        return JsonResponse({'error': _('start and end must be page numbers.')}, status=400)
+    if start < 1 or end < start:
+        return JsonResponse({'error': _('Invalid page range.')}, status=400)
+    if end - start + 1 > pages.get_max_range():
+        return JsonResponse({'error': _('At most %d pages can be requested at once.') % pages.get_max_range()}, status=400)
+
+    # Pages are only served up to the count the document reports.
+    end = min(end, document.page_count or 0)
+    page_list = pages.get_range(document.blob_id, start, end) if document.blob_id and start <= end else []
+    return JsonResponse({
+        'id': document.pk,
+        'status': document.status,
+        'page_count': document.page_count,
+        'pages': [{'number': page.number, 'text': page.text} for page in page_list],
+    })
+
+
+class DocumentBulkUploadView(LoginRequiredMixin, UserPassesTestMixin, FormView):
+    """
+    View for importing many files or a zip archive into a subject.
+    """
+    form_class = BulkUploadForm
+    template_name = 'subjects/document_bulk_upload.html'
+
+    def setup(self, request, *args, **kwargs):
+        super().setup(request, *args, **kwargs)
+        self.subject = get_object_or_404(Subject, pk=kwargs.get('subject_pk'))
+
+    def test_func(self):
+        """
+        Ensure the subject belongs to the current user.
+        """
+        return self.subject.user_id == self.request.user.pk
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['subject'] = self.subject
+        return kwargs
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['subject'] = self.subject
+        return context
+
+    def form_valid(self, form):
+        """
+        Import the files and show the per-file report.
+        """
+        results = bulk.import_documents(
+            self.subject,
+            form.cleaned_data['document_type'],
+            files=form.cleaned_data['files'],
+            archive=form.cleaned_data['archive'],
+            topic=form.cleaned_data['topic'],
+        )
+        created = sum(result.status == bulk.RESULT_CREATED for result in results)
+        messages.success(self.request, _('%(count)d document(s) imported.') % {'count': created})
+        return self.render_to_response(self.get_context_data(
+            form=BulkUploadForm(subject=self.subject),
+            results=results,
+            created_count=created,
+        ))
+
+
+def serialize_upload(session):
+    return {
+        'id': str(session.pk),
+        'offset': session.offset,
+        'size': session.size,
+        'url': reverse('upload_session', kwargs={'pk': session.pk}),
+        'complete_url': reverse('upload_session_complete', kwargs={'pk': session.pk}),
+    }
+
+
+def upload_response(session, status=200):
+    response = JsonResponse(serialize_upload(session), status=status)
+    response['Upload-Offset'] = session.offset
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+class UploadSessionCreateView(LoginRequiredMixin, View):
+    """
+    API endpoint that starts a resumable upload into a subject.
+    """
+    def post(self, request, subject_pk):
+        subject = get_object_or_404(Subject, pk=subject_pk, user=request.user)
+        form = UploadSessionForm(request.POST, subject=subject)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+        return upload_response(form.save(), status=201)
+
+
+class UploadSessionMixin(LoginRequiredMixin):
+    def get_session(self):
+        return get_object_or_404(
+            UploadSession.objects.select_related('subject', 'topic'),
+            pk=self.kwargs['pk'],
+            subject__user=self.request.user,
+        )
+
+
+class UploadSessionView(UploadSessionMixin, View):
+    """
+    API endpoint for an upload in progress: GET/HEAD report how many bytes
+    have arrived, PUT appends a chunk starting at ``Upload-Offset``, DELETE
+    abandons the upload.
+    """
+    def get(self, request, pk):
+        return upload_response(self.get_session())
+
+    def put(self, request, pk):
+        session = self.get_session()
+        if session.is_complete:
+            return JsonResponse({'error': _('The upload is already complete.')}, status=409)
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            return JsonResponse({'error': _('Upload-Offset and Content-Length headers are required.')}, status=400)
+
+        try:
+            uploads.append_chunk(session, offset, request, length)
+        except uploads.OffsetMismatch as e:
+            session.offset = e.offset
+            return upload_response(session, status=409)
+        except uploads.ChunkTooLarge as e:
+            return JsonResponse({'error': str(e)}, status=413)
+        except OSError:
+            # The client went away mid-chunk; what arrived has been kept.
+            return upload_response(session, status=400)
+        return upload_response(session)
+
+    def delete(self, request, pk):
+        session = self.get_session()
+        if not session.is_complete:
+            session.delete()
+        return HttpResponse(status=204)
+
+
+class UploadSessionCompleteView(UploadSessionMixin, View):
+    """
+    API endpoint that turns a fully received upload into a document.
+    """
+    def post(self, request, pk):
+        session = self.get_session()
+        try:
+            document = uploads.complete(session)
+        except uploads.IncompleteUpload as e:
+            return JsonResponse({'error': str(e), 'offset': session.offset}, status=409)
+        return JsonResponse(serialize_document(document), status=201)
+
+
 class TopicCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
     """
     View for creating a new topic within a subject.
@@ -339,67 +668,116 @@ class TopicDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
         return super().delete(request, *args, **kwargs)
 
 
-class DocumentListView(LoginRequiredMixin, ListView):
+@method_decorator(replica_reads, name='dispatch')
+class DocumentListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """
     View for displaying a list of documents belonging to the current user.
     """
     model = Document
     template_name = 'subjects/document_list.html'
     context_object_name = 'documents'
+    keyset_ordering = ('-uploaded_at', '-id')
+    cursor_filters = ('type', 'subject', 'topic', 'tag', 'q')
+
+    @method_decorator(conditional(document_list_querysets))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
         """
         Return only documents belonging to the current user.
         Filter by document type if specified in the query parameters.
         """
-        queryset = Document.objects.filter(subject__user=self.request.user).order_by('-uploaded_at')
+        queryset = Document.objects.filter(
+            user=self.request.user
+        ).select_related('subject', 'topic').only(*DOCUMENT_LIST_FIELDS)
 
         # Filter by document type if specified
-        document_type = self.request.GET.get('type')
+        document_type = self.filters.get('type')
         if document_type in dict(Document.DOCUMENT_TYPES):
             queryset = queryset.filter(document_type=document_type)
 
         # Filter by subject if specified
-        subject_id = self.request.GET.get('subject')
+        subject_id = self.filters.get('subject')
         if subject_id and subject_id.isdigit():
             queryset = queryset.filter(subject_id=subject_id)
 
             # Filter by topic if specified
-            topic_id = self.request.GET.get('topic')
+            topic_id = self.filters.get('topic')
             if topic_id == 'none':
                 queryset = queryset.filter(topic__isnull=True)
             elif topic_id and topic_id.isdigit():
                 queryset = queryset.filter(topic_id=topic_id)
 
-        # Search by title if specified
-        search_query = self.request.GET.get('q')
+        # Filter by subject tag if specified
+        tag = self.filters.get('tag')
+        if tag:
+            queryset = queryset.filter(subject__subject_tags__tag__user=self.request.user,
+                                       subject__subject_tags__tag__name=subject_tags.normalise(tag))
+
+        # Full-text search over title, topic and content, best matches first.
+        # Only the best SEARCH_RESULT_LIMIT hits are listed; search_capped
+        # tells the user there may be more.
+        self.search_hits = {}
+        self.search_capped = False
+        search_query = self.filters.get('q')
         if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(topic__name__icontains=search_query)
+            hits = search.get_backend().search(self.request.user, search_query)
+            self.search_hits = {hit.document_id: hit for hit in hits}
+            self.search_capped = len(hits) >= search.get_result_limit()
+            queryset = queryset.filter(pk__in=self.search_hits).annotate(
+                search_rank=Case(
+                    *[When(pk=hit.document_id, then=position) for position, hit in enumerate(hits)],
+                    output_field=IntegerField(),
+                )
             )
 
         return queryset
 
+    def get_keyset_ordering(self):
+        """
+        Search results are paged in rank order, everything else newest first.
+        """
+        if self.filters.get('q'):
+            return ('search_rank', 'id')
+        return self.keyset_ordering
+
+    def serialize_object(self, document):
+        hit = self.search_hits.get(document.pk)
+        return serialize_document(document, snippet=hit.snippet if hit else '')
+
+    def get_json_extra(self):
+        if self.filters.get('q'):
+            return {'search_capped': self.search_capped}
+        return {}
+
     def get_context_data(self, **kwargs):
         """
         Add subjects, topics, and filters to context.
         """
         context = super().get_context_data(**kwargs)
-        context['subjects'] = Subject.objects.filter(user=self.request.user)
+        if self.wants_json():
+            return context
+
+        for document in context['documents']:
+            hit = self.search_hits.get(document.pk)
+            document.search_snippet = hit.snippet if hit else ''
+        context['subjects'] = user_subjects(self.request.user)
         context['document_types'] = Document.DOCUMENT_TYPES
+        context['previews_enabled'] = rendering.get_renderer() is not None
 
         # Add current filters to context
-        context['current_type'] = self.request.GET.get('type', '')
-        context['current_subject'] = self.request.GET.get('subject', '')
-        context['current_topic'] = self.request.GET.get('topic', '')
-        context['current_search'] = self.request.GET.get('q', '')
+        context['current_type'] = self.filters.get('type', '')
+        context['current_subject'] = self.filters.get('subject', '')
+        context['current_topic'] = self.filters.get('topic', '')
+        context['current_tag'] = self.filters.get('tag', '')
+        context['current_search'] = self.filters.get('q', '')
+        context['search_capped'] = self.search_capped
+        context['search_limit'] = search.get_result_limit()
 
         # Add topics for the selected subject
         if context['current_subject'] and context['current_subject'].isdigit():
-            context['topics'] = Topic.objects.filter(
-                subject_id=context['current_subject']
-            ).order_by('name')
+            context['topics'] = subject_topics(self.request.user, context['current_subject']) or []
         else:
             context['topics'] = []
 
@@ -476,27 +854,56 @@ class DocumentUploadFromListView(LoginRequiredMixin, CreateView):
         return super().form_valid(form)
 
 
-class TopicDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+class TopicDetailView(LoginRequiredMixin, UserPassesTestMixin, CachedObjectMixin, DetailView):
     """
     View for displaying details of a specific topic.
     """
     model = Topic
     template_name = 'subjects/topic_detail.html'
     context_object_name = 'topic'
+    paginate_by = KeysetPaginationMixin.paginate_by
+
+    def get_queryset(self):
+        return Topic.objects.select_related('subject')
 
     def test_func(self):
         """
         Ensure the topic belongs to the current user.
         """
         topic = self.get_object()
-        return topic.subject.user == self.request.user
+        return topic.subject.user_id == self.request.user.pk
+
+    @method_decorator(conditional(topic_detail_querysets))
+    def get(self, request, *args, **kwargs):
+        """
+        Documents are paginated with a cursor; ``?format=json`` returns just
+        the requested page of them.
+        """
+        self.object = self.get_object()
+        token = request.GET.get('cursor')
+        position = decode_cursor(token)[0] if token else None
+        self.page = KeysetPaginator(
+            self.object.documents.select_related('subject', 'topic').only(*DOCUMENT_LIST_FIELDS),
+            ('-uploaded_at', '-id'),
+            self.paginate_by,
+        ).page(position)
+        if request.GET.get('format') == 'json':
+            return json_page(self.page, serialize_document)
+        return self.render_to_response(self.get_context_data(object=self.object))
 
     def get_context_data(self, **kwargs):
         """
         Add documents to context.
         """
         context = super().get_context_data(**kwargs)
-        context['documents'] = self.object.documents.all().order_by('-uploaded_at')
+        context['documents'] = self.page.object_list
+        context['page_obj'] = self.page
+        context['previews_enabled'] = rendering.get_renderer() is not None
+        context['question_count'] = self.object.questions.count()
+        context['performance'] = TopicPerformance.objects.filter(
+            topic=self.object,
+            user=self.request.user,
+        ).first()
         return context
 
 
@@ -559,16 +966,193 @@ class DocumentUploadForTopicView(LoginRequiredMixin, UserPassesTestMixin, Create
         return super().form_valid(form)
 
 
+class ReviewView(LoginRequiredMixin, TemplateView):
+    """
+    Flashcard review session; cards are fetched and graded through the
+    review API.
+    """
+    template_name = 'subjects/review.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        topic_id = self.request.GET.get('topic', '')
+        context['topic'] = None
+        if topic_id.isdigit():
+            context['topic'] = get_object_or_404(Topic, pk=topic_id, subject__user=self.request.user)
+        context['due_count'] = scheduling.due(
+            self.request.user,
+            topic_id=context['topic'].pk if context['topic'] else None,
+        ).count()
+        context['batch_size'] = scheduling.get_batch_size()
+        return context
+
+
+def serialize_review(state):
+    card = state.flashcard
+    return {
+        'id': state.pk,
+        'front': card.front,
+        'back': card.back,
+        'kind': card.kind,
+        'topic': card.topic.name,
+        'due_at': state.due_at.isoformat(),
+    }
+
+
 @login_required
+def due_reviews(request):
+    """
+    API endpoint with the user's next due cards, most overdue first;
+    ``?topic=`` limits them to one topic.
+    """
+    topic_id = request.GET.get('topic', '')
+    try:
+        limit = min(int(request.GET.get('limit', scheduling.get_batch_size())), 100)
+    except ValueError:
+        return JsonResponse({'error': _('limit must be a number.')}, status=400)
+    states = scheduling.due(
+        request.user,
+        topic_id=int(topic_id) if topic_id.isdigit() else None,
+    ).select_related('flashcard__topic')[:max(limit, 1)]
+    return JsonResponse({'results': [serialize_review(state) for state in states]})
+
+
+@login_required
+@require_POST
+def record_reviews(request):
+    """
+    API endpoint taking a batch of graded reviews as
+    ``{"reviews": [{"id": ..., "quality": 0-5}, ...]}``.
+    """
+    try:
+        reviews = [(int(review['id']), int(review['quality'])) for review in json.loads(request.body)['reviews']]
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': _('Expected a list of reviews with id and quality.')}, status=400)
+    if any(not scheduling.QUALITY_MIN <= quality <= scheduling.QUALITY_MAX for _id, quality in reviews):
+        return JsonResponse({'error': _('quality must be between 0 and 5.')}, status=400)
+    return JsonResponse({'updated': scheduling.record_reviews(request.user, reviews)})
+
+
+class TopicQuizCreateView(LoginRequiredMixin, View):
+    """
+    Start a quiz on a topic's question bank.
+    """
+    def post(self, request, pk):
+        topic = get_object_or_404(Topic, pk=pk, subject__user=request.user)
+        quiz = quizzes.create_topic_quiz(request.user, topic)
+        if quiz is None:
+            messages.error(request, _('This topic has no quiz questions yet.'))
+            return redirect('topic_detail', pk=topic.pk)
+        return redirect('quiz_detail', pk=quiz.pk)
+
+
+class WeakAreasQuizCreateView(LoginRequiredMixin, View):
+    """
+    Start a quiz on the topics the user answers worst.
+    """
+    def post(self, request):
+        quiz = quizzes.create_weak_areas_quiz(request.user)
+        if quiz is None:
+            messages.error(request, _('Answer some quiz questions first to find your weak areas.'))
+            return redirect('home')
+        return redirect('quiz_detail', pk=quiz.pk)
+
+
+class QuizDetailView(LoginRequiredMixin, DetailView):
+    """
+    A quiz with its questions, answered ones showing the correct choice.
+    """
+    model = Quiz
+    template_name = 'subjects/quiz_detail.html'
+    context_object_name = 'quiz'
+
+    def get_queryset(self):
+        return Quiz.objects.filter(user=self.request.user).select_related('topic')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['items'] = self.object.items.select_related('question__topic')
+        return context
+
+
+class QuizAnswerView(LoginRequiredMixin, View):
+    """
+    Score the answer to one question of a quiz.
+    """
+    def post(self, request, pk, position):
+        item = get_object_or_404(
+            QuizQuestion.objects.select_related('quiz', 'question'),
+            quiz_id=pk,
+            quiz__user=request.user,
+            position=position,
+        )
+        choice = request.POST.get('choice', '')
+        if not choice.isdigit() or int(choice) >= len(item.question.choices):
+            messages.error(request, _('Please choose an answer.'))
+        else:
+            quizzes.answer(item, int(choice))
+        return HttpResponseRedirect(f"{reverse('quiz_detail', args=[pk])}#question-{position}")
+
+
+@login_required
+def semantic_search(request):
+    """
+    API endpoint with the passages of the user's documents most similar to
+    ``?q=``, best first.
+    """
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'error': _('q is required.')}, status=400)
+    try:
+        limit = min(int(request.GET.get('limit', 10)), 50)
+    except ValueError:
+        return JsonResponse({'error': _('limit must be a number.')}, status=400)
+    hits = vectors.search(request.user, query, limit=limit)
+    texts = vectors.chunk_texts([hit.chunk for hit in hits])
+    return JsonResponse({
+        'enabled': vectors.is_enabled(),
+        'results': [
+            {
+                'document': hit.chunk.document_id,
+                'title': hit.chunk.document.title,
+                'page': hit.chunk.page,
+                'score': round(hit.score, 4),
+                'text': texts[hit.chunk.pk],
+            }
+            for hit in hits
+        ],
+    })
+
+
+@replica_reads
+@login_required
+@conditional(subject_topics_querysets)
 def get_topics_for_subject(request, subject_id):
     """
     API endpoint to get topics for a subject.
     Returns a JSON list of topics.
     """
-    subject = get_object_or_404(Subject, pk=subject_id, user=request.user)
-    topics = Topic.objects.filter(subject=subject).order_by('name')
+    topics_data = subject_topics(request.user, subject_id)
+    if topics_data is None:
+        raise Http404(_('No subject found matching the query'))
+    return JsonResponse(topics_data, safe=False)
 
-    # Convert topics to a list of dictionaries
-    topics_data = [{'id': topic.id, 'name': topic.name} for topic in topics]
 
-    return JsonResponse(topics_data, safe=False)
+@login_required
+def tag_autocomplete(request):
+    """
+    API endpoint with the user's tag names starting with ``?q=``.
+    """
+    try:
+        limit = max(min(int(request.GET.get('limit', subject_tags.get_autocomplete_limit())), 50), 1)
+    except ValueError:
+        return JsonResponse({'error': _('limit must be a number.')}, status=400)
+    return JsonResponse({'results': subject_tags.autocomplete(request.user, request.GET.get('q', ''), limit=limit)})
+
+
+@user_passes_test(lambda user: user.is_staff)
+def cache_stats(request):
+    """
+    API endpoint with the cache hit/miss counters of this worker process.
+    """
+    return JsonResponse(user_cache.stats())